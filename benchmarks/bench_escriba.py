@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BENCH ESCRIBA: Benchmarks dos caminhos quentes do Escriba
+=============================================================================
+
+Uso (a partir da raiz do projeto, com o .venv ativo):
+
+    python benchmarks/bench_escriba.py rollup canal-VIDEOID-pt.srt [...]
+    python benchmarks/bench_escriba.py state-memory --videos 100000
+    python benchmarks/bench_escriba.py md-setup canal-VIDEOID-pt.srt [...]
+    python benchmarks/bench_escriba.py feed
+    python benchmarks/bench_escriba.py shard-merge --videos 20000
+
+Cada subcomando compara a implementação atual com a versão de referência
+anterior e imprime tempo e métricas de saída lado a lado. Sem arquivos de
+entrada, uma amostra sintética de roll-up é gerada em memória.
+=============================================================================
+"""
+
+import argparse
+import gc
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import escriba  # noqa: E402
+
+
+# ─── Amostras ─────────────────────────────────────────────────────────────────
+
+def build_synthetic_rollup_cues(cue_count: int = 3000, seed: int = 7) -> list[str]:
+    """Gera cues no formato roll-up do YouTube: cada cue repete a linha anterior."""
+    random_generator = random.Random(seed)
+    vocabulary_list = (
+        "o governo anunciou hoje novas medidas para economia e a inflação deve cair nos "
+        "próximos meses segundo analistas mercado financeiro reagiu bem ao anúncio"
+    ).split()
+    caption_lines = [
+        " ".join(random_generator.choice(vocabulary_list) for _ in range(random_generator.randint(4, 9)))
+        for _ in range(cue_count)
+    ]
+    return [caption_lines[0]] + [f"{caption_lines[i - 1]}\n{caption_lines[i]}" for i in range(1, cue_count)]
+
+
+def load_cue_texts(srt_path: Path) -> list[str]:
+    """Extrai o texto bruto de cada cue de um .srt real (via pysrt)."""
+    import pysrt
+    return [sub.text for sub in pysrt.open(str(srt_path), encoding="utf-8")]
+
+
+# ─── Roll-up: referência legada vs motor linear ───────────────────────────────
+
+def legacy_rollup_pipeline(cue_text_list: list[str], paragraph_size: int = 20) -> list[str]:
+    """Reprodução fiel de `_strip_rollup` + `_dedup_lines` anteriores ao RollupDeduplicator."""
+    def _strip_rollup(text: str, prev_text: str, overlap_ratio: float = 0.5) -> str:
+        prev_tokens = prev_text.split()
+        cur_tokens = text.split()
+        if not prev_tokens or not cur_tokens:
+            return text
+        overlap = 0
+        for i, token in enumerate(cur_tokens):
+            if i < len(prev_tokens) and token == prev_tokens[i]:
+                overlap += 1
+            else:
+                break
+        if overlap / len(cur_tokens) > overlap_ratio:
+            return ""
+        return " ".join(cur_tokens[overlap:])
+
+    def _dedup_lines(lines: list[str]) -> list[str]:
+        out = []
+        for line in lines:
+            if out:
+                prev_normalized = re.sub(r'\s+', ' ', out[-1]).lower()
+                cur_normalized = re.sub(r'\s+', ' ', line).lower()
+                if cur_normalized in prev_normalized or prev_normalized in cur_normalized:
+                    if len(cur_normalized) > len(prev_normalized):
+                        out[-1] = line
+                    continue
+            out.append(line)
+        return out
+
+    clean_text_list = []
+    prev_sub_text = ""
+    for cue_text in cue_text_list:
+        raw_text = re.sub(r"<[^>]+>", "", cue_text.replace('\n', ' ')).strip()
+        clean_text = _strip_rollup(raw_text, prev_sub_text)
+        if clean_text:
+            prev_sub_text = raw_text
+        clean_text_list.append(clean_text)
+
+    output_lines = []
+    for start_idx in range(0, len(clean_text_list), paragraph_size):
+        paragraph_lines = [re.sub(r'\s+', ' ', t) for t in clean_text_list[start_idx:start_idx + paragraph_size] if t]
+        output_lines.extend(_dedup_lines(paragraph_lines))
+    return output_lines
+
+
+def engine_rollup_pipeline(cue_text_list: list[str]) -> list[str]:
+    rollup_deduplicator = escriba.RollupDeduplicator()
+    return [text for text in (rollup_deduplicator.feed(cue_text) for cue_text in cue_text_list) if text]
+
+
+def repeated_ngram_ratio(output_lines: list[str], ngram_size: int = 4) -> float:
+    """Fração de n-gramas que repetem o n-grama imediatamente anterior do mesmo tamanho (eco de roll-up)."""
+    tokens = " ".join(output_lines).lower().split()
+    total_ngrams = max(1, len(tokens) - 2 * ngram_size + 1)
+    repeated_count = sum(
+        1 for i in range(ngram_size, len(tokens) - ngram_size + 1)
+        if tokens[i:i + ngram_size] == tokens[i - ngram_size:i]
+    )
+    return repeated_count / total_ngrams
+
+
+def bench_rollup(srt_path_list: list[Path], repeat_count: int) -> None:
+    samples_list = [(path.name, load_cue_texts(path)) for path in srt_path_list] or [
+        ("sintético (3000 cues)", build_synthetic_rollup_cues())
+    ]
+    print(f"{'amostra':<34} {'impl.':<8} {'tempo':>10} {'palavras':>9} {'eco 4-gram':>11}")
+    for sample_label, cue_text_list in samples_list:
+        for impl_label, pipeline in (("legado", legacy_rollup_pipeline), ("motor", engine_rollup_pipeline)):
+            start_time = time.perf_counter()
+            for _ in range(repeat_count):
+                output_lines = pipeline(cue_text_list)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000 / repeat_count
+            word_count = sum(len(line.split()) for line in output_lines)
+            print(f"{sample_label[:34]:<34} {impl_label:<8} {elapsed_ms:>8.1f}ms {word_count:>9} {repeated_ngram_ratio(output_lines):>10.2%}")
+
+
+# ─── State: dict por vídeo vs VideoRecord ─────────────────────────────────────
+
+def build_synthetic_state_dicts(video_count: int, seed: int = 11) -> list[dict]:
+    """Gera registros no schema do escriba_*.json (como se lidos do disco)."""
+    random_generator = random.Random(seed)
+    id_alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    state_dicts = []
+    for i in range(video_count):
+        video_dict = {
+            "video_id": "".join(random_generator.choice(id_alphabet) for _ in range(11)),
+            "publish_date": f"20{random_generator.randint(10, 26)}-{random_generator.randint(1, 12):02d}-{random_generator.randint(1, 28):02d}",
+            "title": f"Vídeo {i} sobre economia e tecnologia",
+            "subtitle_downloaded": random_generator.random() < 0.8,
+            "info_downloaded": random_generator.random() < 0.9,
+            "has_no_subtitle": random_generator.random() < 0.05,
+        }
+        if random_generator.random() < 0.5:
+            video_dict["duration_s"] = random_generator.randint(60, 7200)
+            video_dict["view_count"] = random_generator.randint(0, 10**6)
+        state_dicts.append(video_dict)
+    return state_dicts
+
+
+def _measure_allocation(build_function) -> tuple[object, int, float]:
+    """Mede o tempo sem tracing e, numa segunda execução, os bytes retidos via tracemalloc."""
+    gc.collect()
+    start_time = time.perf_counter()
+    build_function()
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    gc.collect()
+    tracemalloc.start()
+    result = build_function()
+    current_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current_bytes, elapsed_ms
+
+
+def bench_state_memory(video_count: int) -> None:
+    """
+    Compara a memória retida pelo state carregado e o custo da cópia por vídeo
+    feita antes de salvar (dict.copy() legado vs serialização por referência).
+    """
+    source_dicts = build_synthetic_state_dicts(video_count)
+
+    legacy_state, legacy_bytes, legacy_ms = _measure_allocation(lambda: [dict(v) for v in source_dicts])
+    record_state, record_bytes, record_ms = _measure_allocation(
+        lambda: [escriba.VideoRecord.from_dict(v) for v in source_dicts]
+    )
+    _, legacy_save_bytes, legacy_save_ms = _measure_allocation(lambda: [v.copy() for v in legacy_state])
+    _, record_save_bytes, record_save_ms = _measure_allocation(lambda: list(record_state))
+
+    assert [r.to_dict() for r in record_state] == legacy_state, "schema divergente entre dict e VideoRecord"
+
+    print(f"{video_count} vídeos")
+    print(f"{'representação':<16} {'state retido':>14} {'por vídeo':>10} {'load':>9} {'cópias no save':>15} {'save':>9}")
+    for label, state_bytes, load_ms, save_bytes, save_ms in (
+        ("dict", legacy_bytes, legacy_ms, legacy_save_bytes, legacy_save_ms),
+        ("VideoRecord", record_bytes, record_ms, record_save_bytes, record_save_ms),
+    ):
+        print(
+            f"{label:<16} {state_bytes / 1_048_576:>11.1f} MB {state_bytes / video_count:>8.0f} B "
+            f"{load_ms:>7.1f}ms {save_bytes / 1_048_576:>12.1f} MB {save_ms:>7.1f}ms"
+        )
+
+
+# ─── MD: preparo por chamada vs LanguagePipeline ─────────────────────────────
+
+def legacy_vectorize_and_keywords(windows: list, segment_bounds: list[tuple[int, int]], lang_code: str) -> list[str]:
+    """Reprodução do preparo por vídeo anterior ao LanguagePipeline (deps, stopwords, fit + transform, laço por termo)."""
+    pysrt, np, _nltk, _nltk_sw, TfidfTransformer, _cosine_similarity, DictVectorizer = escriba._load_ml_deps()
+    escriba.get_merged_stopwords(lang_code)
+    count_matrix = DictVectorizer().fit([w.term_counts for w in windows])
+    feature_names = count_matrix.get_feature_names_out()
+    tfidf_matrix = TfidfTransformer().fit_transform(count_matrix.transform([w.term_counts for w in windows])).tocsr()
+    segment_keywords = []
+    for first_idx, end_idx in segment_bounds:
+        seg_vector = np.asarray(tfidf_matrix[first_idx:end_idx].sum(axis=0)).ravel()
+        keywords = []
+        for i in seg_vector.argsort()[::-1]:
+            word = feature_names[i]
+            if len(word) > 2 and word.isalpha():
+                keywords.append(word)
+            if len(keywords) >= 3:
+                break
+        segment_keywords.append(" · ".join(keywords))
+    return segment_keywords
+
+
+def pipeline_vectorize_and_keywords(windows: list, segment_bounds: list[tuple[int, int]], lang_code: str) -> list[str]:
+    language_pipeline = escriba.get_language_pipeline(lang_code)
+    tfidf_matrix, feature_names, keyword_mask = language_pipeline.vectorize([w.term_counts for w in windows])
+    return [
+        " · ".join(language_pipeline.top_keywords(tfidf_matrix[first_idx:end_idx], feature_names, keyword_mask))
+        for first_idx, end_idx in segment_bounds
+    ]
+
+
+def bench_md_setup(srt_path_list: list[Path], repeat_count: int) -> None:
+    """
+    Mede o custo de preparo por conversão (.srt → .md) que não depende das cues:
+    criação do pipeline a frio e, por vídeo, vetorização TF-IDF + palavras-chave
+    dos segmentos, ao lado do tempo total de `write_transcript_md`. Sem
+    arquivos, usa a amostra sintética de roll-up (pt) gravada como .srt.
+    """
+    work_dir_path = Path(tempfile.mkdtemp(prefix="bench_escriba_"))
+    if not srt_path_list:
+        synthetic_srt_path = work_dir_path / "sintetico-SYNTHETIC00-pt.srt"
+        escriba.write_srt_from_cues(
+            [escriba.TranscriptCue(i * 3000, i * 3000 + 3000, text) for i, text in enumerate(build_synthetic_rollup_cues())],
+            synthetic_srt_path,
+        )
+        srt_path_list = [synthetic_srt_path]
+
+    escriba._load_ml_deps()
+    start_time = time.perf_counter()
+    escriba.get_language_pipeline.cache_clear()
+    escriba.get_language_pipeline("pt")
+    print(f"pipeline a frio (deps já importadas): {(time.perf_counter() - start_time) * 1000:.2f}ms\n")
+
+    print(f"{'amostra':<34} {'janelas':>8} {'legado':>10} {'pipeline':>10} {'MD total':>10}")
+    for srt_path in srt_path_list:
+        cue_source = escriba.open_cue_source(srt_path)
+        lang_match = escriba.SUBTITLE_LANG_SUFFIX_REGEX_PATTERN.search(srt_path.name)
+        lang_code = lang_match.group(1).lower() if lang_match else "pt"
+        windows, _ = escriba._collect_md_windows(cue_source, 30_000, escriba.get_language_pipeline(lang_code))
+        windows = [window for window in windows if window.has_text]
+        segment_bounds = [(i, min(i + 10, len(windows))) for i in range(0, len(windows), 10)]
+
+        timings_ms = []
+        keywords_by_implementation = []
+        for implementation in (legacy_vectorize_and_keywords, pipeline_vectorize_and_keywords):
+            start_time = time.perf_counter()
+            for _ in range(repeat_count):
+                segment_keywords = implementation(windows, segment_bounds, lang_code)
+            timings_ms.append((time.perf_counter() - start_time) * 1000 / repeat_count)
+            keywords_by_implementation.append(segment_keywords)
+        assert keywords_by_implementation[0] == keywords_by_implementation[1], "palavras-chave divergentes entre legado e pipeline"
+
+        start_time = time.perf_counter()
+        for _ in range(repeat_count):
+            escriba.write_transcript_md(cue_source, work_dir_path / "bench.md", "VIDEOID0000", "Bench", "2024-01-01", lang_code)
+        md_ms = (time.perf_counter() - start_time) * 1000 / repeat_count
+        print(f"{srt_path.name[:34]:<34} {len(windows):>8} {timings_ms[0]:>8.2f}ms {timings_ms[1]:>8.2f}ms {md_ms:>8.1f}ms")
+    shutil.rmtree(work_dir_path, ignore_errors=True)
+
+
+# ─── Feed de uploads: Atom canônico ──────────────────────────────────────────
+
+CANNED_UPLOADS_FEED_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">
+ <link rel="self" href="http://www.youtube.com/feeds/videos.xml?channel_id=UCxxxxxxxxxxxxxxxxxxxxxx"/>
+ <id>yt:channel:xxxxxxxxxxxxxxxxxxxxxx</id>
+ <yt:channelId>xxxxxxxxxxxxxxxxxxxxxx</yt:channelId>
+ <title>Canal de Teste</title>
+ <published>2015-03-01T12:00:00+00:00</published>
+ <entry>
+  <id>yt:video:dQw4w9WgXcQ</id>
+  <yt:videoId>dQw4w9WgXcQ</yt:videoId>
+  <yt:channelId>UCxxxxxxxxxxxxxxxxxxxxxx</yt:channelId>
+  <title>Economia &amp; mercado: o que muda em 2025</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v=dQw4w9WgXcQ"/>
+  <published>2025-01-20T15:00:06+00:00</published>
+  <updated>2025-01-21T02:11:40+00:00</updated>
+  <media:group><media:title>Economia &amp; mercado: o que muda em 2025</media:title></media:group>
+ </entry>
+ <entry>
+  <id>yt:video:9bZkp7q19f0</id>
+  <yt:videoId>9bZkp7q19f0</yt:videoId>
+  <title>  Ao vivo: perguntas e respostas  </title>
+  <published>2025-01-13T22:30:00+00:00</published>
+ </entry>
+ <entry>
+  <id>yt:video:sem-id</id>
+  <title>Entrada sem videoId (ignorada)</title>
+  <published>2025-01-01T00:00:00+00:00</published>
+ </entry>
+ <entry>
+  <yt:videoId>kJQP7kiw5Fk</yt:videoId>
+  <title></title>
+  <published></published>
+ </entry>
+</feed>
+"""
+
+CANNED_UPLOADS_FEED_ENTRIES = [
+    escriba.UploadsFeedEntry("dQw4w9WgXcQ", "Economia & mercado: o que muda em 2025", "2025-01-20"),
+    escriba.UploadsFeedEntry("9bZkp7q19f0", "Ao vivo: perguntas e respostas", "2025-01-13"),
+    escriba.UploadsFeedEntry("kJQP7kiw5Fk", "N/A", "N/A"),
+]
+
+
+class CannedFeedSession:
+    """Sessão HTTP falsa: responde ao YouTubeRssFeedClient com o Atom canônico e registra os parâmetros."""
+
+    def __init__(self, status_code: int = 200, content: bytes = CANNED_UPLOADS_FEED_XML):
+        self.status_code = status_code
+        self.content = content
+        self.requested_params_list: list[dict] = []
+
+    def get(self, url: str, params: dict | None = None, timeout: float | None = None):
+        self.requested_params_list.append(params)
+        return self
+
+
+def bench_feed(repeat_count: int) -> None:
+    """
+    Confere o YouTubeRssFeedClient contra um Atom canônico (ordem, títulos com
+    entidades/espaços, entradas sem videoId, datas ausentes, HTTP ≠ 200, XML
+    inválido) e mede o parse de um feed de 15 entradas.
+    """
+    feed_session = CannedFeedSession()
+    feed_client = escriba.YouTubeRssFeedClient(base_url="http://feed.invalid/videos.xml", http_session=feed_session)
+    assert feed_client.fetch_latest(channel_id="UCxxxxxxxxxxxxxxxxxxxxxx") == CANNED_UPLOADS_FEED_ENTRIES
+    assert feed_client.fetch_latest(playlist_id="PLxyz") == CANNED_UPLOADS_FEED_ENTRIES
+    assert feed_session.requested_params_list == [{"channel_id": "UCxxxxxxxxxxxxxxxxxxxxxx"}, {"playlist_id": "PLxyz"}]
+    assert feed_client.fetch_latest() is None, "sem canal nem playlist o feed não é consultado"
+    assert escriba.YouTubeRssFeedClient(http_session=CannedFeedSession(status_code=404)).fetch_latest(channel_id="UC") is None
+    assert escriba.YouTubeRssFeedClient(http_session=CannedFeedSession(content=b"<feed")).fetch_latest(channel_id="UC") is None
+    print(f"feed canônico: {len(CANNED_UPLOADS_FEED_ENTRIES)} entradas conferidas (canal, playlist, 404, XML inválido)")
+
+    entry_xml = CANNED_UPLOADS_FEED_XML.split(b"<entry>")[1].split(b"</entry>")[0]
+    full_feed_xml = CANNED_UPLOADS_FEED_XML.split(b"<entry>")[0] + b"".join(
+        b"<entry>" + entry_xml + b"</entry>" for _ in range(15)
+    ) + b"</feed>"
+    start_time = time.perf_counter()
+    for _ in range(repeat_count):
+        escriba.parse_uploads_feed(full_feed_xml)
+    print(f"parse de 15 entradas: {(time.perf_counter() - start_time) * 1_000_000 / repeat_count:.0f}µs")
+
+
+def bench_shard_merge(video_count: int) -> None:
+    """
+    Round-trip de --merge-shards: o state principal conhece os vídeos e o delta do
+    shard traz legenda, áudio e metadados colhidos. Confere que nenhum campo do
+    delta se perde (só as lacunas são preenchidas) e mede o merge completo.
+    """
+    work_dir_path = Path(tempfile.mkdtemp(prefix="bench_escriba_"))
+    channel_dir_path = work_dir_path / "canal"
+    channel_dir_path.mkdir()
+    source_dicts = build_synthetic_state_dicts(video_count)
+    channel_state = escriba.ChannelState(channel_dir_path / "escriba_canal.json", channel_handle="@canal")
+    for video_dict in source_dicts:
+        channel_state.add(escriba.VideoRecord.from_dict(
+            {key: value for key, value in video_dict.items() if key not in ("duration_s", "view_count")}
+            | {"subtitle_downloaded": False}
+        ))
+    escriba.save_channel_state_json(channel_state)
+
+    delta_dicts = [
+        video_dict | {
+            "subtitle_downloaded": True, "audio_downloaded": True, "duration_s": 600 + i, "view_count": i,
+            "audio_path": f"canal-{video_dict['video_id']}.webm", "audio_size_bytes": 1024 * i, "shard_note": "extra",
+        }
+        for i, video_dict in enumerate(source_dicts)
+    ]
+    delta_path = channel_dir_path / "escriba_canal.shard-1-of-2.jsonl"
+    delta_path.write_bytes(b"".join(escriba.JSON_CODEC.dumps(delta_dict, pretty=False) + b"\n" for delta_dict in delta_dicts))
+
+    start_time = time.perf_counter()
+    escriba.merge_shard_deltas(channel_dir_path, [])
+    merge_ms = (time.perf_counter() - start_time) * 1000
+
+    merged_state = escriba.load_channel_state_offline(channel_dir_path)
+    for delta_dict in delta_dicts:
+        merged_dict = merged_state.get(delta_dict["video_id"]).to_dict()
+        lost_keys = [key for key, value in delta_dict.items() if merged_dict.get(key) != value]
+        assert not lost_keys, f"campos do delta perdidos no merge: {lost_keys}"
+    shutil.rmtree(work_dir_path, ignore_errors=True)
+    print(f"\nshard-merge: {video_count} vídeos, todos os campos do delta preservados · merge {merge_ms:.0f}ms")
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    cli_parser = argparse.ArgumentParser(prog="bench_escriba.py", description="Benchmarks dos caminhos quentes do Escriba.")
+    subparsers = cli_parser.add_subparsers(dest="bench_name", required=True)
+
+    rollup_parser = subparsers.add_parser("rollup", help="Roll-up: referência legada vs RollupDeduplicator")
+    rollup_parser.add_argument("srt_files", nargs="*", type=Path, help="Legendas automáticas reais (.srt)")
+    rollup_parser.add_argument("--repeat", type=int, default=5)
+
+    state_parser = subparsers.add_parser("state-memory", help="State: dict por vídeo vs VideoRecord (__slots__)")
+    state_parser.add_argument("--videos", type=int, default=100_000)
+
+    md_setup_parser = subparsers.add_parser("md-setup", help="MD: preparo por chamada vs LanguagePipeline reusado")
+    md_setup_parser.add_argument("srt_files", nargs="*", type=Path, help="Legendas reais (.srt/.json3/.vtt)")
+    md_setup_parser.add_argument("--repeat", type=int, default=20)
+
+    feed_parser = subparsers.add_parser("feed", help="Feed de uploads: YouTubeRssFeedClient contra um Atom canônico")
+    feed_parser.add_argument("--repeat", type=int, default=2000)
+
+    shard_merge_parser = subparsers.add_parser("shard-merge", help="--merge-shards: round-trip de um delta com áudio e metadados")
+    shard_merge_parser.add_argument("--videos", type=int, default=20_000)
+
+    cli_args = cli_parser.parse_args()
+    if cli_args.bench_name == "rollup":
+        bench_rollup(cli_args.srt_files, cli_args.repeat)
+    elif cli_args.bench_name == "state-memory":
+        bench_state_memory(cli_args.videos)
+    elif cli_args.bench_name == "md-setup":
+        bench_md_setup(cli_args.srt_files, cli_args.repeat)
+    elif cli_args.bench_name == "feed":
+        bench_feed(cli_args.repeat)
+    elif cli_args.bench_name == "shard-merge":
+        bench_shard_merge(cli_args.videos)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,15 +30,26 @@ import re
 import os
 import random
 import shutil
+import sqlite3
 import subprocess
 import sys
 import time
+import zlib
+import abc
 import functools
+import threading
+import cProfile
+import heapq
+import io
+import pstats
+import tracemalloc
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
+from http.cookiejar import LoadError, MozillaCookieJar
+from xml.etree import ElementTree
+from dataclasses import dataclass, field
+from typing import Iterator, NamedTuple, Optional
 from dotenv import load_dotenv
 import warnings
 # Suprime avisos de dependência do requests (comum em venvs com versões desencontradas)
@@ -65,6 +76,10 @@ class SessionConfig:
     yt_dlp_cmd_list: list[str]
     channel_input_url_or_handle: str
     channel_url: str
+    cookie_manager: Optional["CookieJarManager"] = None
+    uploads_feed_client: Optional["UploadsFeedClient"] = None
+    library_index: Optional["LibraryIndex"] = None
+    transcript_pack: Optional["TranscriptPack"] = None
 
 # Carrega variáveis do .env (localizado no diretório do script)
 load_dotenv(Path(__file__).parent / ".env")
@@ -110,21 +125,112 @@ DIV_THIN  = f"{DIM}{'─' * 60}{RESET}"
 DIV_THICK = f"{BLUE}{'━' * 60}{RESET}"
 
 
-def _print_formatted(icon: str, message: str, indentation_prefix: str = "  ", end_char: str = "\n") -> None:
+ANSI_ESCAPE_REGEX_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+STATUS_REFRESH_HZ = 10          # redesenhos por segundo de linhas de status no terminal
+BUFFERED_FLUSH_INTERVAL_S = 1.0  # fora de TTY (systemd, CI, --log-format json): flush no máximo 1x/s
+
+
+class ConsoleRenderer:
+    """
+    Saída do terminal com custo controlado.
+
+    No terminal, linhas de status (`\\r`) são redesenhadas no máximo
+    STATUS_REFRESH_HZ vezes por segundo. Fora de um TTY não há status nem
+    barras: só linhas definitivas, com flush agrupado por uma thread a cada
+    BUFFERED_FLUSH_INTERVAL_S. Em `--log-format json` cada linha e cada
+    transição de estado vira um evento JSON por linha no stdout; o texto
+    humano restante (resumos, prints diretos) vai para o stderr.
+    """
+
+    def __init__(self):
+        self.stream = sys.stdout
+        self.is_json = False
+        self.is_interactive = sys.stdout.isatty()
+        self._status_text = ""
+        self._last_status_render_time = 0.0
+        self._flusher_thread = None
+        self._has_unflushed = False
+
+    def configure(self, log_format: str = "text") -> None:
+        self.stream = sys.stdout
+        self.is_json = log_format == "json"
+        self.is_interactive = self.stream.isatty() and not self.is_json
+        if self.is_json:
+            sys.stdout = sys.stderr  # prints diretos não poluem o stream de eventos
+        if not self.is_interactive and self._flusher_thread is None:
+            self._flusher_thread = threading.Thread(target=self._flush_periodically, name="escriba-flush", daemon=True)
+            self._flusher_thread.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(BUFFERED_FLUSH_INTERVAL_S)
+            if self._has_unflushed:
+                self._has_unflushed = False
+                self.stream.flush()
+
+    def _write(self, text: str) -> None:
+        self.stream.write(text)
+        if self.is_interactive:
+            self.stream.flush()
+        else:
+            self._has_unflushed = True
+
+    def event(self, event_name: str, **fields) -> None:
+        """Emite um evento estruturado (apenas em --log-format json)."""
+        if not self.is_json:
+            return
+        self._write(JSON_CODEC.dumps({"ts": round(time.time(), 3), "event": event_name, **fields}, pretty=False).decode("utf-8") + "\n")
+
+    def line(self, level_name: str, text: str, message: str | None = None) -> None:
+        """Linha definitiva; apaga a linha de status em curso antes de escrever."""
+        if self.is_json:
+            self.event("log", level=level_name, message=ANSI_ESCAPE_REGEX_PATTERN.sub("", message if message is not None else text).strip())
+            return
+        if self._status_text:
+            text = f"\r\x1b[K{text}"
+            self._status_text = ""
+        self._write(text + "\n")
+
+    def status(self, text: str, force: bool = False) -> None:
+        """Linha transitória (progresso); descartada fora do terminal e limitada a STATUS_REFRESH_HZ."""
+        if not self.is_interactive:
+            return
+        self._status_text = text
+        now = time.monotonic()
+        if force or now - self._last_status_render_time >= 1 / STATUS_REFRESH_HZ:
+            self._last_status_render_time = now
+            self._write(f"\r{text}\x1b[K")
+
+    def end_status(self, final_text: str | None = None) -> None:
+        """Fecha a linha de status com o último valor (ou `final_text`), como linha definitiva."""
+        text = final_text if final_text is not None else self._status_text
+        self._status_text = ""
+        if self.is_json or not text:
+            return
+        self._write(f"\r{text}\x1b[K\n" if self.is_interactive else f"{text}\n")
+
+
+CONSOLE = ConsoleRenderer()
+
+
+def _print_formatted(icon: str, message: str, indentation_prefix: str = "  ", level_name: str = "info") -> None:
     """Print genérico com ícone. indentation_prefix controla a indentação inicial."""
-    print(f"{indentation_prefix} {icon}  {message}", end=end_char, flush=True)
+    CONSOLE.line(level_name, f"{indentation_prefix} {icon}  {message}", message)
 
 
-def print_ok(message: str, indentation_prefix: str = "  ")  -> None: _print_formatted(ICON_OK,   f"{GREEN}{message}{RESET}", indentation_prefix)
-def print_err(message: str, indentation_prefix: str = "  ") -> None: _print_formatted(ICON_ERR,  f"{BRED}{message}{RESET}", indentation_prefix)
-def print_warn(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_WARN, f"{YELLOW}{message}{RESET}", indentation_prefix)
-def print_info(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_INFO, f"{DIM}{message}{RESET}", indentation_prefix)
-def print_skip(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_SKIP, f"{DIM}{message}{RESET}", indentation_prefix)
-def print_dl(message: str, indentation_prefix: str = "  ")  -> None: _print_formatted(ICON_DL,   f"{BCYAN}{message}{RESET}", indentation_prefix)
+def print_ok(message: str, indentation_prefix: str = "  ")  -> None: _print_formatted(ICON_OK,   f"{GREEN}{message}{RESET}", indentation_prefix, "ok")
+def print_err(message: str, indentation_prefix: str = "  ") -> None: _print_formatted(ICON_ERR,  f"{BRED}{message}{RESET}", indentation_prefix, "error")
+def print_warn(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_WARN, f"{YELLOW}{message}{RESET}", indentation_prefix, "warn")
+def print_info(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_INFO, f"{DIM}{message}{RESET}", indentation_prefix, "info")
+def print_skip(message: str, indentation_prefix: str = "  ")-> None: _print_formatted(ICON_SKIP, f"{DIM}{message}{RESET}", indentation_prefix, "skip")
+def print_dl(message: str, indentation_prefix: str = "  ")  -> None: _print_formatted(ICON_DL,   f"{BCYAN}{message}{RESET}", indentation_prefix, "dl")
 
 
 def print_section(section_title: str) -> None:
     """Imprime um separador de seção com título."""
+    if CONSOLE.is_json:
+        CONSOLE.event("section", title=ANSI_ESCAPE_REGEX_PATTERN.sub("", section_title))
+        return
     print(f"\n{DIV_THIN}")
     print(f"  {BOLD}{BWHITE}{section_title}{RESET}")
     print(f"{DIV_THIN}")
@@ -132,6 +238,9 @@ def print_section(section_title: str) -> None:
 
 def print_header(channel_name: str, script_version: str, execution_mode: str) -> None:
     """Header principal em box drawing."""
+    if CONSOLE.is_json:
+        CONSOLE.event("session_start", version=script_version, channel=channel_name, mode=execution_mode)
+        return
     header_line_1 = f" escriba  v{script_version} "
     header_line_2 = f" Canal: {channel_name} "
     header_line_3 = f" Modo:  {execution_mode} "
@@ -147,7 +256,12 @@ def print_header(channel_name: str, script_version: str, execution_mode: str) ->
 
 
 def print_countdown(seconds_count: int, message: str, indentation_prefix: str = "  ") -> None:
-    """Contagem regressiva com barra visual inline."""
+    """Contagem regressiva com barra visual inline (fora do terminal, só a espera)."""
+    if not CONSOLE.is_interactive:
+        if seconds_count >= 30:  # esperas longas (resfriamento) ficam registradas
+            CONSOLE.line("wait", f"{indentation_prefix} {ICON_WAIT}  {message} {DIM}{seconds_count}s{RESET}", f"{message} {seconds_count}s")
+        time.sleep(seconds_count)
+        return
     visual_bar_width = 20
     try:
         for remaining_seconds in range(seconds_count, -1, -1):
@@ -199,156 +313,945 @@ def setup_environment() -> tuple[Path, list[str]]:
 
 # ─── Cookies ──────────────────────────────────────────────────────────────────
 
-def configure_cookies(cwd_path: Path, script_dir_path: Path, force_refresh_cookies: bool) -> list[str]:
+COOKIE_DOMAIN_KEYWORDS = ("youtube.com", "google.com")
+AUTH_COOKIE_NAMES = ("SID", "__Secure-1PSID", "__Secure-3PSID", "SAPISID", "LOGIN_INFO")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_browser_cookie_extractor():
+    """Extrator de cookies do navegador do yt-dlp, in-process (None se o módulo não estiver instalado)."""
+    try:
+        from yt_dlp.cookies import extract_cookies_from_browser
+        return extract_cookies_from_browser
+    except ImportError:
+        return None
+
+
+class CookieJarManager:
     """
-    Retorna os argumentos de cookie para o yt-dlp.
-    Se force_refresh_cookies=True, apaga o cookies.txt existente na cwd_path antes de continuar.
+    Jar de cookies do YouTube carregado, filtrado e validado uma única vez por execução.
+
+    A origem segue a prioridade de sempre: cookies.txt da pasta atual → cookies.txt
+    do diretório do script → extração do Chrome. A extração do navegador roda
+    in-process (módulo yt_dlp), sem o warm-up via subprocesso; só os domínios do
+    YouTube/Google são mantidos e gravados em cookies.txt, que os subprocessos do
+    yt-dlp recebem via `--cookies`. Consumidores in-process (ex: download direto de
+    legendas nativas) usam a mesma jar em memória via `session`.
+
+    A jar é renovada sem reiniciar a execução quando os cookies de autenticação
+    expiram (`ensure_fresh`) ou após uma falha de download (`handle_auth_failure`),
+    respeitando um intervalo mínimo entre renovações.
     """
-    cookies_file_path = cwd_path / "cookies.txt"
-
-    if force_refresh_cookies:
-        print_warn("--refresh-cookies ativo. Apagando cache antigo...")
-        cookies_file_path.unlink(missing_ok=True)
 
-    def is_valid_cookie_file(path: Path) -> bool:
-        if not path.is_file(): return False
+    def __init__(
+        self,
+        cwd_path: Path,
+        script_dir_path: Path,
+        browser_name: str = "chrome",
+        refresh_cooldown_s: int = 600,
+    ):
+        self.cookies_file_path = cwd_path / "cookies.txt"
+        self.global_cookies_file_path = script_dir_path / "cookies.txt"
+        self.browser_name = browser_name
+        self.refresh_cooldown_s = refresh_cooldown_s
+        self.jar: MozillaCookieJar = MozillaCookieJar()
+        self.source_path: Path | None = None
+        self._source_signature: tuple[int, int] | None = None  # (mtime_ns, tamanho) do arquivo de origem lido
+        self.generation = 0
+        self._last_refresh_time = 0.0
+        self._refresh_lock = threading.Lock()
+        self._http_session: requests.Session | None = None
+
+    # ── Carga ─────────────────────────────────────────────────────────────
+    @staticmethod
+    def _read_jar(cookies_path: Path) -> MozillaCookieJar | None:
+        """Lê um cookies.txt (Netscape); None se ausente ou corrompido."""
+        if not cookies_path.is_file():
+            return None
+        jar = MozillaCookieJar()
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read(100)
-                # Verifica se é um arquivo vazio ou se tem a diretiva correta do Netscape
-                if not content.strip() or "Netscape" in content or "TRUE" in content:
-                    return True
-        except Exception:
-            pass
-        return False
+            jar.load(str(cookies_path), ignore_discard=True, ignore_expires=True)
+        except (LoadError, OSError, UnicodeDecodeError):
+            return None
+        return jar
+
+    @staticmethod
+    def _filter_jar(source_jar) -> MozillaCookieJar:
+        """Mantém apenas cookies do YouTube/Google (remove trackers e lixo cruzado do navegador)."""
+        filtered_jar = MozillaCookieJar()
+        for cookie in source_jar:
+            if any(keyword in cookie.domain for keyword in COOKIE_DOMAIN_KEYWORDS):
+                filtered_jar.set_cookie(cookie)
+        return filtered_jar
+
+    def _write_jar(self) -> None:
+        temp_path = self.cookies_file_path.with_name(f"{self.cookies_file_path.name}.{os.getpid()}.tmp")
+        self.jar.save(str(temp_path), ignore_discard=True, ignore_expires=True)
+        temp_path.replace(self.cookies_file_path)
+
+    def _extract_from_browser(self, yt_dlp_cmd_list: list[str]) -> bool:
+        """Extrai do navegador (in-process; subprocesso apenas se o módulo yt_dlp faltar) e grava filtrado."""
+        extract_cookies_from_browser = _load_browser_cookie_extractor()
+        if extract_cookies_from_browser is not None:
+            try:
+                browser_jar = extract_cookies_from_browser(self.browser_name)
+            except Exception as e:
+                print_warn(f"Falha ao extrair cookies do {self.browser_name}: {e}")
+                return False
+        else:
+            print_warn("Módulo yt_dlp indisponível: extraindo cookies via subprocesso...")
+            subprocess.run(
+                yt_dlp_cmd_list + ["--cookies-from-browser", self.browser_name, "--cookies", str(self.cookies_file_path),
+                                   "--skip-download", "--playlist-items", "0", "https://www.youtube.com"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            browser_jar = self._read_jar(self.cookies_file_path)
+            if browser_jar is None:
+                return False
+        self.jar = self._filter_jar(browser_jar)
+        self._write_jar()
+        self.source_path = None
+        return True
+
+    def load(self, yt_dlp_cmd_list: list[str], force_refresh: bool = False) -> list[str]:
+        """Carrega a jar uma vez e retorna os argumentos de cookie para o yt-dlp."""
+        if force_refresh:
+            print_warn("--refresh-cookies ativo. Apagando cache antigo...")
+            self.cookies_file_path.unlink(missing_ok=True)
+
+        cached_jar = self._read_jar(self.cookies_file_path)
+        if cached_jar is not None:
+            print_info(f"Cookies em cache: {self.cookies_file_path.name}")
+            self.jar, self.source_path = self._filter_jar(cached_jar), self.cookies_file_path
+        else:
+            if self.cookies_file_path.is_file():
+                print_warn(f"Cache de cookies corrompido detectado e removido: {self.cookies_file_path.name}")
+                self.cookies_file_path.unlink()
+            global_jar = None if force_refresh else self._read_jar(self.global_cookies_file_path)
+            if global_jar is not None:
+                print_info("Cookies do diretório do script.")
+                self.jar, self.source_path = self._filter_jar(global_jar), self.global_cookies_file_path
+            else:
+                print_warn(f"Extraindo cookies do Chrome → {self.cookies_file_path.name}")
+                if self._extract_from_browser(yt_dlp_cmd_list):
+                    print_info("Cookies filtrados limitados ao YouTube (trackers removidos).")
+                else:
+                    return []
+        self._source_signature = _file_signature(self.source_path) if self.source_path is not None else None
+        self.generation += 1
+        # Jar recém-extraída do navegador não é reextraída logo em seguida; arquivos em cache podem ser
+        self._last_refresh_time = time.monotonic() if self.source_path is None else 0.0
+        return self.cookie_args_list
+
+    @property
+    def cookie_args_list(self) -> list[str]:
+        cookies_path = self.source_path or self.cookies_file_path
+        return ["--cookies", str(cookies_path)] if cookies_path.is_file() else []
+
+    @property
+    def session(self) -> requests.Session:
+        """Sessão HTTP compartilhada com a jar em memória (a mesma após renovações)."""
+        if self._http_session is None:
+            self._http_session = requests.Session()
+        self._http_session.cookies = self.jar
+        return self._http_session
+
+    # ── Renovação ─────────────────────────────────────────────────────────
+    def is_expired(self) -> bool:
+        """True se algum cookie de autenticação presente na jar já expirou."""
+        now_timestamp = time.time()
+        auth_cookies_list = [cookie for cookie in self.jar if cookie.name in AUTH_COOKIE_NAMES]
+        return any(cookie.is_expired(now_timestamp) for cookie in auth_cookies_list)
+
+    def refresh(self, yt_dlp_cmd_list: list[str], reason: str, reread_source_flag: bool = True) -> bool:
+        """
+        Reextrai a jar do navegador (ou relê o arquivo de origem) sem reiniciar a execução.
+        Com `reread_source_flag=False` (falha de autenticação: o arquivo já lido
+        não serve), o arquivo de origem só é relido se mudou em disco desde a leitura.
+        """
+        with self._refresh_lock:
+            if time.monotonic() - self._last_refresh_time < self.refresh_cooldown_s:
+                return False
+            self._last_refresh_time = time.monotonic()
+            print_warn(f"Renovando cookies ({reason})...")
+            if self.source_path is not None and (
+                reread_source_flag or _file_signature(self.source_path) != self._source_signature
+            ):
+                reloaded_jar = self._read_jar(self.source_path)
+                if reloaded_jar is not None:
+                    self._source_signature = _file_signature(self.source_path)
+                    self.jar = self._filter_jar(reloaded_jar)
+                    if not self.is_expired():
+                        self.generation += 1
+                        print_ok(f"Cookies relidos de {self.source_path.name} {DIM}(geração {self.generation}){RESET}")
+                        return True
+            if not self._extract_from_browser(yt_dlp_cmd_list):
+                return False
+            self.generation += 1
+            print_ok(f"Cookies renovados {DIM}(geração {self.generation}){RESET}")
+            return True
+
+    def ensure_fresh(self, yt_dlp_cmd_list: list[str]) -> bool:
+        return self.is_expired() and self.refresh(yt_dlp_cmd_list, "cookies de autenticação expirados")
+
+    def handle_auth_failure(self, yt_dlp_cmd_list: list[str]) -> bool:
+        return self.refresh(yt_dlp_cmd_list, "falha de download/autenticação", reread_source_flag=False)
 
-    if is_valid_cookie_file(cookies_file_path):
-        print_info(f"Cookies em cache: {cookies_file_path.name}")
-        return ["--cookies", str(cookies_file_path)]
-    elif cookies_file_path.is_file():
-        print_warn(f"Cache de cookies corrompido detectado e removido: {cookies_file_path.name}")
-        cookies_file_path.unlink()
 
-    # Fallback: busca no diretório do script
-    global_script_cookies_path = script_dir_path / "cookies.txt"
-    if global_script_cookies_path.is_file() and not force_refresh_cookies:
-        print_info("Cookies do diretório do script.")
-        return ["--cookies", str(global_script_cookies_path)]
+# ─── Detecção de Idioma ───────────────────────────────────────────────────────
 
-    print_warn(f"Extraindo cookies do Chrome → {cookies_file_path.name}")
-    return ["--cookies-from-browser", "chrome", "--cookies", str(cookies_file_path)]
+# Palavras funcionais distintivas por idioma. Nenhuma aparece em mais de uma lista nem é
+# palavra comum em outro dos três idiomas (fora: "de"/"que"/"para"/"como"/"porque"/"nos"/
+# "sobre"/"está"/"por", que pt e es compartilham, e "as"/"no"/"do"/"um"/"a"/"i", que colidem com o inglês)
+LANGUAGE_HINT_WORDS = {
+    "pt": frozenset({
+        "da", "dos", "das", "não", "uma", "mais", "na", "em", "é", "você", "isso", "ao", "são",
+        "foi", "também", "vai", "tudo", "muito", "então", "já", "até", "pelo", "pela", "ele", "ela",
+    }),
+    "en": frozenset({
+        "the", "and", "of", "to", "is", "you", "for", "with", "how", "what", "on", "this", "my",
+        "why", "your", "are", "it", "from", "about", "we", "be", "at", "that",
+    }),
+    "es": frozenset({
+        "el", "los", "las", "y", "del", "una", "cómo", "qué", "es", "pero", "muy", "esto",
+        "también", "hay", "más", "lo", "al", "ellos", "cuando", "ahora",
+    }),
+}
+LANGUAGE_TITLE_SAMPLE_SIZE = 500   # títulos mais recentes considerados na votação
+LANGUAGE_STRONG_VOTE_WEIGHT = 3    # peso de um idioma vindo de metadados/trilhas vs. palpite por título
+LANGUAGE_MIN_VOTE_SHARE = 0.6      # fração mínima dos votos para o vencedor ser escolhido
+LANGUAGE_MIN_TITLE_COVERAGE = 0.3  # sem idioma por vídeo: fração mínima dos títulos com palpite
+INVALID_LANGUAGE_TAGS = {"na", "n/a", "none", "null", "undefined", ""}
 
 
-def filter_youtube_cookies(cookies_path: Path) -> None:
-    """
-    Filtra o arquivo cookies.txt (Netscape) mantendo apenas cookies do YouTube/Google.
-    Remove trackers, extensões e lixos cruzados que o Chrome exporta.
-    """
-    if not cookies_path.is_file():
-        return
-    try:
-        with open(cookies_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        
-        filtered_lines = []
-        for line in lines:
-            if line.startswith("#") or not line.strip():
-                filtered_lines.append(line)
-                continue
-            
-            parts = line.split('\t')
-            if len(parts) >= 6:
-                domain = parts[0].strip()
-                # Manter apenas domínios relativos ao Google/YouTube para autenticação
-                if "youtube.com" in domain or "google.com" in domain:
-                    filtered_lines.append(line)
-        
-        with open(cookies_path, "w", encoding="utf-8") as f:
-            f.writelines(filtered_lines)
-    except Exception as e:
-        print_warn(f"Falha ao filtrar cookies {cookies_path.name}: {e}")
+def normalize_language_code(raw_language: str | None) -> str | None:
+    """Reduz um código de idioma à língua base ('pt-BR' → 'pt', 'en-orig' → 'en'); None se inválido."""
+    if not raw_language or not isinstance(raw_language, str):
+        return None
+    base_language = re.split(r"[-_]", raw_language.strip().lower())[0]
+    if base_language in INVALID_LANGUAGE_TAGS or not base_language.isalpha():
+        return None
+    return base_language
 
 
-# ─── Detecção de Idioma ───────────────────────────────────────────────────────
+def guess_title_language(title: str | None) -> str | None:
+    """Palpite barato do idioma de um título pela contagem de palavras funcionais."""
+    if not title or title in WEAK_TITLE_VALUES:
+        return None
+    title_words = {word.strip(".,!?;:\"'()[]|-").lower() for word in title.split()}
+    language_scores = {lang: len(title_words & hint_words) for lang, hint_words in LANGUAGE_HINT_WORDS.items()}
+    best_language = max(language_scores, key=language_scores.get)
+    if language_scores[best_language] == 0 or list(language_scores.values()).count(language_scores[best_language]) > 1:
+        return None
+    return best_language
+
+
+def infer_info_language(info_dict: dict) -> str | None:
+    """Idioma falado de um vídeo a partir do info dict: campo `language` ou trilha ASR `xx-orig`."""
+    info_language = normalize_language_code(info_dict.get("language"))
+    if info_language:
+        return info_language
+    for lang_key in info_dict.get("automatic_captions") or ():
+        if lang_key.endswith("-orig"):
+            return normalize_language_code(lang_key)
+    return None
+
 
-def detect_language(yt_dlp_cmd_list: list[str], cookie_args_list: list[str], channel_url: str, cached_lang: str | None = None) -> str:
+def detect_language(channel_state: "ChannelState", cached_lang: str | None = None) -> tuple[str, bool]:
     """
-    Detecta o idioma predominante do canal. 
+    Define o idioma predominante do canal sem novas chamadas ao yt-dlp.
     Se cached_lang for fornecido, usa ele imediatamente (Prioridade Local).
+    Caso contrário, vota com o que o state já tem: idiomas por vídeo vindos da
+    listagem, dos metadados colhidos e das trilhas baixadas (peso forte) e
+    palpites pelos títulos recentes da descoberta (peso fraco).
+
+    Retorna (filtro de idioma, confiável). O vencedor só é escolhido com folga
+    (LANGUAGE_MIN_VOTE_SHARE) e, se só houver palpites por título, com títulos
+    suficientes votando: um canal em outro idioma casa poucas palavras das
+    listas e não deve ser empurrado para pt/en/es. Sem confiança cai no
+    fallback, que não deve ser gravado como detected_language.
     """
     if cached_lang and cached_lang != "N/A":
         print_ok(f"Usando idioma em cache: {BOLD}{cached_lang.strip('^$')}{RESET}")
-        return cached_lang
+        return cached_lang, True
 
-    print_info("Detectando idioma nativo (amostragem de 5 vídeos)...")
-    
     # 1. Carregar Idioma default do .env caso exista (Fallback Máximo)
     global_default_lang = os.getenv("DEFAULT_LANGUAGE") or os.getenv("LANG") or "pt"
     if global_default_lang and len(global_default_lang) > 2:
         global_default_lang = global_default_lang[:2].lower() # Ex: 'pt_BR' -> 'pt'
 
-    # Ajustar URL para garantir que pegamos vídeos se for canal
-    detect_url = channel_url
-    if "watch?v=" not in detect_url and "playlist?list=" not in detect_url:
-        is_generic_channel = True
-        for suffix in ["/videos", "/shorts", "/streams", "/live"]:
-            if detect_url.endswith(suffix):
-                is_generic_channel = False
-                break
-        if is_generic_channel:
-            detect_url = detect_url.rstrip("/") + "/videos"
-
-    # Comando otimizado para pegar 5 idiomas rapidamente
-    # --flat-playlist é muito rápido mas nem sempre popula o campo 'language'
-    cmd = yt_dlp_cmd_list + cookie_args_list + [
-        "--print", "language",
-        "--playlist-end", "5",
-        "--ignore-errors",
-        "--flat-playlist", 
-        detect_url
-    ]
+    language_votes = Counter()
+    strong_votes_count = 0
+    sampled_titles_count = 0
+    guessed_titles_count = 0
+    for title_sample_idx, video_record in enumerate(channel_state):
+        video_language = video_record.get("language")
+        if video_language:
+            language_votes[video_language] += LANGUAGE_STRONG_VOTE_WEIGHT
+            strong_votes_count += 1
+        elif title_sample_idx < LANGUAGE_TITLE_SAMPLE_SIZE:
+            sampled_titles_count += 1
+            title_language = guess_title_language(video_record.get("title"))
+            if title_language:
+                language_votes[title_language] += 1
+                guessed_titles_count += 1
+
+    if language_votes:
+        clean_lang, vote_weight = language_votes.most_common(1)[0]
+        language_regex_filter = f"^{clean_lang}$"
+        vote_share = vote_weight / sum(language_votes.values())
+        title_coverage = guessed_titles_count / sampled_titles_count if sampled_titles_count else 0.0
+        if vote_share >= LANGUAGE_MIN_VOTE_SHARE and (strong_votes_count or title_coverage >= LANGUAGE_MIN_TITLE_COVERAGE):
+            print_ok(
+                f"Idioma inferido da listagem: {BOLD}{clean_lang}{RESET} "
+                f"{DIM}({vote_share:.0%} dos votos, {strong_votes_count} vídeos com idioma conhecido · filtro: {language_regex_filter}){RESET}"
+            )
+            return language_regex_filter, True
+        print_warn(
+            f"Votação de idioma inconclusiva: {BOLD}{clean_lang}{RESET} com {vote_share:.0%} dos votos, "
+            f"{title_coverage:.0%} dos títulos com palpite."
+        )
+
+    # Fallback final se nada for detectado com confiança (não é gravado no state)
+    print_warn(f"Não foi possível detectar o idioma. Assumindo fallback: {BOLD}{global_default_lang}{RESET}")
+    print_info(f"Dica: utilize {WHITE}--lang [código]{RESET} para forçar um idioma específico.")
+    return f"^{global_default_lang}$", False
+
+
+# ─── Codec JSON plugável ──────────────────────────────────────────────────────
 
-    detected_languages = []
+# Únicos campos lidos de cada linha do stream --flat-playlist
+DISCOVERY_FIELD_NAMES = (
+    "id", "title", "fulltitle", "upload_date", "timestamp", "language",
+    "channel_id", "playlist_channel_id", "playlist_index", "playlist_count",
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_json_backends():
+    """
+    Importa os codecs JSON opcionais (orjson, msgspec) uma única vez por processo.
+    Qualquer um deles pode faltar; o stdlib `json` é sempre o fallback.
+    """
     try:
-        # Tenta com flat-playlist primeiro (ultra-rápido)
-        subprocess_result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        detected_languages = [lang.strip().lower() for lang in subprocess_result.stdout.splitlines() if lang.strip()]
-        
-        if not detected_languages:
-            # Fallback sem --flat-playlist (mais lento, pois faz download de info parcial de cada um)
-            if "--flat-playlist" in cmd: cmd.remove("--flat-playlist")
-            if "--playlist-end" in cmd:
-                idx = cmd.index("--playlist-end")
-                cmd[idx + 1] = "3" # Reduz amostragem no fallback lento pra salvar tempo
-            
-            subprocess_result = subprocess.run(cmd, capture_output=True, text=True, timeout=25)
-            detected_languages = [lang.strip().lower() for lang in subprocess_result.stdout.splitlines() if lang.strip()]
-            
-        # Ignore invalid tags returned from yt-dlp when metadata is missing
-        invalid_tags = {"na", "n/a", "none", "null", "undefined"}
-        detected_languages = [l for l in detected_languages if l not in invalid_tags]
+        import orjson
+    except ImportError:
+        orjson = None
+    try:
+        import msgspec
+    except ImportError:
+        msgspec = None
+    return orjson, msgspec
 
-    except Exception as e:
-        print_warn(f"Erro na rotina de detecção automática: {e}")
 
-    if detected_languages:
-        # Pega o idioma mais comum na amostra
-        most_common_lang, count = Counter(detected_languages).most_common(1)[0]
-        # Sanitizar para 2 caracteres (ex: pt-BR -> pt)
-        clean_lang = most_common_lang.split("-")[0].split("_")[0]
-        language_regex_filter = f"^{clean_lang}$"
-        
-        print_ok(f"Idioma detectado ({count}/{len(detected_languages)}): {BOLD}{clean_lang}{RESET} {DIM}(filtro: {language_regex_filter}){RESET}")
-        return language_regex_filter
+class JsonCodec:
+    """
+    Serializador único de todos os pontos de leitura/escrita JSON do script.
+
+    Backend por ordem de preferência: orjson → msgspec → json (stdlib), ou o
+    forçado via ESCRIBA_JSON_BACKEND. `compact_output=True` (--compact-state)
+    grava o state sem indentação. A saída indentada é a mesma em todos os
+    backends (4 espaços, layout do stdlib), então trocar de host com/sem orjson
+    não reescreve o escriba_*.json inteiro; só o --compact-state muda o layout. O stream de descoberta é decodificado
+    parcialmente (só `DISCOVERY_FIELD_NAMES`) quando o msgspec está disponível.
+    """
 
-    # Fallback final se nada for detectado
-    print_warn(f"Não foi possível detectar o idioma. Assumindo fallback: {BOLD}{global_default_lang}{RESET}")
-    print_info(f"Dica: utilize {WHITE}--lang [código]{RESET} para forçar um idioma específico.")
-    return f"^{global_default_lang}$"
+    def __init__(self, compact_output: bool = False, backend_name: str | None = None):
+        self.compact_output = compact_output
+        orjson, msgspec = _load_json_backends()
+        available_backends = {"orjson": orjson, "msgspec": msgspec, "json": json}
+        requested_backend = (backend_name or os.getenv("ESCRIBA_JSON_BACKEND") or "").lower()
+        if available_backends.get(requested_backend) is None:
+            requested_backend = next(name for name in ("orjson", "msgspec", "json") if available_backends[name])
+        self.backend_name = requested_backend
+        self._backend = available_backends[requested_backend]
+        self._discovery_decoder = None
+        if msgspec is not None:
+            discovery_entry_type = msgspec.defstruct(
+                "DiscoveryEntry", [(field_name, object, None) for field_name in DISCOVERY_FIELD_NAMES]
+            )
+            self._discovery_decoder = msgspec.json.Decoder(discovery_entry_type)
+
+    def loads(self, data: str | bytes):
+        if self.backend_name == "msgspec":
+            return self._backend.json.decode(data)
+        return self._backend.loads(data)
+
+    def dumps(self, obj, default=None, pretty: bool | None = None) -> bytes:
+        """Serializa para bytes UTF-8. `pretty=None` segue o modo compacto do codec."""
+        indent_output = (not self.compact_output) if pretty is None else pretty
+        if self.backend_name == "orjson":
+            if not indent_output:
+                return self._backend.dumps(obj, default=default)
+            # orjson só indenta com 2 espaços: reformatado para 4 pelo msgspec, ou pelo stdlib sem ele
+            msgspec = _load_json_backends()[1]
+            if msgspec is not None:
+                return msgspec.json.format(self._backend.dumps(obj, default=default), indent=4)
+        elif self.backend_name == "msgspec":
+            encoded_bytes = self._backend.json.encode(obj, enc_hook=default)
+            return self._backend.json.format(encoded_bytes, indent=4) if indent_output else encoded_bytes
+        return json.dumps(
+            obj, default=default, ensure_ascii=False,
+            indent=4 if indent_output else None, separators=None if indent_output else (",", ":"),
+        ).encode("utf-8")
+
+    def load_path(self, file_path: Path):
+        with open(file_path, "rb") as file_descriptor:
+            return self.loads(file_descriptor.read())
+
+    def dump_path(self, obj, file_path: Path, default=None) -> None:
+        with open(file_path, "wb") as file_descriptor:
+            file_descriptor.write(self.dumps(obj, default=default))
+
+    def decode_discovery_entry(self, line_content: str | bytes) -> dict:
+        """Decodifica uma linha do --flat-playlist retornando apenas os campos usados."""
+        if self._discovery_decoder is not None:
+            entry = self._discovery_decoder.decode(line_content)
+            return {field_name: getattr(entry, field_name) for field_name in DISCOVERY_FIELD_NAMES}
+        obj = self.loads(line_content)
+        return {field_name: obj.get(field_name) for field_name in DISCOVERY_FIELD_NAMES}
+
+
+JSON_CODEC = JsonCodec()
+
+
+# ─── Feed de Uploads (pré-checagem de novidades) ──────────────────────────────
+
+UPLOADS_FEED_BASE_URL = "https://www.youtube.com/feeds/videos.xml"
+UPLOADS_FEED_NAMESPACES = {"atom": "http://www.w3.org/2005/Atom", "yt": "http://www.youtube.com/xml/schemas/2015"}
+CHANNEL_ID_REGEX_PATTERN = re.compile(r"^UC[A-Za-z0-9_-]{22}$")
+FULL_RESYNC_INTERVAL_DAYS = 7.0  # listagem completa periódica mesmo sem novidades no feed
+
+
+class UploadsFeedEntry(NamedTuple):
+    video_id: str
+    title: str
+    publish_date: str
+
+
+class UploadsFeedClient(abc.ABC):
+    """
+    Interface do feed de uploads: devolve as entradas mais recentes de um canal
+    ou playlist, ou None quando o feed está indisponível (o chamador então cai
+    na listagem completa via yt-dlp).
+    """
+
+    @abc.abstractmethod
+    def fetch_latest(self, channel_id: str | None = None, playlist_id: str | None = None) -> list[UploadsFeedEntry] | None:
+        ...
+
+
+class YouTubeRssFeedClient(UploadsFeedClient):
+    """
+    Feed Atom público do YouTube (~15 uploads mais recentes, uma requisição HTTP).
+    `base_url` (ou ESCRIBA_FEED_BASE_URL) permite apontar para um servidor local de teste.
+    """
+
+    def __init__(self, base_url: str | None = None, http_session: requests.Session | None = None, timeout_s: float = 10):
+        self.base_url = base_url or os.getenv("ESCRIBA_FEED_BASE_URL") or UPLOADS_FEED_BASE_URL
+        self.http_session = http_session
+        self.timeout_s = timeout_s
+
+    def fetch_latest(self, channel_id: str | None = None, playlist_id: str | None = None) -> list[UploadsFeedEntry] | None:
+        if playlist_id:
+            query_params = {"playlist_id": playlist_id}
+        elif channel_id:
+            query_params = {"channel_id": channel_id}
+        else:
+            return None
+        try:
+            response = (self.http_session or requests).get(self.base_url, params=query_params, timeout=self.timeout_s)
+            if response.status_code != 200:
+                return None
+            return parse_uploads_feed(response.content)
+        except (requests.RequestException, ElementTree.ParseError):
+            return None
+
+
+def parse_uploads_feed(feed_xml: str | bytes) -> list[UploadsFeedEntry]:
+    """Extrai (video_id, título, data) de cada <entry> do feed Atom, na ordem do feed."""
+    feed_root = ElementTree.fromstring(feed_xml)
+    entries_list = []
+    for entry_element in feed_root.iterfind("atom:entry", UPLOADS_FEED_NAMESPACES):
+        video_id = entry_element.findtext("yt:videoId", "", UPLOADS_FEED_NAMESPACES).strip()
+        if not video_id:
+            continue
+        published_string = entry_element.findtext("atom:published", "", UPLOADS_FEED_NAMESPACES)
+        entries_list.append(UploadsFeedEntry(
+            video_id,
+            (entry_element.findtext("atom:title", "", UPLOADS_FEED_NAMESPACES) or "N/A").strip(),
+            published_string[:10] if len(published_string) >= 10 else "N/A",
+        ))
+    return entries_list
+
+
+# ─── Trava entre Processos ───────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=1)
+def _load_fcntl():
+    """`fcntl` só existe em Unix; sem ele as travas viram no-op (o merge no save continua valendo)."""
+    try:
+        import fcntl
+        return fcntl
+    except ImportError:
+        return None
+
+
+class AdvisoryFileLock:
+    """
+    Trava exclusiva (flock) em `<arquivo>.lock`, para que processos do escriba
+    na mesma pasta (cron + execução manual, --regen-md + download) não
+    intercalem leitura e escrita do mesmo arquivo. O .lock nunca é apagado:
+    removê-lo abriria uma janela em que dois processos travam arquivos diferentes.
+    """
+
+    def __init__(self, target_path: Path):
+        self.lock_path = target_path.with_name(f"{target_path.name}.lock")
+        self._lock_descriptor = None
+
+    def __enter__(self) -> "AdvisoryFileLock":
+        fcntl = _load_fcntl()
+        if fcntl is not None:
+            self._lock_descriptor = open(self.lock_path, "a")
+            fcntl.flock(self._lock_descriptor.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._lock_descriptor is not None:
+            _load_fcntl().flock(self._lock_descriptor.fileno(), _load_fcntl().LOCK_UN)
+            self._lock_descriptor.close()
+            self._lock_descriptor = None
+
+
+def _file_signature(file_path: Path | None) -> tuple[int, int] | None:
+    """(mtime_ns, tamanho) do arquivo, ou None se não existe: detecta escrita de outro processo."""
+    try:
+        file_stat = file_path.stat()
+    except (OSError, AttributeError):
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
 
 
 # ─── Listagem de IDs e JSON State ───────────────────────────────────────────────
 
+_UNSET = object()  # Sentinela: campo ausente no registro (não é emitido no JSON)
+WEAK_TITLE_VALUES = ("N/A", "", "Avulso")
+
+
+class VideoRecord:
+    """
+    Registro compacto de um vídeo no state do canal (substitui o dict por vídeo).
+
+    Campos conhecidos vivem em `__slots__` e as flags de status são empacotadas em
+    um único int (bits de valor + bits de presença), sem repetir chaves string em
+    cada registro. Chaves desconhecidas vão para `extra_dict`, então o schema do
+    `escriba_*.json` é preservado sem perdas. A interface de dict usada pelo resto
+    do script (`get`, `[]`, `in`) continua valendo.
+    """
+
+    DEFAULT_FLAG_NAMES = ("subtitle_downloaded", "info_downloaded", "has_no_subtitle")
+    FLAG_NAMES = DEFAULT_FLAG_NAMES + ("audio_downloaded",)
+    FIELD_NAMES = (
+        "video_id", "publish_date", "title", "playlists", "duration_s",
+        "channel", "view_count", "channel_id", "uploader", "uploader_id",
+        "audio_path", "audio_size_bytes", "language",
+    )
+    _FIELD_NAME_SET = frozenset(FIELD_NAMES)
+    # Chaves com regra própria em `merge_from`; as demais só preenchem lacunas (`fill_missing_from`)
+    _MERGE_RULE_KEYS = frozenset(("video_id", "publish_date", "title", "playlists", "language") + FLAG_NAMES)
+    _FLAG_BITS = {flag_name: 1 << i for i, flag_name in enumerate(FLAG_NAMES)}
+    _PRESENCE_SHIFT = 16
+
+    __slots__ = FIELD_NAMES + ("_flag_bits", "extra_dict", "_state")
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.publish_date = self.title = self.playlists = self.duration_s = _UNSET
+        self.channel = self.view_count = self.channel_id = self.uploader = self.uploader_id = _UNSET
+        self.audio_path = self.audio_size_bytes = self.language = _UNSET
+        self._flag_bits = 0
+        self.extra_dict: dict | None = None
+        self._state: "ChannelState | None" = None
+
+    @classmethod
+    def create(cls, video_id: str, publish_date: str = "N/A", title: str = "N/A") -> "VideoRecord":
+        """Novo vídeo descoberto: flags padrão presentes e desligadas."""
+        record = cls(video_id)
+        record.publish_date = publish_date
+        record.title = title
+        for flag_name in cls.DEFAULT_FLAG_NAMES:
+            record[flag_name] = False
+        return record
+
+    @classmethod
+    def from_dict(cls, data: dict, video_id: str | None = None) -> "VideoRecord":
+        record = cls(video_id or data.get("video_id") or data.get("id"))
+        flag_bits_map, field_name_set, presence_shift = cls._FLAG_BITS, cls._FIELD_NAME_SET, cls._PRESENCE_SHIFT
+        flag_bits = 0
+        for key, value in data.items():
+            bit = flag_bits_map.get(key)
+            if bit is not None:
+                flag_bits |= (bit << presence_shift) | (bit if value else 0)
+            elif key in field_name_set:
+                if key != "video_id":
+                    setattr(record, key, value)
+            else:
+                if record.extra_dict is None:
+                    record.extra_dict = {}
+                record.extra_dict[key] = value
+        record._flag_bits = flag_bits
+        return record
+
+    def to_dict(self) -> dict:
+        """Reconstrói o dict no schema do JSON em disco (apenas campos presentes)."""
+        output_dict = {"video_id": self.video_id}
+        for field_name in ("publish_date", "title"):
+            value = getattr(self, field_name)
+            if value is not _UNSET:
+                output_dict[field_name] = value
+        for flag_name, bit in self._FLAG_BITS.items():
+            if self._flag_bits & (bit << self._PRESENCE_SHIFT):
+                output_dict[flag_name] = bool(self._flag_bits & bit)
+        for field_name in self.FIELD_NAMES[3:]:
+            value = getattr(self, field_name)
+            if value is not _UNSET:
+                output_dict[field_name] = value
+        if self.extra_dict:
+            output_dict.update(self.extra_dict)
+        return output_dict
+
+    # ── Interface de dict ─────────────────────────────────────────────────
+    def __getitem__(self, key: str):
+        bit = self._FLAG_BITS.get(key)
+        if bit is not None:
+            if not self._flag_bits & (bit << self._PRESENCE_SHIFT):
+                raise KeyError(key)
+            return bool(self._flag_bits & bit)
+        if key in self._FIELD_NAME_SET:
+            value = getattr(self, key)
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        if self.extra_dict is None:
+            raise KeyError(key)
+        return self.extra_dict[key]
+
+    def __setitem__(self, key: str, value) -> None:
+        owner_state = self._state
+        if owner_state is not None:
+            old_value = self.get(key)
+        bit = self._FLAG_BITS.get(key)
+        if bit is not None:
+            presence_bits = self._flag_bits | (bit << self._PRESENCE_SHIFT)
+            self._flag_bits = (presence_bits | bit) if value else (presence_bits & ~bit)
+        elif key in self._FIELD_NAME_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra_dict is None:
+                self.extra_dict = {}
+            self.extra_dict[key] = value
+        if owner_state is not None:
+            owner_state._on_record_change(self, key, old_value, value)
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({self.to_dict()!r})"
+
+    def merge_from(self, other) -> None:
+        """
+        Combina dados de outra fonte (record ou dict) neste registro. Prioriza:
+        1. Datas válidas (formato YYYY-MM-DD vs "N/A")
+        2. Títulos reais (evita "Avulso" ou strings vazias)
+        3. Flags de download verdadeiras (quem tem True vence)
+        4. União das playlists
+        5. Idioma do vídeo (quando ainda desconhecido)
+        """
+        other_date = other.get("publish_date")
+        if other_date and other_date != "N/A" and self.get("publish_date") in (None, "", "N/A"):
+            self["publish_date"] = other_date
+        other_title = other.get("title")
+        if other_title and other_title not in WEAK_TITLE_VALUES and self.get("title") in (None,) + WEAK_TITLE_VALUES:
+            self["title"] = other_title
+        for flag_name in self.FLAG_NAMES:
+            if other.get(flag_name) and not self.get(flag_name):
+                self[flag_name] = True
+        other_playlists = other.get("playlists")
+        if other_playlists:
+            current_playlists = self.get("playlists") or []
+            missing_playlists = [p for p in other_playlists if p not in current_playlists]
+            if missing_playlists:
+                self["playlists"] = current_playlists + missing_playlists
+        other_language = other.get("language")
+        if other_language and not self.get("language"):
+            self["language"] = other_language
+
+    def fill_missing_from(self, other) -> None:
+        """
+        Completa os campos sem regra em `merge_from` (metadados colhidos, audio_*,
+        chaves extras) com os valores de outra fonte, só onde aqui estão ausentes
+        ou vazios. Usado quando a outra fonte é uma gravação do mesmo vídeo por
+        outro host/processo, não uma listagem.
+        """
+        other_dict = other.to_dict() if isinstance(other, VideoRecord) else other
+        for key, other_value in other_dict.items():
+            if key in self._MERGE_RULE_KEYS or other_value in (None, "", "N/A"):
+                continue
+            if self.get(key) in (None, "", "N/A"):
+                self[key] = other_value
+
+
+def _json_default(value):
+    """Hook de `default` do JsonCodec: serializa VideoRecord no schema do JSON em disco."""
+    if isinstance(value, VideoRecord):
+        return value.to_dict()
+    raise TypeError(f"Objeto não serializável: {type(value).__name__}")
+
+
+CHANNEL_STATE_HEADER_KEYS = (
+    "channel", "videos", "detected_language", "subtitle_track", "channel_id", "last_full_sync", "discovery_cursor",
+)
+
+
+class ChannelState:
+    """
+    State em memória de um canal (conteúdo do `escriba_*.json`).
+
+    Mantém os registros na ordem do arquivo, um índice `video_id → VideoRecord`,
+    contadores por flag atualizados a cada mutação (via `VideoRecord.__setitem__`)
+    e o conjunto de IDs sujos desde o último flush. Buscas, contadores e decisões
+    de flush custam O(1) ou O(sujos), sem varrer a lista inteira.
+    """
+
+    def __init__(self, json_path: Path | None = None, channel_handle: str | None = None, detected_language: str | None = None):
+        self.json_path = json_path
+        self.channel_handle = channel_handle
+        self.detected_language = detected_language
+        self.subtitle_track_dict: dict | None = None  # trilha de legenda escolhida para o canal
+        self.channel_id: str | None = None  # ID UC… do canal (feed de uploads)
+        self.last_full_sync: str | None = None  # ISO da última listagem completa do canal
+        self.discovery_cursor_dict: dict | None = None  # listagem em andamento/interrompida (ver DiscoveryCursor)
+        self.library_index: "LibraryIndex | None" = None  # índice global atualizado a cada save
+        self.shard_delta_path: Path | None = None  # --shard: registros alterados também vão para o delta do shard
+        self.disk_signature: tuple[int, int] | None = None  # arquivo como lido/gravado por último por este processo
+        self.header_extra_dict: dict = {}
+        self.records: list[VideoRecord] = []
+        self.flag_counts: Counter = Counter()
+        self.dirty_ids: set[str] = set()
+        self.header_dirty = False
+        self._index: dict[str, VideoRecord] = {}
+
+    @classmethod
+    def from_json_data(cls, json_path: Path | None, json_data) -> "ChannelState":
+        """Monta o state a partir do JSON em disco (formato dict moderno ou lista legada)."""
+        channel_state = cls(json_path)
+        channel_state.disk_signature = _file_signature(json_path)
+        v_list = json_data
+        if isinstance(json_data, dict):
+            channel_state.channel_handle = json_data.get("channel")
+            channel_state.detected_language = json_data.get("detected_language")
+            channel_state.subtitle_track_dict = json_data.get("subtitle_track")
+            channel_state.channel_id = json_data.get("channel_id")
+            channel_state.last_full_sync = json_data.get("last_full_sync")
+            channel_state.discovery_cursor_dict = json_data.get("discovery_cursor")
+            channel_state.header_extra_dict = {
+                key: value for key, value in json_data.items()
+                if key not in CHANNEL_STATE_HEADER_KEYS
+            }
+            v_list = json_data.get("videos", [])
+        if isinstance(v_list, list):
+            for v in v_list:
+                vid_id = v.get("video_id") or v.get("id")
+                if vid_id:
+                    channel_state.add(VideoRecord.from_dict(v, vid_id), mark_dirty=False)
+        return channel_state
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[VideoRecord]:
+        return iter(self.records)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._index
+
+    def __repr__(self) -> str:
+        json_name = self.json_path.name if self.json_path else "sem JSON"
+        return f"ChannelState({json_name}, {len(self.records)} vídeos)"
+
+    def get(self, video_id: str) -> VideoRecord | None:
+        return self._index.get(video_id)
+
+    def add(self, record: VideoRecord, mark_dirty: bool = True) -> VideoRecord:
+        """Indexa um registro novo ou funde-o no existente. Retorna o registro indexado."""
+        existing = self._index.get(record.video_id)
+        if existing is not None:
+            if existing is not record:
+                existing.merge_from(record)
+            return existing
+        record._state = self
+        self._index[record.video_id] = record
+        self.records.append(record)
+        for flag_name in VideoRecord.FLAG_NAMES:
+            if record.get(flag_name):
+                self.flag_counts[flag_name] += 1
+        if mark_dirty:
+            self.dirty_ids.add(record.video_id)
+        return record
+
+    def merge_discovered(self, discovered_records_list: list[VideoRecord], playlist_ctx: str | None = None) -> int:
+        """Integra a listagem do YouTube: funde os conhecidos e adiciona os novos. Retorna quantos são novos."""
+        new_videos_count = 0
+        for vid_entry in discovered_records_list:
+            existing = self.get(vid_entry["video_id"])
+            
+            if existing is not None:
+                # Já existe: atualizar metadados se os atuais forem fracos
+                existing.merge_from(vid_entry)
+                
+                # Mesclar playlists
+                if playlist_ctx:
+                    existing.merge_from({"playlists": [playlist_ctx]})
+            else:
+                # Novo vídeo
+                if playlist_ctx: vid_entry["playlists"] = [playlist_ctx]
+                self.add(vid_entry)
+                new_videos_count += 1
+        return new_videos_count
+
+    def _on_record_change(self, record: VideoRecord, key: str, old_value, new_value) -> None:
+        """Hook chamado por `VideoRecord.__setitem__`: ajusta contadores e marca sujo."""
+        if key in VideoRecord._FLAG_BITS:
+            old_value, new_value = bool(old_value), bool(new_value)
+            if old_value != new_value:
+                self.flag_counts[key] += 1 if new_value else -1
+        if old_value != new_value:
+            self.dirty_ids.add(record.video_id)
+
+    def set_detected_language(self, detected_language: str | None) -> None:
+        if detected_language and detected_language != self.detected_language:
+            self.detected_language = detected_language
+            self.header_dirty = True
+
+    def set_subtitle_track(self, subtitle_track_dict: dict) -> None:
+        if subtitle_track_dict != self.subtitle_track_dict:
+            self.subtitle_track_dict = subtitle_track_dict
+            self.header_dirty = True
+
+    def set_channel_id(self, channel_id: str | None) -> None:
+        if channel_id and CHANNEL_ID_REGEX_PATTERN.match(channel_id) and channel_id != self.channel_id:
+            self.channel_id = channel_id
+            self.header_dirty = True
+
+    def resolve_channel_id(self) -> str | None:
+        """ID UC… do canal: o do cabeçalho ou, na falta, o primeiro encontrado nos registros."""
+        if not self.channel_id:
+            for video_record in self.records:
+                record_channel_id = video_record.get("channel_id")
+                if record_channel_id and CHANNEL_ID_REGEX_PATTERN.match(record_channel_id):
+                    self.set_channel_id(record_channel_id)
+                    break
+        return self.channel_id
+
+    def set_discovery_cursor(self, discovery_cursor_dict: dict | None) -> None:
+        if discovery_cursor_dict != self.discovery_cursor_dict:
+            self.discovery_cursor_dict = discovery_cursor_dict
+            self.header_dirty = True
+
+    def mark_full_sync(self) -> None:
+        self.last_full_sync = datetime.now().isoformat(timespec="seconds")
+        self.header_dirty = True
+
+    def is_full_resync_due(self, resync_interval_days: float) -> bool:
+        if not self.last_full_sync:
+            return True
+        try:
+            elapsed_s = (datetime.now() - datetime.fromisoformat(self.last_full_sync)).total_seconds()
+        except ValueError:
+            return True
+        return elapsed_s >= resync_interval_days * 86400
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.dirty_ids) or self.header_dirty
+
+    def clear_dirty(self) -> None:
+        self.dirty_ids.clear()
+        self.header_dirty = False
+
+
+DISCOVERY_CHECKPOINT_EVERY = 500  # entradas da listagem entre dois checkpoints no state
+DISCOVERY_RESUME_OVERLAP = 100    # posições relidas ao retomar (absorve uploads/remoções no meio tempo)
+CHANNEL_ROOT_URL_REGEX_PATTERN = re.compile(r"^https?://(?:www\.)?youtube\.com/(?:@[^/?]+|channel/UC[A-Za-z0-9_-]{22})/?$")
+
+
+@dataclass
+class DiscoveryCursor:
+    """
+    Progresso de uma listagem --flat-playlist, persistido no cabeçalho do state
+    ("discovery_cursor") enquanto ela não termina. Só é retomável por posição
+    numa playlist única e ordenada (playlist do usuário ou de uploads UU…).
+    """
+    listing_url: str
+    last_index: int = 0
+    playlist_count: int | None = None
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    is_complete: bool = False
+
+    @classmethod
+    def from_dict(cls, cursor_dict: dict | None) -> "DiscoveryCursor | None":
+        if not isinstance(cursor_dict, dict) or not cursor_dict.get("listing_url"):
+            return None
+        return cls(
+            cursor_dict["listing_url"], int(cursor_dict.get("last_index") or 0),
+            cursor_dict.get("playlist_count"), cursor_dict.get("started_at") or "",
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "listing_url": self.listing_url, "last_index": self.last_index,
+            "playlist_count": self.playlist_count, "started_at": self.started_at,
+        }
+
+    def advance(self, playlist_index, playlist_count) -> None:
+        if isinstance(playlist_index, int) and playlist_index > self.last_index:
+            self.last_index = playlist_index
+        if isinstance(playlist_count, int):
+            self.playlist_count = playlist_count
+
+    @property
+    def playlist_items_string(self) -> str | None:
+        """
+        Faixas do --playlist-items para retomar: o topo (uploads novos desde a
+        interrupção empurram a lista para baixo) e do cursor em diante, com folga.
+        """
+        if "list=" not in self.listing_url or self.last_index <= 2 * DISCOVERY_RESUME_OVERLAP:
+            return None
+        return f"1:{DISCOVERY_RESUME_OVERLAP},{self.last_index - DISCOVERY_RESUME_OVERLAP}:"
+
+
+def resolve_listing_url(channel_url: str, channel_id: str | None) -> str:
+    """
+    URL efetivamente listada: a raiz de um canal vira a playlist de uploads
+    (UU…), que o yt-dlp percorre como lista única e ordenada (retomável por
+    posição), em vez de várias abas aninhadas. Demais URLs ficam como estão.
+    """
+    if channel_id and CHANNEL_ROOT_URL_REGEX_PATTERN.match(channel_url):
+        return f"https://www.youtube.com/playlist?list=UU{channel_id[2:]}"
+    return channel_url
+
+
 def get_video_exact_date(video_id: str, yt_dlp_cmd_list: list[str], cookie_args_list: list[str]) -> dict:
     """Extrai a data exata de um único vídeo (usado via ThreadPoolExecutor)."""
     cmd_list = yt_dlp_cmd_list + cookie_args_list + [
@@ -361,7 +1264,7 @@ def get_video_exact_date(video_id: str, yt_dlp_cmd_list: list[str], cookie_args_
     try:
         process_instance = subprocess.run(cmd_list, capture_output=True, text=True, timeout=30)
         if process_instance.stdout:
-            video_json_dict = json.loads(process_instance.stdout)
+            video_json_dict = JSON_CODEC.loads(process_instance.stdout)
             upload_date_string = video_json_dict.get("upload_date", "N/A")
             if upload_date_string and len(upload_date_string) == 8:
                 upload_date_string = f"{upload_date_string[:4]}-{upload_date_string[4:6]}-{upload_date_string[6:]}"
@@ -376,8 +1279,11 @@ def generate_fast_list_json(
     cookie_args_list: list[str],
     channel_url: str,
     max_workers_count: int = 40,
-    local_history_map: dict | None = None
-) -> list[dict]:
+    local_history_map: dict | None = None,
+    max_entries: int | None = None,
+    discovery_cursor: DiscoveryCursor | None = None,
+    checkpoint_callback=None,
+) -> list[VideoRecord]:
     """
     Novo mecanismo de descoberta de alta velocidade:
     
@@ -389,24 +1295,49 @@ def generate_fast_list_json(
     
     Fase 2 — Fallback paralelo (threads) acionado apenas para vídeos onde
              o campo 'upload_date' estiver ausente tanto no índice quanto no cache local.
+
+    `max_entries` limita a listagem aos N primeiros (mais recentes) via --playlist-end.
+
+    Com `discovery_cursor`, a listagem retoma de onde a anterior parou e o
+    cursor é avançado a cada entrada; `checkpoint_callback(lote)` recebe os
+    registros novos a cada DISCOVERY_CHECKPOINT_EVERY entradas, no fim e também
+    numa interrupção (Ctrl+C), para persistir o progresso. O cursor só é marcado
+    completo quando o yt-dlp termina com código 0.
     """
     print_info(f"Fase 1: Descoberta de IDs + Metadados ({BOLD}{channel_url}{RESET})...")
+    range_args_list = ["--playlist-end", str(max_entries)] if max_entries else []
+    if discovery_cursor is not None and discovery_cursor.playlist_items_string:
+        range_args_list = ["--playlist-items", discovery_cursor.playlist_items_string]
+        print_info(f"Retomando listagem interrompida a partir da posição {BOLD}{discovery_cursor.last_index}{RESET}...")
     discovery_cmd_list = yt_dlp_cmd_list + cookie_args_list + [
         "--flat-playlist",
         "--dump-json",
         "--ignore-errors",
         "--remote-components", "ejs:github",
+    ] + range_args_list + [
         channel_url
     ]
     
-    raw_video_list: list[dict] = []
+    discovered_records_list: list[VideoRecord] = []
+    checkpoint_start_idx = 0
+    has_dates_count = 0
+    is_playlist_url = "list=" in channel_url
+
+    def _checkpoint() -> None:
+        nonlocal checkpoint_start_idx
+        if checkpoint_callback is not None and checkpoint_start_idx < len(discovered_records_list):
+            checkpoint_callback(discovered_records_list[checkpoint_start_idx:])
+            checkpoint_start_idx = len(discovered_records_list)
+
+    discovery_process = None
     try:
+        # Stdout binário: as linhas vão direto (bytes) para o codec JSON
         discovery_process = subprocess.Popen(
-            discovery_cmd_list, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            discovery_cmd_list, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
         )
         for line_content in discovery_process.stdout:
             try:
-                obj = json.loads(line_content.strip())
+                obj = JSON_CODEC.decode_discovery_entry(line_content)
                 video_id = obj.get("id")
                 if not video_id:
                     continue
@@ -427,41 +1358,63 @@ def generate_fast_list_json(
                     if hist_entry.get("publish_date") and hist_entry["publish_date"] != "N/A":
                         publish_date = hist_entry["publish_date"]
 
-                raw_video_list.append({"id": video_id, "title": title, "publish_date": publish_date})
-                sys.stdout.write(
-                    f"\r  {ICON_WAIT}  {BCYAN}IDs encontrados: {len(raw_video_list)}{RESET}"
-                )
-                sys.stdout.flush()
+                video_record = VideoRecord.create(video_id, publish_date, title)
+                video_language = normalize_language_code(obj.get("language"))
+                if video_language:
+                    video_record["language"] = video_language
+                # Em playlists o playlist_channel_id é o dono da lista, não necessariamente do vídeo
+                video_channel_id = obj.get("channel_id") or (obj.get("playlist_channel_id") if not is_playlist_url else None)
+                if video_channel_id:
+                    video_record["channel_id"] = video_channel_id
+                discovered_records_list.append(video_record)
+                if publish_date != "N/A":
+                    has_dates_count += 1
+
+                if discovery_cursor is not None:
+                    discovery_cursor.advance(obj.get("playlist_index"), obj.get("playlist_count"))
+                if len(discovered_records_list) - checkpoint_start_idx >= DISCOVERY_CHECKPOINT_EVERY:
+                    _checkpoint()
+                CONSOLE.status(f"  {ICON_WAIT}  {BCYAN}IDs encontrados: {len(discovered_records_list)}{RESET}")
             except Exception:
                 continue
         discovery_process.wait()
+    except KeyboardInterrupt:
+        CONSOLE.end_status()
+        if discovery_process is not None:
+            discovery_process.kill()
+        _checkpoint()
+        raise
     except Exception as error_msg:
-        print()
+        CONSOLE.end_status()
         print_warn(f"Erro na descoberta: {error_msg}")
-        return []
+        _checkpoint()
+        return discovered_records_list
+
+    CONSOLE.end_status(f"  {ICON_WAIT}  {BCYAN}IDs encontrados: {len(discovered_records_list)}{RESET}")
+    _checkpoint()
+    CONSOLE.event(
+        "discovery_done", channel_url=channel_url, video_count=len(discovered_records_list),
+        dated_count=has_dates_count, return_code=discovery_process.returncode,
+    )
 
-    print()
+    if discovery_process.returncode != 0:
+        print_warn(
+            f"Listagem interrompida pelo yt-dlp (código {discovery_process.returncode}): "
+            f"{len(discovered_records_list)} IDs parciais, não tratada como completa."
+        )
+    elif discovery_cursor is not None and discovered_records_list:
+        discovery_cursor.is_complete = True
 
-    if not raw_video_list:
+    if not discovered_records_list:
         print_warn("Nenhum vídeo encontrado para mapear state JSON.")
         return []
 
-    has_dates_count = sum(1 for v in raw_video_list if v["publish_date"] != "N/A")
-    print_ok(f"Descoberta completa: {has_dates_count}/{len(raw_video_list)} com data no índice.")
+    completeness_label = "completa" if discovery_process.returncode == 0 else "parcial"
+    print_ok(f"Descoberta {completeness_label}: {has_dates_count}/{len(discovered_records_list)} com data no índice.")
     print_info(f"O restante terá seus metadados recuperados apenas se não estiverem no cache.")
 
-    # Montar lista final preservando a ordem original do flat-playlist
-    return [
-        {
-            "video_id": v["id"],
-            "publish_date": v["publish_date"],
-            "title": v["title"],
-            "subtitle_downloaded": False,
-            "info_downloaded": False,
-            "has_no_subtitle": False,
-        }
-        for v in raw_video_list
-    ]
+    # Lista final preserva a ordem original do flat-playlist
+    return discovered_records_list
 
 
 def get_latest_json_path(cwd_path: Path, channel_name_safe: str | None = None) -> Path | None:
@@ -481,7 +1434,7 @@ def get_latest_json_path(cwd_path: Path, channel_name_safe: str | None = None) -
         return None
     return Path(max(json_files_list, key=os.path.getmtime))
 
-def load_all_local_history(cwd_path: Path) -> dict[str, dict]:
+def load_all_local_history(cwd_path: Path) -> dict[str, VideoRecord]:
     """
     Escaneia recursivamente o diretório atual e subpastas (ex: 'audios/') em busca de 
     arquivos .json para consolidar dados de vídeos.
@@ -508,8 +1461,8 @@ def load_all_local_history(cwd_path: Path) -> dict[str, dict]:
                 # 1. Histórico consolidado
                 if jf.name.startswith(("escriba_", "lista_")):
                     try:
-                        with open(jf, "r", encoding="utf-8") as fd:
-                            json_data = json.load(fd)
+                        with open(jf, "rb") as fd:
+                            json_data = JSON_CODEC.loads(fd.read())
                             v_list = json_data["videos"] if isinstance(json_data, dict) and "videos" in json_data else json_data
                             if isinstance(v_list, list):
                                 for v in v_list:
@@ -524,8 +1477,8 @@ def load_all_local_history(cwd_path: Path) -> dict[str, dict]:
                 if match:
                     vid_id = match.group(1)
                     try:
-                        with open(jf, "r", encoding="utf-8") as fd:
-                            meta = json.load(fd)
+                        with open(jf, "rb") as fd:
+                            meta = JSON_CODEC.loads(fd.read())
                             if not isinstance(meta, dict): continue
                             
                             upload_date = meta.get("upload_date") or meta.get("publish_date") or meta.get("date")
@@ -553,28 +1506,100 @@ def load_all_local_history(cwd_path: Path) -> dict[str, dict]:
 def _merge_video_data(history_map: dict, vid_id: str, new_data: dict):
     """
     Combina dados de vídeos de múltiplas fontes (JSONs diferentes).
-    Prioriza:
-    1. Datas válidas (formato YYYY-MM-DD vs "N/A")
-    2. Títulos reais (evita "Avulso" ou strings vazias)
-    3. Flags de download verdadeiras (subtitle_downloaded, info_downloaded, etc)
+    A primeira ocorrência vira um VideoRecord (sem cópia intermediária de dict);
+    as seguintes são fundidas segundo as prioridades de `VideoRecord.merge_from`.
     """
-    if vid_id not in history_map:
-        history_map[vid_id] = new_data.copy()
+    existing = history_map.get(vid_id)
+    if existing is None:
+        history_map[vid_id] = VideoRecord.from_dict(new_data, vid_id)
     else:
-        existing = history_map[vid_id]
-        # Prioriza data válida
-        if new_data.get("publish_date") and new_data["publish_date"] != "N/A":
-            if not existing.get("publish_date") or existing["publish_date"] == "N/A":
-                existing["publish_date"] = new_data["publish_date"]
-        # Prioriza título real
-        if new_data.get("title") and new_data["title"] not in ("N/A", "", "Avulso"):
-            if not existing.get("title") or existing["title"] in ("N/A", "", "Avulso"):
-                existing["title"] = new_data["title"]
-        # Flags de download
-        if new_data.get("subtitle_downloaded"): existing["subtitle_downloaded"] = True
-        if new_data.get("info_downloaded"): existing["info_downloaded"] = True
-        if new_data.get("has_no_subtitle"): existing["has_no_subtitle"] = True
+        existing.merge_from(new_data)
+
+
+
+def check_uploads_feed(
+    channel_state: ChannelState,
+    channel_url: str,
+    uploads_feed_client: UploadsFeedClient | None,
+    resync_interval_days: float = FULL_RESYNC_INTERVAL_DAYS,
+) -> tuple[bool, list[VideoRecord]]:
+    """
+    Pré-checagem barata antes da listagem --flat-playlist: consulta o feed de
+    uploads (só os mais recentes) e decide se a listagem é necessária.
+    Retorna (listagem_necessária, registros_do_feed). A listagem só é dispensada
+    quando todos os IDs do feed já estão no state e a ressincronização periódica
+    não venceu; na dúvida (sem feed, sem ID do canal, erro HTTP) ela é mantida.
+    """
+    if uploads_feed_client is None or not channel_state or "watch?v=" in channel_url or "youtu.be/" in channel_url:
+        return True, []
+    if channel_state.discovery_cursor_dict:
+        print_info("Listagem anterior incompleta: retomando antes de confiar no feed.")
+        return True, []
+    if channel_state.is_full_resync_due(resync_interval_days):
+        print_info(f"Ressincronização completa devida (última: {channel_state.last_full_sync or 'nunca'}).")
+        return True, []
+
+    playlist_match = re.search(r"list=([A-Za-z0-9_-]+)", channel_url)
+    playlist_id = playlist_match.group(1) if playlist_match else None
+    channel_id = None if playlist_id else channel_state.resolve_channel_id()
+    if not playlist_id and not channel_id:
+        return True, []
+
+    feed_entries_list = uploads_feed_client.fetch_latest(channel_id=channel_id, playlist_id=playlist_id)
+    if not feed_entries_list:
+        print_info("Feed de uploads indisponível: seguindo com a listagem completa.")
+        return True, []
+
+    feed_records_list = [
+        VideoRecord.create(feed_entry.video_id, feed_entry.publish_date, feed_entry.title)
+        for feed_entry in feed_entries_list
+    ]
+    missing_count = sum(1 for video_record in feed_records_list if video_record.video_id not in channel_state)
+    if missing_count:
+        print_info(f"Feed de uploads: {BOLD}{missing_count}{RESET} vídeo(s) fora do state, listando o canal.")
+        return True, feed_records_list
+    print_ok(f"Feed de uploads sem novidades ({len(feed_records_list)} recentes já no state): listagem dispensada.")
+    return False, feed_records_list
+
+
+def sync_channel_listing(
+    channel_state: ChannelState,
+    yt_dlp_cmd_list: list[str],
+    cookie_args_list: list[str],
+    channel_url: str,
+    playlist_ctx: str | None = None,
+    local_history_map: dict | None = None,
+) -> tuple[list[VideoRecord], int]:
+    """
+    Listagem completa e retomável do canal/playlist, integrada ao state.
+    Os vídeos entram no state e no disco a cada checkpoint, com o cursor no
+    cabeçalho (marca de sincronização parcial). Só uma listagem que termina
+    limpa remove o cursor e conta como sincronização completa.
+    Retorna (registros listados nesta execução, vídeos novos no state).
+    """
+    listing_url = resolve_listing_url(channel_url, channel_state.resolve_channel_id())
+    discovery_cursor = DiscoveryCursor.from_dict(channel_state.discovery_cursor_dict)
+    if discovery_cursor is None or discovery_cursor.listing_url != listing_url:
+        discovery_cursor = DiscoveryCursor(listing_url)
+    new_videos_count = 0
 
+    def _checkpoint(records_batch_list: list[VideoRecord]) -> None:
+        nonlocal new_videos_count
+        new_videos_count += channel_state.merge_discovered(records_batch_list, playlist_ctx)
+        channel_state.set_discovery_cursor(discovery_cursor.to_dict())
+        save_channel_state_json(channel_state)
+
+    discovered_records_list = generate_fast_list_json(
+        yt_dlp_cmd_list, cookie_args_list, listing_url, local_history_map=local_history_map,
+        discovery_cursor=discovery_cursor, checkpoint_callback=_checkpoint,
+    )
+    if discovery_cursor.is_complete:
+        channel_state.set_discovery_cursor(None)
+        channel_state.mark_full_sync()
+    else:
+        channel_state.set_discovery_cursor(discovery_cursor.to_dict())
+        print_warn("Listagem incompleta: progresso salvo no state, a próxima execução retoma deste ponto.")
+    return discovered_records_list, new_videos_count
 
 
 def load_or_create_channel_state(
@@ -582,8 +1607,13 @@ def load_or_create_channel_state(
     yt_dlp_cmd_list: list[str], 
     cookie_args_list: list[str], 
     channel_url: str,
-    only_peek_lang: bool = False
-) -> tuple[Path | None, list[dict], str | None]:
+    only_peek_lang: bool = False,
+    warm_channel_state: ChannelState | None = None,
+    discovery_limit: int | None = None,
+    uploads_feed_client: UploadsFeedClient | None = None,
+    resync_interval_days: float = FULL_RESYNC_INTERVAL_DAYS,
+    library_index: "LibraryIndex | None" = None,
+) -> ChannelState:
     """
     Carrega o banco de dados JSON do canal e sincroniza com metadados locais.
     Realiza:
@@ -591,7 +1621,43 @@ def load_or_create_channel_state(
     2. Listagem rápida do canal no YouTube.
     3. Importação Reversa: vídeos locais que pertencem ao canal mas não estão na lista atual.
     4. Persistência do estado consolidado.
+
+    Com `warm_channel_state` (modo --watch), o state já está em memória: não há
+    varredura do histórico local nem releitura do JSON, apenas a listagem dos
+    `discovery_limit` vídeos mais recentes integrada ao state existente.
+
+    Com `uploads_feed_client`, o feed de uploads é consultado antes da listagem
+    (ver `check_uploads_feed`) e a listagem é pulada quando não há novidades.
+
+    Com `library_index`, o dono de um vídeo/playlist avulso é resolvido pelo
+    índice global da biblioteca antes de qualquer varredura local ou rede, e o
+    state carregado passa a atualizar o índice a cada save.
     """
+    if warm_channel_state is not None:
+        # Sem feed (--full-sync) a listagem completa também segue o intervalo de ressincronização
+        is_full_resync_due = warm_channel_state.is_full_resync_due(resync_interval_days)
+        needs_discovery_flag, feed_records_list = check_uploads_feed(
+            warm_channel_state, channel_url, uploads_feed_client, resync_interval_days
+        )
+        if not needs_discovery_flag:
+            return warm_channel_state
+        playlist_match = re.search(r"list=([A-Za-z0-9_-]+)", channel_url)
+        playlist_ctx = playlist_match.group(1) if playlist_match else None
+        if is_full_resync_due or warm_channel_state.discovery_cursor_dict:
+            _, new_videos_count = sync_channel_listing(
+                warm_channel_state, yt_dlp_cmd_list, cookie_args_list, channel_url, playlist_ctx
+            )
+        else:
+            discovered_records_list = generate_fast_list_json(
+                yt_dlp_cmd_list, cookie_args_list, resolve_listing_url(channel_url, warm_channel_state.channel_id),
+                max_entries=discovery_limit,
+            )
+            new_videos_count = warm_channel_state.merge_discovered(discovered_records_list, playlist_ctx)
+        new_videos_count += warm_channel_state.merge_discovered(feed_records_list, playlist_ctx)
+        if new_videos_count > 0:
+            print_ok(f"Descobertos {BOLD}{new_videos_count}{RESET} novos vídeos na URL alvo.")
+        return warm_channel_state
+
     channel_name_safe = None
     identifier = ""
     
@@ -603,10 +1669,18 @@ def load_or_create_channel_state(
     if "watch?v=" in channel_url or "youtu.be/" in channel_url:
         match = re.search(r"(?:v=|youtu\.be/)([A-Za-z0-9_-]{11})", channel_url)
         identifier = match.group(1) if match else "video"
-        
+
+        # 0. Índice global da biblioteca (todas as pastas de canal, sem rede)
+        library_match = library_index.lookup_video(identifier) if library_index else None
+        if library_match and library_match.get("channel_handle") not in (None, "", "N/A"):
+            target_channel_id = library_match.get("channel_id")
+            target_uploader_id = library_match["channel_handle"]
+            channel_name_safe = target_uploader_id.lstrip("@")
+            print_ok(f"Origem identificada (índice da biblioteca): {BOLD}@{channel_name_safe}{RESET}  {DIM}{library_match['channel_dir']}/{RESET}")
+
         # 0. Verificação em cache local antes de chamar o YouTube
         history_map = load_all_local_history(cwd_path)
-        if identifier in history_map:
+        if not channel_name_safe and identifier in history_map:
             hist_entry = history_map[identifier]
             target_uploader_id = hist_entry.get("uploader_id")
             target_channel_id = hist_entry.get("channel_id")
@@ -621,7 +1695,7 @@ def load_or_create_channel_state(
             try:
                 p = subprocess.run(meta_cmd, capture_output=True, text=True, timeout=15)
                 if p.stdout:
-                    video_meta = json.loads(p.stdout)
+                    video_meta = JSON_CODEC.loads(p.stdout)
                     target_uploader_id = video_meta.get("uploader_id")
                     target_channel_id = video_meta.get("channel_id")
                     
@@ -642,10 +1716,18 @@ def load_or_create_channel_state(
     elif "list=" in channel_url:
         match = re.search(r"list=([A-Za-z0-9_-]+)", channel_url)
         identifier = match.group(1) if match else "playlist"
-        
+
+        # 0. Índice global da biblioteca: consulta direta por playlist
+        library_match = library_index.lookup_playlist_owner(identifier) if library_index else None
+        if library_match and library_match.get("channel_handle") not in (None, "", "N/A"):
+            target_channel_id = library_match.get("channel_id")
+            target_uploader_id = library_match["channel_handle"]
+            channel_name_safe = target_uploader_id.lstrip("@")
+            print_ok(f"Dono da playlist identificado (índice da biblioteca): {BOLD}@{channel_name_safe}{RESET}")
+
         # 0. Verificação em cache local para playlists
         history_map = load_all_local_history(cwd_path)
-        for vid, entry in history_map.items():
+        for vid, entry in (history_map.items() if not channel_name_safe else ()):
             if "playlists" in entry and identifier in entry["playlists"]:
                 target_uploader_id = entry.get("uploader_id")
                 target_channel_id = entry.get("channel_id")
@@ -667,7 +1749,7 @@ def load_or_create_channel_state(
                 if p.stdout:
                     # O flat-playlist cospe um JSON por linha de saída
                     first_line = p.stdout.splitlines()[0]
-                    playlist_meta = json.loads(first_line)
+                    playlist_meta = JSON_CODEC.loads(first_line)
                     
                     target_uploader_id = playlist_meta.get("uploader_id")
                     target_channel_id = playlist_meta.get("channel_id")
@@ -712,47 +1794,49 @@ def load_or_create_channel_state(
         else:
             json_path = cwd_path / target_filename
 
-    # Carregar/Identificar idioma persistente
-    detected_lang_cached = None
+    # 1. Carregar o JSON alvo (se existir) uma única vez: idioma persistente + lista mestre
+    json_data = None
     if json_path and json_path.exists():
         try:
-            with open(json_path, "r", encoding="utf-8") as fd:
-                data = json.load(fd)
-                if isinstance(data, dict):
-                    detected_lang_cached = data.get("detected_language")
+            json_data = JSON_CODEC.load_path(json_path)
         except Exception: pass
 
     if only_peek_lang:
-        return json_path, [], detected_lang_cached
+        detected_lang_cached = json_data.get("detected_language") if isinstance(json_data, dict) else None
+        return ChannelState(json_path, detected_language=detected_lang_cached)
 
-    # 1. Carregar lista mestre do JSON alvo (se existir) para garantir preservação total
-    state_map: dict[str, dict] = {}
-    if json_path and json_path.exists():
-        try:
-            with open(json_path, "r", encoding="utf-8") as fd:
-                json_data = json.load(fd)
-                v_list = json_data["videos"] if isinstance(json_data, dict) and "videos" in json_data else json_data
-                if isinstance(v_list, list):
-                    for v in v_list:
-                        vid_id = v.get("video_id") or v.get("id")
-                        if vid_id:
-                            state_map[vid_id] = v
-            if state_map:
-                print_info(f"Base carregada: {BOLD}{len(state_map)}{RESET} vídeos preservados do banco de dados.")
-        except Exception: pass
+    channel_state = ChannelState.from_json_data(json_path, json_data or [])
+    if channel_state:
+        print_info(f"Base carregada: {BOLD}{len(channel_state)}{RESET} vídeos preservados do banco de dados.")
 
     # 2. Já carregamos history_map lá no início para identificação de canal
     
-    # 3. Buscar os vídeos da URL atual
-    current_videos_list = generate_fast_list_json(yt_dlp_cmd_list, cookie_args_list, channel_url, local_history_map=history_map)
-    if not current_videos_list and not state_map:
-        return None, [], detected_lang_cached
+    # 3. Buscar os vídeos da URL atual (pulado quando o feed de uploads não mostra novidades)
+    channel_state.set_channel_id(target_channel_id)
+    needs_discovery_flag, feed_records_list = check_uploads_feed(
+        channel_state, channel_url, uploads_feed_client, resync_interval_days
+    )
+    playlist_ctx = identifier if "list=" in channel_url else None
+    current_videos_list = []
+    new_videos_count = 0
+    if not needs_discovery_flag:
+        pass
+    elif "watch?v=" in channel_url or "youtu.be/" in channel_url:
+        current_videos_list = generate_fast_list_json(yt_dlp_cmd_list, cookie_args_list, channel_url, local_history_map=history_map)
+        new_videos_count = channel_state.merge_discovered(current_videos_list, playlist_ctx)
+    else:
+        # Listagem retomável: vídeos novos entram no state (e no disco) em checkpoints
+        current_videos_list, new_videos_count = sync_channel_listing(
+            channel_state, yt_dlp_cmd_list, cookie_args_list, channel_url, playlist_ctx, history_map
+        )
+        if current_videos_list and "list=" not in channel_url:
+            channel_state.set_channel_id(current_videos_list[0].get("channel_id"))
+    if not current_videos_list and not channel_state:
+        channel_state.json_path = None
+        return channel_state
 
     # 4. Integrar novos vídeos descobertos
-    new_videos_count = 0
     imported_count = 0
-    
-    playlist_ctx = identifier if "list=" in channel_url else None
 
     # Se ainda não temos os IDs de canal/uploader, tenta pegar do primeiro vídeo da lista atual
     if not target_channel_id and not target_uploader_id and current_videos_list:
@@ -762,36 +1846,13 @@ def load_or_create_channel_state(
             target_channel_id = history_map[v0_id].get("channel_id")
             target_uploader_id = history_map[v0_id].get("uploader_id")
 
-    playlist_ctx = identifier if "list=" in channel_url else None
-
-    # Adicionar vídeos da listagem atual do YouTube
-    for vid_entry in current_videos_list:
-        vid_id = vid_entry["video_id"]
-        
-        if vid_id in state_map:
-            # Já existe: atualizar metadados se os atuais forem fracos
-            existing = state_map[vid_id]
-            if vid_entry.get("publish_date") and vid_entry["publish_date"] != "N/A":
-                if not existing.get("publish_date") or existing["publish_date"] == "N/A":
-                    existing["publish_date"] = vid_entry["publish_date"]
-            if vid_entry.get("title") and vid_entry["title"] not in ("N/A", "", "Avulso"):
-                if not existing.get("title") or existing["title"] in ("N/A", "", "Avulso"):
-                    existing["title"] = vid_entry["title"]
-            
-            # Mesclar playlists
-            if playlist_ctx:
-                if "playlists" not in existing: existing["playlists"] = []
-                if playlist_ctx not in existing["playlists"]:
-                    existing["playlists"].append(playlist_ctx)
-        else:
-            # Novo vídeo
-            if playlist_ctx: vid_entry["playlists"] = [playlist_ctx]
-            state_map[vid_id] = vid_entry
-            new_videos_count += 1
+    # Adicionar os vídeos do feed que a listagem atual ainda não mostre
+    if current_videos_list:
+        new_videos_count += channel_state.merge_discovered(feed_records_list, playlist_ctx)
 
     # 4. Importação Reversa: Vídeos que estão nos JSONs locais mas não apareceram na lista atual
     for vid_id, hist_entry in history_map.items():
-        if vid_id in state_map: continue
+        if vid_id in channel_state: continue
         
         # Heurística de importação por canal
         is_same_channel = False
@@ -800,92 +1861,117 @@ def load_or_create_channel_state(
         elif channel_name_safe and channel_name_safe.lower() in str(hist_entry.get("uploader", "")).lower(): is_same_channel = True
         
         if is_same_channel:
-            state_map[vid_id] = hist_entry.copy()
+            channel_state.add(hist_entry)
             imported_count += 1
 
-    final_results_list = list(state_map.values())
-    
     if new_videos_count > 0:
         print_ok(f"Descobertos {BOLD}{new_videos_count}{RESET} novos vídeos na URL alvo.")
     if imported_count > 0:
         print_ok(f"Importados {BOLD}{imported_count}{RESET} vídeos do histórico local.")
 
-    return json_path, final_results_list, detected_lang_cached
+    if library_index is not None:
+        channel_state.library_index = library_index
+        library_index.ensure_channel_synced(channel_state)
+
+    return channel_state
 
 
-def save_channel_state_json(json_path: Path | None, videos_list: list[dict], channel_handle: str | None = None, detected_language: str | None = None):
+def merge_concurrent_state_changes(channel_state: ChannelState, json_path: Path) -> int:
+    """
+    Se outro processo gravou o JSON depois da nossa última leitura/escrita,
+    funde o conteúdo em disco no state em memória antes de sobrescrevê-lo
+    (mesmas prioridades de `_merge_video_data`: flags verdadeiras, datas e
+    títulos válidos vencem; audio_*, duração, views etc. gravados pelo outro
+    processo preenchem as lacunas daqui). Campos de cabeçalho ausentes aqui vêm do disco.
+    Retorna quantos registros do disco foram fundidos.
+    """
+    disk_signature = _file_signature(json_path)
+    if disk_signature is None or disk_signature == channel_state.disk_signature:
+        return 0
+    try:
+        disk_state = ChannelState.from_json_data(json_path, JSON_CODEC.load_path(json_path))
+    except Exception as error_msg:
+        print_warn(f"State em disco ilegível para merge, sobrescrevendo: {error_msg}")
+        return 0
+    for video_record in disk_state.records:
+        # Registros só do disco já foram sincronizados pelo outro processo: não entram como sujos
+        merged_record = channel_state.add(video_record, mark_dirty=False)
+        if merged_record is not video_record:
+            merged_record.fill_missing_from(video_record)
+    for header_attribute in ("channel_handle", "detected_language", "subtitle_track_dict", "channel_id", "last_full_sync"):
+        if getattr(channel_state, header_attribute) is None and getattr(disk_state, header_attribute) is not None:
+            setattr(channel_state, header_attribute, getattr(disk_state, header_attribute))
+    for header_key, header_value in disk_state.header_extra_dict.items():
+        channel_state.header_extra_dict.setdefault(header_key, header_value)
+    return len(disk_state)
+
+
+def save_channel_state_json(channel_state: ChannelState, channel_handle: str | None = None, detected_language: str | None = None):
     """
     Atualiza atomicamente arquivo JSON em disco. 
-    Garante deduplicação de video_id e preservação do idioma detectado.
+    A unicidade de video_id é garantida pelo índice do ChannelState; o cabeçalho
+    (canal, idioma detectado, campos extras) vem do state carregado.
+    Sob a trava do arquivo, o JSON só é relido quando outro processo o alterou
+    desde a nossa última leitura/escrita (`merge_concurrent_state_changes`), e o
+    temporário é único por processo.
     """
+    json_path = channel_state.json_path
     if not json_path:
         return
-        
-    # 1. Deduplicação e mesclagem final antes de salvar
-    dedup_map = {}
-    for v in videos_list:
-        vid_id = v.get("video_id") or v.get("id")
-        if not vid_id: continue
-        if vid_id not in dedup_map:
-            dedup_map[vid_id] = v.copy()
-        else:
-            existing = dedup_map[vid_id]
-            # Mesclar flags binárias (quem tem True vence)
-            for flag in ["subtitle_downloaded", "info_downloaded", "has_no_subtitle"]:
-                if v.get(flag): existing[flag] = True
-            
-            # Mesclar strings se o atual for fraco
-            if v.get("publish_date") and v["publish_date"] != "N/A":
-                if not existing.get("publish_date") or existing["publish_date"] == "N/A":
-                    existing["publish_date"] = v["publish_date"]
-            if v.get("title") and v["title"] not in ("N/A", "Avulso", ""):
-                if not existing.get("title") or existing["title"] in ("N/A", "Avulso", ""):
-                    existing["title"] = v["title"]
-            
-            # Mesclar playlists
-            if "playlists" in v:
-                if "playlists" not in existing: existing["playlists"] = []
-                for p in v["playlists"]:
-                    if p not in existing["playlists"]: existing["playlists"].append(p)
 
-    final_videos = list(dedup_map.values())
+    # Force the path to strictly be the modern format if it isn't already
+    target_write_path = json_path
+    if json_path.name.startswith("lista_"):
+        target_write_path = json_path.with_name(json_path.name.replace("lista_", "escriba_"))
+
+    with AdvisoryFileLock(target_write_path):
+        merge_concurrent_state_changes(channel_state, target_write_path)
+        _write_channel_state_locked(channel_state, json_path, target_write_path, channel_handle, detected_language)
+
 
-    # 2. Determinar handle do canal
+def _write_channel_state_locked(
+    channel_state: ChannelState, json_path: Path, target_write_path: Path,
+    channel_handle: str | None, detected_language: str | None,
+) -> None:
+    """Monta e grava o JSON (chamado por `save_channel_state_json` com a trava já adquirida)."""
+    channel_state.set_detected_language(detected_language)
+
+    # Determinar handle do canal
     if not channel_handle:
         match = re.search(r"(?:escriba_|lista_)(.+)\.json", json_path.name)
         if match:
             channel_handle = f"@{match.group(1)}"
-            
+    channel_handle = channel_handle or channel_state.channel_handle or "N/A"
+    if channel_handle != "N/A":
+        channel_state.channel_handle = channel_handle
+
     output_data = {
-        "channel": channel_handle if channel_handle else "N/A",
-        "videos": final_videos
+        "channel": channel_handle,
+        "videos": channel_state.records,
     }
-    
-    if detected_language:
-        output_data["detected_language"] = detected_language
-
-    # Tenta preservar campos existentes se não passamos novos (ex: idioma)
-    if json_path.exists():
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                old_data = json.load(f)
-                if isinstance(old_data, dict):
-                    if not channel_handle:
-                        output_data["channel"] = old_data.get("channel", output_data["channel"])
-                    if not detected_language and "detected_language" in old_data:
-                        output_data["detected_language"] = old_data["detected_language"]
-        except: pass
-    
-    # Force the path to strictly be the modern format if it isn't already
-    target_write_path = json_path
-    if json_path.name.startswith("lista_"):
-        target_write_path = json_path.with_name(json_path.name.replace("lista_", "escriba_"))
-    
-    temp_path = target_write_path.with_suffix(".tmp")
+    if channel_state.detected_language:
+        output_data["detected_language"] = channel_state.detected_language
+    if channel_state.subtitle_track_dict:
+        output_data["subtitle_track"] = channel_state.subtitle_track_dict
+    if channel_state.channel_id:
+        output_data["channel_id"] = channel_state.channel_id
+    if channel_state.last_full_sync:
+        output_data["last_full_sync"] = channel_state.last_full_sync
+    if channel_state.discovery_cursor_dict:
+        output_data["discovery_cursor"] = channel_state.discovery_cursor_dict
+    output_data.update(channel_state.header_extra_dict)
+
+    temp_path = target_write_path.with_name(f"{target_write_path.name}.{os.getpid()}.tmp")
     try:
-        with open(temp_path, "w", encoding="utf-8") as file_descriptor:
-            json.dump(output_data, file_descriptor, indent=4, ensure_ascii=False)
+        JSON_CODEC.dump_path(output_data, temp_path, default=_json_default)
         temp_path.replace(target_write_path)
+        channel_state.disk_signature = _file_signature(target_write_path)
+        channel_state.json_path = target_write_path
+        if channel_state.library_index is not None:
+            channel_state.library_index.sync_channel_state(channel_state)
+        if channel_state.shard_delta_path is not None:
+            append_shard_delta(channel_state)
+        channel_state.clear_dirty()
         
         # Cleanup legacy file if migration occurred successfully
         if json_path.name.startswith("lista_") and json_path.exists():
@@ -895,10 +1981,10 @@ def save_channel_state_json(json_path: Path | None, videos_list: list[dict], cha
         print_warn(f"Ignorando erro ao salvar JSON de state: {e}")
 
 
-def auto_migrate_legacy_files(cwd_path: Path, state_list: list[dict]) -> bool:
+def auto_migrate_legacy_files(cwd_path: Path, channel_state: ChannelState) -> bool:
     """
     Se existirem arquivos texto antigos do projeto (historico.txt, historico-info.txt, videos_sem_legenda.txt),
-    lê e consolida os dados no state_list em memória, e depois os renomeia para .bak para não repetir.
+    lê e consolida os dados no ChannelState em memória, e depois os renomeia para .bak para não repetir.
     Retorna True se alguma modificação nos dicionários foi feita.
     """
     historico_ids = set()
@@ -927,22 +2013,18 @@ def auto_migrate_legacy_files(cwd_path: Path, state_list: list[dict]) -> bool:
     if not historico_ids and not info_ids and not no_sub_ids:
         return False
 
+    # Consulta pelo índice apenas os IDs citados nos logs, sem varrer o state inteiro
     migrated_count = 0
-    for item in state_list:
-        video_id = item.get("video_id")
-        if not video_id: continue
-
-        if video_id in historico_ids and not item.get("subtitle_downloaded"):
-            item["subtitle_downloaded"] = True
-            migrated_count += 1
-            
-        if video_id in info_ids and not item.get("info_downloaded"):
-            item["info_downloaded"] = True
-            migrated_count += 1
-            
-        if video_id in no_sub_ids and not item.get("has_no_subtitle"):
-            item["has_no_subtitle"] = True
-            migrated_count += 1
+    for flag_name, legacy_ids in (
+        ("subtitle_downloaded", historico_ids),
+        ("info_downloaded", info_ids),
+        ("has_no_subtitle", no_sub_ids),
+    ):
+        for video_id in legacy_ids:
+            item = channel_state.get(video_id)
+            if item is not None and not item.get(flag_name):
+                item[flag_name] = True
+                migrated_count += 1
 
     if historico_path.is_file(): historico_path.rename(historico_path.with_suffix(".txt.bak"))
     if info_path.is_file(): info_path.rename(info_path.with_suffix(".txt.bak"))
@@ -954,9 +2036,9 @@ def auto_migrate_legacy_files(cwd_path: Path, state_list: list[dict]) -> bool:
 
 
 def filter_state_list(
-    full_state_list: list[dict], 
+    full_state_list: list[VideoRecord], 
     date_limit_filter: str
-) -> list[dict]:
+) -> list[VideoRecord]:
     """
     Retorna a lista filtrada contendo apenas os ponteiros dos dicts onde os requisitos
     se encaixam no filtro de datas (se houver).
@@ -988,14 +2070,401 @@ def filter_state_list(
     return list(full_state_list)
 
 
+# ─── Índice Global da Biblioteca ──────────────────────────────────────────────
+
+LIBRARY_INDEX_FILENAME = "escriba_index.sqlite3"
+LIBRARY_INDEX_STATUS_FLAGS = ("subtitle_downloaded", "has_no_subtitle", "audio_downloaded")
+
+
+class LibraryIndex:
+    """
+    Índice global da biblioteca: um SQLite na raiz (acima das pastas de canal)
+    que mapeia video_id → pasta do canal, handle, status e playlists.
+
+    Cada `save_channel_state_json` aplica os registros sujos numa única
+    transação, então o índice acompanha todos os canais sem varrer JSONs. Dono
+    de um vídeo/playlist e "já baixei isso?" viram consultas locais, sem rede.
+    Qualquer erro do SQLite desativa o índice na sessão (o fluxo segue sem ele).
+
+    A tabela FTS5 `transcript_paragraphs` guarda um registro por parágrafo dos
+    .md gerados (vídeo, tópico, início em ms) e atende o --search. Colunas
+    UNINDEXED não filtram sem varrer a tabela inteira, então
+    `transcript_paragraph_rowids` mapeia (vídeo, canal) → rowids e a troca dos
+    parágrafos de um vídeo apaga por rowid.
+    """
+
+    SCHEMA_SQL = """
+        CREATE TABLE IF NOT EXISTS channels (
+            channel_dir TEXT PRIMARY KEY,
+            channel_handle TEXT,
+            channel_id TEXT,
+            json_name TEXT,
+            updated_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT NOT NULL,
+            channel_dir TEXT NOT NULL,
+            title TEXT,
+            publish_date TEXT,
+            subtitle_downloaded INTEGER NOT NULL DEFAULT 0,
+            has_no_subtitle INTEGER NOT NULL DEFAULT 0,
+            audio_downloaded INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (video_id, channel_dir)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS videos_by_channel_dir ON videos (channel_dir);
+        CREATE TABLE IF NOT EXISTS playlist_videos (
+            playlist_id TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            channel_dir TEXT NOT NULL,
+            PRIMARY KEY (playlist_id, video_id, channel_dir)
+        ) WITHOUT ROWID;
+    """
+    FTS_SCHEMA_SQL = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS transcript_paragraphs USING fts5(
+            text, segment_label,
+            video_id UNINDEXED, channel_dir UNINDEXED, md_name UNINDEXED, start_ms UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TABLE IF NOT EXISTS transcript_paragraph_rowids (
+            video_id TEXT NOT NULL,
+            channel_dir TEXT NOT NULL,
+            paragraph_rowid INTEGER NOT NULL,
+            PRIMARY KEY (video_id, channel_dir, paragraph_rowid)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, library_root_path: Path):
+        self.library_root_path = library_root_path
+        self.db_path = library_root_path / LIBRARY_INDEX_FILENAME
+        self._connection: sqlite3.Connection | None = None
+        self._is_disabled = False
+        self.has_fts = False
+
+    @classmethod
+    def locate(cls, cwd_path: Path, library_root_string: str | None = None) -> "LibraryIndex | None":
+        """
+        Raiz da biblioteca: --library-root / ESCRIBA_LIBRARY_ROOT (o índice é criado
+        ali se ainda não existir), senão o ancestral mais próximo que já tenha o
+        índice. Sem nenhum dos dois, None: nenhum SQLite é criado implicitamente.
+        """
+        library_root_string = library_root_string or os.getenv("ESCRIBA_LIBRARY_ROOT")
+        if library_root_string:
+            return cls(Path(library_root_string).expanduser().resolve())
+        for candidate_path in (cwd_path.resolve(), *cwd_path.resolve().parents):
+            if (candidate_path / LIBRARY_INDEX_FILENAME).exists():
+                return cls(candidate_path)
+        return None
+
+    @property
+    def connection(self) -> sqlite3.Connection | None:
+        if self._connection is None and not self._is_disabled:
+            try:
+                self._connection = sqlite3.connect(self.db_path, timeout=30)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute("PRAGMA synchronous=NORMAL")
+                self._connection.executescript(self.SCHEMA_SQL)
+            except sqlite3.Error as error_msg:
+                self._disable(error_msg)
+                return None
+            try:
+                has_rowid_map = self._connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'transcript_paragraph_rowids'"
+                ).fetchone() is not None
+                self._connection.executescript(self.FTS_SCHEMA_SQL)
+                self.has_fts = True
+                if not has_rowid_map:
+                    # Índice anterior ao mapa de rowids: uma varredura única preenche o mapa
+                    with self._connection:
+                        self._connection.execute(
+                            "INSERT OR IGNORE INTO transcript_paragraph_rowids (video_id, channel_dir, paragraph_rowid) "
+                            "SELECT video_id, channel_dir, rowid FROM transcript_paragraphs"
+                        )
+            except sqlite3.OperationalError:
+                pass  # SQLite sem FTS5: o índice de vídeos segue, só a busca fica indisponível
+        return self._connection
+
+    def _disable(self, error_msg) -> None:
+        print_warn(f"Índice da biblioteca desativado nesta sessão ({self.db_path.name}): {error_msg}")
+        self._is_disabled = True
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def channel_dir_key(self, channel_dir_path: Path) -> str:
+        """Chave da pasta do canal: relativa à raiz quando está dentro dela."""
+        channel_dir_path = channel_dir_path.resolve()
+        try:
+            return channel_dir_path.relative_to(self.library_root_path).as_posix()
+        except ValueError:
+            return channel_dir_path.as_posix()
+
+    def sync_channel_state(self, channel_state: "ChannelState", full_sync_flag: bool = False) -> None:
+        """
+        Aplica ao índice, numa transação, os registros sujos do state (ou todos).
+        Na sincronização completa o canal é espelhado: vídeos e vínculos de
+        playlist que não estão mais no state são removidos do índice.
+        """
+        if channel_state.json_path is None or self.connection is None:
+            return
+        channel_dir = self.channel_dir_key(channel_state.json_path.parent)
+        if full_sync_flag:
+            records_list = channel_state.records
+        else:
+            records_list = [channel_state.get(video_id) for video_id in channel_state.dirty_ids]
+            records_list = [video_record for video_record in records_list if video_record is not None]
+
+        video_rows_list = [
+            (video_record.video_id, channel_dir, video_record.get("title"), video_record.get("publish_date"))
+            + tuple(int(bool(video_record.get(flag_name))) for flag_name in LIBRARY_INDEX_STATUS_FLAGS)
+            for video_record in records_list
+        ]
+        playlist_rows_list = [
+            (playlist_id, video_record.video_id, channel_dir)
+            for video_record in records_list
+            for playlist_id in (video_record.get("playlists") or ())
+        ]
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO channels (channel_dir, channel_handle, channel_id, json_name, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (channel_dir) DO UPDATE SET "
+                    "channel_handle = excluded.channel_handle, channel_id = COALESCE(excluded.channel_id, channel_id), "
+                    "json_name = excluded.json_name, updated_at = excluded.updated_at",
+                    (
+                        channel_dir, channel_state.channel_handle, channel_state.channel_id,
+                        channel_state.json_path.name, datetime.now().isoformat(timespec="seconds"),
+                    ),
+                )
+                if full_sync_flag:
+                    self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS state_video_ids (video_id TEXT PRIMARY KEY)")
+                    self.connection.execute("DELETE FROM temp.state_video_ids")
+                    self.connection.executemany(
+                        "INSERT OR IGNORE INTO temp.state_video_ids (video_id) VALUES (?)",
+                        ((video_record.video_id,) for video_record in records_list),
+                    )
+                    self.connection.execute(
+                        "DELETE FROM videos WHERE channel_dir = ? AND video_id NOT IN (SELECT video_id FROM temp.state_video_ids)",
+                        (channel_dir,),
+                    )
+                    self.connection.execute("DELETE FROM playlist_videos WHERE channel_dir = ?", (channel_dir,))
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO videos (video_id, channel_dir, title, publish_date, "
+                    "subtitle_downloaded, has_no_subtitle, audio_downloaded) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    video_rows_list,
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO playlist_videos (playlist_id, video_id, channel_dir) VALUES (?, ?, ?)",
+                    playlist_rows_list,
+                )
+        except sqlite3.Error as error_msg:
+            self._disable(error_msg)
+
+    def ensure_channel_synced(self, channel_state: "ChannelState") -> None:
+        """Reindexa o canal inteiro quando o índice não bate com o state (primeira vez, edição manual)."""
+        if channel_state.json_path is None or self.connection is None:
+            return
+        try:
+            indexed_count = self.connection.execute(
+                "SELECT COUNT(*) FROM videos WHERE channel_dir = ?",
+                (self.channel_dir_key(channel_state.json_path.parent),),
+            ).fetchone()[0]
+        except sqlite3.Error as error_msg:
+            self._disable(error_msg)
+            return
+        if indexed_count != len(channel_state):
+            self.sync_channel_state(channel_state, full_sync_flag=True)
+
+    def _query_one(self, sql_string: str, params: tuple) -> dict | None:
+        if self.connection is None:
+            return None
+        try:
+            cursor = self.connection.execute(sql_string, params)
+            row = cursor.fetchone()
+        except sqlite3.Error as error_msg:
+            self._disable(error_msg)
+            return None
+        if row is None:
+            return None
+        return dict(zip((column[0] for column in cursor.description), row))
+
+    def lookup_video(self, video_id: str) -> dict | None:
+        """Onde o vídeo está catalogado (prefere a pasta que já tem a legenda) e seu status."""
+        return self._query_one(
+            "SELECT v.*, c.channel_handle, c.channel_id, c.json_name FROM videos v "
+            "JOIN channels c USING (channel_dir) WHERE v.video_id = ? "
+            "ORDER BY v.subtitle_downloaded DESC, v.audio_downloaded DESC LIMIT 1",
+            (video_id,),
+        )
+
+    def lookup_playlist_owner(self, playlist_id: str) -> dict | None:
+        """Canal que mais contém vídeos da playlist (dono presumido)."""
+        return self._query_one(
+            "SELECT c.*, COUNT(*) AS video_count FROM playlist_videos p "
+            "JOIN channels c USING (channel_dir) WHERE p.playlist_id = ? "
+            "GROUP BY p.channel_dir ORDER BY video_count DESC LIMIT 1",
+            (playlist_id,),
+        )
+
+    def index_transcript(self, video_id: str, md_path: Path, paragraph_list: "list[TranscriptParagraph]") -> None:
+        """Substitui, numa transação, os parágrafos indexados do vídeo pelos do .md recém-escrito."""
+        if self.connection is None or not self.has_fts:
+            return
+        channel_dir = self.channel_dir_key(md_path.parent)
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM transcript_paragraphs WHERE rowid IN (SELECT paragraph_rowid FROM "
+                    "transcript_paragraph_rowids WHERE video_id = ? AND channel_dir = ?)",
+                    (video_id, channel_dir),
+                )
+                self.connection.execute(
+                    "DELETE FROM transcript_paragraph_rowids WHERE video_id = ? AND channel_dir = ?", (video_id, channel_dir)
+                )
+                paragraph_rowids_list = []
+                for paragraph in paragraph_list:
+                    cursor = self.connection.execute(
+                        "INSERT INTO transcript_paragraphs (text, segment_label, video_id, channel_dir, md_name, start_ms) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (paragraph.text, paragraph.segment_label, video_id, channel_dir, md_path.name, paragraph.start_ms),
+                    )
+                    paragraph_rowids_list.append((video_id, channel_dir, cursor.lastrowid))
+                self.connection.executemany(
+                    "INSERT INTO transcript_paragraph_rowids (video_id, channel_dir, paragraph_rowid) VALUES (?, ?, ?)",
+                    paragraph_rowids_list,
+                )
+        except sqlite3.Error as error_msg:
+            self._disable(error_msg)
+
+    def search(self, query_string: str, limit: int = 20) -> list[dict]:
+        """
+        Busca ranqueada (bm25) nos parágrafos de toda a biblioteca. A consulta
+        aceita a sintaxe FTS5; se ela for inválida, os termos são buscados literalmente.
+        """
+        if self.connection is None or not self.has_fts:
+            return []
+        search_sql = (
+            "SELECT t.video_id, t.channel_dir, t.md_name, t.segment_label, t.start_ms, "
+            "snippet(transcript_paragraphs, 0, ?, ?, '…', 16) AS snippet, v.title, v.publish_date "
+            "FROM transcript_paragraphs t "
+            "LEFT JOIN videos v ON v.video_id = t.video_id AND v.channel_dir = t.channel_dir "
+            "WHERE transcript_paragraphs MATCH ? ORDER BY bm25(transcript_paragraphs, 1.0, 0.5) LIMIT ?"
+        )
+        literal_query_string = " ".join('"' + term.replace('"', '""') + '"' for term in query_string.split())
+        for match_query_string in (query_string, literal_query_string):
+            try:
+                cursor = self.connection.execute(search_sql, (BOLD, RESET, match_query_string, limit))
+                column_names = [column[0] for column in cursor.description]
+                return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+            except sqlite3.OperationalError:
+                continue
+        return []
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
 # ─── Pós-processamento de Legendas ────────────────────────────────────────────
 
 SUBTITLE_INDEX_REGEX_PATTERN = re.compile(r"^\d+$")
 SUBTITLE_TIMESTAMP_REGEX_PATTERN = re.compile(
     r"^\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}"
 )
+SUBTITLE_MARKUP_REGEX_PATTERN = re.compile(r"<[^>]+>")
+
+
+class RollupDeduplicator:
+    """
+    Motor de remoção de roll-up das legendas automáticas, em tempo linear.
+
+    Cada cue é normalizada uma única vez: tags removidas, tokens separados e
+    internados como IDs inteiros (minúsculos, sem pontuação de borda). Contra a
+    cue anterior, calcula em O(n + m) via função de falha do KMP:
+      - o maior sufixo da anterior que é prefixo da atual (roll-up de linhas);
+      - se a atual está inteiramente contida na anterior (cue repetida);
+    e, por varredura direta, o maior prefixo comum (cue que "cresce" palavra a
+    palavra). Apenas os tokens inéditos da cue atual são emitidos.
+    """
 
+    def __init__(self, min_overlap_tokens: int = 2, prefix_overlap_ratio: float = 0.5):
+        self.min_overlap_tokens = min_overlap_tokens
+        self.prefix_overlap_ratio = prefix_overlap_ratio
+        self._token_id_dict: dict[str, int] = {}
+        self._prev_token_ids: list[int] = []
+
+    def _intern_tokens(self, tokens: list[str]) -> list[int]:
+        token_id_dict = self._token_id_dict
+        return [token_id_dict.setdefault(token.lower().strip(".,!?;:\"'"), len(token_id_dict)) for token in tokens]
+
+    @staticmethod
+    def _suffix_prefix_overlap(prev_ids: list[int], cur_ids: list[int]) -> int:
+        """
+        Retorna o tamanho do maior sufixo de `prev_ids` que é prefixo de `cur_ids`,
+        ou -1 se `cur_ids` ocorre inteiro dentro de `prev_ids`.
+        """
+        pattern_len = len(cur_ids)
+        failure = [0] * pattern_len
+        matched = 0
+        for i in range(1, pattern_len):
+            while matched and cur_ids[i] != cur_ids[matched]:
+                matched = failure[matched - 1]
+            if cur_ids[i] == cur_ids[matched]:
+                matched += 1
+            failure[i] = matched
+
+        matched = 0
+        for token_id in prev_ids:
+            while matched and token_id != cur_ids[matched]:
+                matched = failure[matched - 1]
+            if token_id == cur_ids[matched]:
+                matched += 1
+                if matched == pattern_len:
+                    return -1
+        return matched
+
+    def feed(self, raw_text: str) -> str:
+        """Recebe o texto bruto de uma cue e retorna apenas a porção ainda não vista."""
+        tokens = SUBTITLE_MARKUP_REGEX_PATTERN.sub("", raw_text).split()
+        if not tokens:
+            return ""
+        cur_ids = self._intern_tokens(tokens)
+        prev_ids = self._prev_token_ids
+
+        if not prev_ids:
+            self._prev_token_ids = cur_ids
+            return " ".join(tokens)
+
+        overlap = self._suffix_prefix_overlap(prev_ids, cur_ids)
+        if overlap == -1:
+            # Cue repetida/contida: mantém a anterior (mais completa) como contexto
+            return ""
+        if overlap < self.min_overlap_tokens and overlap != len(prev_ids):
+            overlap = 0
+
+        common_prefix = 0
+        for prev_id, cur_id in zip(prev_ids, cur_ids):
+            if prev_id != cur_id:
+                break
+            common_prefix += 1
+        if common_prefix / len(cur_ids) > self.prefix_overlap_ratio:
+            overlap = max(overlap, common_prefix)
+
+        self._prev_token_ids = cur_ids
+        return " ".join(tokens[overlap:])
+
+
+class PassthroughCueCleaner:
+    """Limpeza de cues não cumulativas (json3): só remove marcação, sem dedup de roll-up."""
 
+    @staticmethod
+    def feed(raw_text: str) -> str:
+        return " ".join(SUBTITLE_MARKUP_REGEX_PATTERN.sub("", raw_text).split())
+
+
+def make_cue_cleaner(cue_source):
+    """Dedup de roll-up para fontes cumulativas (srt/vtt das legendas automáticas); passthrough nas demais."""
+    return RollupDeduplicator() if cue_source.has_rollup else PassthroughCueCleaner()
 
 
 
@@ -1037,9 +2506,10 @@ def _load_ml_deps():
         import numpy as np
         import nltk
         from nltk.corpus import stopwords as nltk_stopwords
-        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.feature_extraction import DictVectorizer
+        from sklearn.feature_extraction.text import TfidfTransformer
         from sklearn.metrics.pairwise import cosine_similarity
-        return pysrt, np, nltk, nltk_stopwords, TfidfVectorizer, cosine_similarity
+        return pysrt, np, nltk, nltk_stopwords, TfidfTransformer, cosine_similarity, DictVectorizer
     except ImportError:
         return None
 
@@ -1054,7 +2524,7 @@ def get_merged_stopwords(lang_code: str) -> frozenset:
     deps = _load_ml_deps()
     if deps is None:
         return frozenset()
-    _, _, nltk, nltk_stopwords, _, _ = deps
+    _, _, nltk, nltk_stopwords, _, _, _ = deps
 
     nltk_lang_map = {
         "pt": ("portuguese", ORAL_MARKERS_PT),
@@ -1076,348 +2546,650 @@ def get_merged_stopwords(lang_code: str) -> frozenset:
 
     return frozenset(base_stopwords | oral_markers)
 
+# ─── Motor MD em duas passadas (streaming) ───────────────────────────────────
+
+MD_TOKEN_REGEX_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+MD_SENTENCE_END_REGEX_PATTERN = re.compile(r'[.!?]["\']?\s*$')
+SRT_TIMESTAMP_REGEX_PATTERN = re.compile(r"(\d{2}):(\d{2}):(\d{2})[,.](\d{3})")
+VTT_TIMESTAMP_REGEX_PATTERN = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})")
+MD_PREVIEW_WORDS_COUNT = 12
+MD_TOPIC_LINE_REGEX_PATTERN = re.compile(r"^#### \[[\d:]+\] - Tópico: (.*)$")
+MD_PARAGRAPH_LINE_REGEX_PATTERN = re.compile(r"^\[(?:(\d+):)?(\d{2}):(\d{2})\] (.+)$")
+NATIVE_SUBTITLE_SUFFIXES = (".json3", ".vtt")
+SUBTITLE_FILE_SUFFIXES = (".srt",) + NATIVE_SUBTITLE_SUFFIXES
+SUBTITLE_LANG_SUFFIX_REGEX_PATTERN = re.compile(r"-([a-z]{2}(-[A-Z]{2})?)\.(?:srt|json3|vtt|md)$")
+MD_KEYWORD_MIN_LENGTH = 3
+
+
+class LanguagePipeline:
+    """
+    Pipeline de NLP de um idioma, montado uma única vez por processo (ou worker)
+    via `get_language_pipeline` e reusado em todas as conversões .srt → .md.
+
+    Guarda o que antes era resolvido a cada vídeo: dependências de ML, stopwords
+    (NLTK + marcadores orais), regexes pré-compiladas e a configuração do
+    TF-IDF. Por vídeo só resta o ajuste do vocabulário (que é do próprio vídeo).
+    """
+
+    TFIDF_PARAMS = {"norm": "l2", "use_idf": True, "smooth_idf": True, "sublinear_tf": False}
+
+    def __init__(self, lang_code: str):
+        _pysrt, self.np, _nltk, _nltk_sw, self._tfidf_transformer_cls, _cosine_similarity, self._dict_vectorizer_cls = _load_ml_deps()
+        self.lang_code = lang_code
+        self.stopwords = get_merged_stopwords(lang_code)
+        self.token_regex = MD_TOKEN_REGEX_PATTERN
+        self.sentence_end_regex = MD_SENTENCE_END_REGEX_PATTERN
+
+    def __repr__(self) -> str:
+        return f"LanguagePipeline({self.lang_code}, {len(self.stopwords)} stopwords)"
+
+    def tokenize(self, text: str) -> list[str]:
+        """Tokens (minúsculos, ≥2 caracteres) de um trecho de texto, stopwords incluídas."""
+        return self.token_regex.findall(text.lower())
+
+    def vectorize(self, term_counts_list: list[Counter]):
+        """
+        Ajusta o vocabulário e o TF-IDF às janelas de um vídeo numa única passada.
+        Retorna (matriz TF-IDF em CSR com linhas L2-normalizadas, vocabulário,
+        máscara booleana dos termos elegíveis como palavra-chave).
+        """
+        dict_vectorizer = self._dict_vectorizer_cls()
+        count_matrix = dict_vectorizer.fit_transform(term_counts_list)
+        tfidf_matrix = self._tfidf_transformer_cls(**self.TFIDF_PARAMS).fit_transform(count_matrix).tocsr()
+        feature_names = dict_vectorizer.feature_names_
+        keyword_mask = self.np.fromiter(
+            (len(word) >= MD_KEYWORD_MIN_LENGTH and word.isalpha() for word in feature_names),
+            dtype=bool, count=len(feature_names),
+        )
+        return tfidf_matrix, feature_names, keyword_mask
+
+    def top_keywords(self, tfidf_rows, feature_names: list[str], keyword_mask, top_n: int = 3) -> list[str]:
+        """Top-N termos elegíveis pela soma do TF-IDF das linhas (mesma ordem de desempate do argsort)."""
+        np = self.np
+        term_scores = np.asarray(tfidf_rows.sum(axis=0)).ravel()
+        ranked_indices = term_scores.argsort()[::-1]
+        eligible_indices = ranked_indices[keyword_mask[ranked_indices]][:top_n]
+        return [feature_names[i] for i in eligible_indices]
+
+
+@functools.lru_cache(maxsize=8)
+def get_language_pipeline(lang_code: str) -> LanguagePipeline:
+    """`LanguagePipeline` do idioma, criado na primeira conversão e reusado pelo processo."""
+    return LanguagePipeline(lang_code)
+
+
+class TranscriptCue(NamedTuple):
+    """Cue mínima consumida pelo motor MD: tempos em milissegundos e texto bruto."""
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+class SrtCueSource:
+    """
+    Fonte re-iterável de cues de um arquivo .srt.
+    Cada iteração relê o arquivo em streaming (`pysrt.stream`), sem manter os
+    itens do pysrt em memória entre as passadas do motor MD.
+    """
+
+    has_rollup = True
+
+    def __init__(self, srt_path: Path):
+        self.srt_path = srt_path
+
+    def __iter__(self) -> Iterator[TranscriptCue]:
+        pysrt = _load_ml_deps()[0]
+        with open(self.srt_path, "r", encoding="utf-8-sig", errors="replace") as file_descriptor:
+            for sub in pysrt.stream(file_descriptor):
+                yield TranscriptCue(sub.start.ordinal, sub.end.ordinal, sub.text)
+
+    def probe_duration_ms(self) -> int:
+        """Lê apenas a cauda do arquivo para achar o último timestamp (fim da última cue)."""
+        with open(self.srt_path, "rb") as file_descriptor:
+            file_descriptor.seek(0, os.SEEK_END)
+            file_descriptor.seek(max(0, file_descriptor.tell() - 4096))
+            tail_text = file_descriptor.read().decode("utf-8", errors="replace")
+        timestamp_matches = SRT_TIMESTAMP_REGEX_PATTERN.findall(tail_text)
+        if timestamp_matches:
+            h, m, s, ms = (int(part) for part in timestamp_matches[-1])
+            return ((h * 60 + m) * 60 + s) * 1000 + ms
+        return max((cue.end_ms for cue in self), default=0)
+
+
+class Json3CueSource:
+    """
+    Fonte de cues do formato nativo json3 do YouTube (`events` → `segs`).
+    Eventos sem texto (definições de janela, quebras `aAppend`) são ignorados.
+    O arquivo é parseado uma única vez: só as tuplas (início, fim, texto) ficam
+    em memória para a sondagem e as duas passadas. Os eventos não são
+    cumulativos, então dispensam o dedup de roll-up.
+    """
+
+    has_rollup = False
+
+    def __init__(self, json3_path: Path):
+        self.json3_path = json3_path
+        self._cue_tuples: list[tuple[int, int, str]] | None = None
+
+    def _load_cue_tuples(self) -> list[tuple[int, int, str]]:
+        if self._cue_tuples is None:
+            cue_tuples = []
+            for event in JSON_CODEC.load_path(self.json3_path).get("events") or ():
+                cue_text = "".join(seg.get("utf8", "") for seg in event.get("segs") or ()).strip()
+                if cue_text:
+                    start_ms = event.get("tStartMs", 0)
+                    cue_tuples.append((start_ms, start_ms + event.get("dDurationMs", 0), cue_text))
+            self._cue_tuples = cue_tuples
+        return self._cue_tuples
+
+    def __iter__(self) -> Iterator[TranscriptCue]:
+        for cue_tuple in self._load_cue_tuples():
+            yield TranscriptCue(*cue_tuple)
+
+    def probe_duration_ms(self) -> int:
+        return max((end_ms for _start_ms, end_ms, _cue_text in self._load_cue_tuples()), default=0)
+
+
+class VttCueSource:
+    """Fonte de cues de WebVTT, lida em streaming linha a linha (tags inline são mantidas para o dedup)."""
+
+    has_rollup = True
+
+    def __init__(self, vtt_path: Path):
+        self.vtt_path = vtt_path
+
+    @staticmethod
+    def _timestamp_ms(timestamp_match: re.Match) -> int:
+        h, m, s, ms = (int(part or 0) for part in timestamp_match.groups())
+        return ((h * 60 + m) * 60 + s) * 1000 + ms
+
+    def __iter__(self) -> Iterator[TranscriptCue]:
+        start_ms = end_ms = None
+        text_lines: list[str] = []
+        with open(self.vtt_path, "r", encoding="utf-8-sig", errors="replace") as file_descriptor:
+            for line in file_descriptor:
+                line = line.strip()
+                if "-->" in line:
+                    timestamp_matches = list(VTT_TIMESTAMP_REGEX_PATTERN.finditer(line))
+                    if len(timestamp_matches) >= 2:
+                        start_ms = self._timestamp_ms(timestamp_matches[0])
+                        end_ms = self._timestamp_ms(timestamp_matches[1])
+                        text_lines = []
+                elif line:
+                    if start_ms is not None:
+                        text_lines.append(line)
+                elif start_ms is not None:
+                    if text_lines:
+                        yield TranscriptCue(start_ms, end_ms, "\n".join(text_lines))
+                    start_ms = None
+        if start_ms is not None and text_lines:
+            yield TranscriptCue(start_ms, end_ms, "\n".join(text_lines))
+
+    def probe_duration_ms(self) -> int:
+        with open(self.vtt_path, "rb") as file_descriptor:
+            file_descriptor.seek(0, os.SEEK_END)
+            file_descriptor.seek(max(0, file_descriptor.tell() - 4096))
+            tail_text = file_descriptor.read().decode("utf-8", errors="replace")
+        arrow_lines = [line for line in tail_text.splitlines() if "-->" in line]
+        if arrow_lines:
+            timestamp_matches = list(VTT_TIMESTAMP_REGEX_PATTERN.finditer(arrow_lines[-1]))
+            if len(timestamp_matches) >= 2:
+                return self._timestamp_ms(timestamp_matches[1])
+        return max((cue.end_ms for cue in self), default=0)
+
+
+def open_cue_source(subtitle_path: Path):
+    """Escolhe a fonte de cues pelo formato do arquivo de legenda."""
+    if subtitle_path.suffix == ".json3":
+        return Json3CueSource(subtitle_path)
+    if subtitle_path.suffix == ".vtt":
+        return VttCueSource(subtitle_path)
+    return SrtCueSource(subtitle_path)
+
+
+def write_srt_from_cues(cue_source, srt_path: Path) -> Path:
+    """Grava as cues de qualquer fonte como .srt (usado por --keep-srt no modo --native-subs)."""
+    def _srt_timestamp(time_ms: int) -> str:
+        return f"{_format_ms_timestamp(time_ms, force_hours=True)},{time_ms % 1000:03d}"
+
+    temp_srt_path = srt_path.with_name(f"{srt_path.name}.{os.getpid()}.tmp")
+    with open(temp_srt_path, "w", encoding="utf-8") as file_descriptor:
+        for cue_index, cue in enumerate(cue_source, start=1):
+            file_descriptor.write(f"{cue_index}\n{_srt_timestamp(cue.start_ms)} --> {_srt_timestamp(cue.end_ms)}\n{cue.text}\n\n")
+    temp_srt_path.replace(srt_path)
+    return srt_path
+
+
+class TranscriptParagraph(NamedTuple):
+    segment_label: str
+    start_ms: int
+    text: str
+
+
+class TranscriptSegment(NamedTuple):
+    label: str
+    start_ms: int
+    end_ms: int
+    term_counts: Counter
+
+
+@dataclass(slots=True)
+class MdWindow:
+    """Features compactas de uma janela de análise, produzidas na Passada 1."""
+    start_ms: int
+    end_ms: int = 0
+    cue_count: int = 0
+    has_text: bool = False
+    term_counts: Counter = field(default_factory=Counter)
+    preview_words: list[str] = field(default_factory=list)
+    content_word_count: int = 0
+    shingle_hashes: set[int] = field(default_factory=set)  # só com fingerprinting (BoilerplateDetector)
+    is_boilerplate: bool = False
+
+
+def _format_ms_timestamp(time_ms: int, force_hours: bool = False) -> str:
+    """Formata milissegundos como HH:MM:SS (se ≥1h ou forçado) ou MM:SS."""
+    total_s = time_ms // 1000
+    h, rem = divmod(total_s, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}" if h or force_hours else f"{m:02d}:{s:02d}"
+
+
+def _collect_md_windows(
+    cue_source, window_size_ms: int, language_pipeline: LanguagePipeline, shingle_size: int | None = None
+) -> tuple[list[MdWindow], int]:
+    """
+    Passada 1: percorre as cues uma vez, remove roll-up (se a fonte tiver) e reduz cada janela a
+    contagens de termos + palavras de preview. Nenhum texto integral é retido.
+    Com `shingle_size`, guarda também os hashes dos shingles de palavras de cada
+    janela (entrada do MinHash do BoilerplateDetector).
+    Retorna (janelas, fim_da_última_cue_ms).
+    """
+    cue_cleaner = make_cue_cleaner(cue_source)
+    windows: list[MdWindow] = []
+    current_window: MdWindow | None = None
+    last_end_ms = 0
+    shingle_tail_tokens: list[str] = []
+    oral_stopwords = language_pipeline.stopwords
+
+    for cue in cue_source:
+        if current_window is None:
+            current_window = MdWindow(start_ms=cue.start_ms)
+            shingle_tail_tokens = []
+        clean_text = cue_cleaner.feed(cue.text)
+        current_window.cue_count += 1
+        current_window.end_ms = cue.end_ms
+        last_end_ms = cue.end_ms
+
+        if clean_text:
+            current_window.has_text = True
+            cue_tokens = language_pipeline.tokenize(clean_text)
+            current_window.term_counts.update(token for token in cue_tokens if token not in oral_stopwords)
+            if shingle_size:
+                shingle_tail_tokens.extend(cue_tokens)
+                for start_idx in range(len(shingle_tail_tokens) - shingle_size + 1):
+                    current_window.shingle_hashes.add(
+                        zlib.crc32(" ".join(shingle_tail_tokens[start_idx:start_idx + shingle_size]).encode("utf-8"))
+                    )
+                shingle_tail_tokens = shingle_tail_tokens[-(shingle_size - 1):]
+            for word in clean_text.split():
+                if len(word) > 1 and word.lower() not in oral_stopwords:
+                    current_window.content_word_count += 1
+                    if len(current_window.preview_words) < MD_PREVIEW_WORDS_COUNT:
+                        current_window.preview_words.append(word)
+
+        if cue.end_ms - current_window.start_ms > window_size_ms:
+            windows.append(current_window)
+            current_window = None
+
+    if current_window is not None:
+        windows.append(current_window)
+    return windows, last_end_ms
+
+
+def write_transcript_md(
+    cue_source,
+    md_file_path: Path,
+    video_id: str,
+    video_title: str,
+    video_date: str,
+    lang_code: str,
+    paragraph_list: list | None = None,
+    segment_list: list | None = None,
+    boilerplate_detector: "BoilerplateDetector | None" = None,
+    strip_boilerplate_flag: bool = False,
+) -> Path | None:
+    """
+    Motor MD em duas passadas sobre uma fonte re-iterável de `TranscriptCue`.
+
+    Passada 1 — features compactas por janela (contagens de termos, preview,
+                limites de tempo) → TF-IDF, quebras de tópico e TOC.
+    Passada 2 — relê as cues e escreve os parágrafos direto no arquivo.
+
+    O pico de memória é proporcional ao número de janelas, não ao de cues.
+    Com `paragraph_list`, cada parágrafo escrito é também anexado como
+    `TranscriptParagraph` (para o índice de busca); com `segment_list`, cada
+    segmento de tópico vira um `TranscriptSegment` com suas contagens de termos
+    (para o store de vetores do --related).
+
+    Com `boilerplate_detector`, janelas repetidas em vários vídeos do canal
+    (vinhetas, encerramentos, publis) ficam fora da segmentação e das
+    palavras-chave; com `strip_boilerplate_flag`, também fora da transcrição.
+    """
+    language_pipeline = get_language_pipeline(lang_code)
+    np = language_pipeline.np
+
+    # ── Fase 1: Janelas adaptativas (à duração total do vídeo) ─────────────
+    total_duration_s = cue_source.probe_duration_ms() // 1000
+    # Escala: <30 min = 30s | 30-60 min = 60s | >60 min = 90s
+    if total_duration_s < 1800:
+        window_size_s = 30
+    elif total_duration_s < 3600:
+        window_size_s = 60
+    else:
+        window_size_s = 90
+
+    # Threshold TF-IDF adaptativo: vídeos mais longos precisam de
+    # threshold maior para gerar segmentos mais significativos
+    if total_duration_s < 1800:
+        adaptive_threshold = 0.25
+    elif total_duration_s < 3600:
+        adaptive_threshold = 0.35
+    else:
+        adaptive_threshold = 0.50
+
+    all_windows, last_end_ms = _collect_md_windows(
+        cue_source, window_size_s * 1000, language_pipeline,
+        shingle_size=BOILERPLATE_SHINGLE_SIZE if boilerplate_detector is not None else None,
+    )
+    if boilerplate_detector is not None:
+        boilerplate_detector.mark_windows(video_id, all_windows)
+    # Janelas sem texto útil (ou só com boilerplate do canal) não participam da segmentação
+    content_window_indices = [i for i, window in enumerate(all_windows) if window.has_text]
+    if not content_window_indices:
+        return None
+    text_window_indices = [i for i in content_window_indices if not all_windows[i].is_boilerplate] or content_window_indices
+    windows = [all_windows[i] for i in text_window_indices]
+
+    # ── Fase 2: Detecção de mudanças de tópico via TF-IDF ──────────────
+    tfidf_matrix, feature_names, keyword_mask = language_pipeline.vectorize([w.term_counts for w in windows])
+
+    # Linhas já normalizadas (L2): similaridade do cosseno = produto escalar
+    if len(windows) > 1:
+        adjacent_sims = np.asarray(tfidf_matrix[1:].multiply(tfidf_matrix[:-1]).sum(axis=1)).ravel()
+        similarities = [(i + 1, float(sim)) for i, sim in enumerate(adjacent_sims)]
+    else:
+        similarities = []
+
+    # Segmentação por percentil: quebrar nos N% com menor similaridade
+    # N é calibrado pela duração: vídeos longos recebem mais segmentos
+    if total_duration_s < 1200:          # < 20 min → ~3 segmentos mín
+        min_segments = 3
+    elif total_duration_s < 2400:        # < 40 min → ~5 segmentos mín
+        min_segments = 5
+    elif total_duration_s < 3600:        # < 60 min → ~7 segmentos mín
+        min_segments = 7
+    else:                                # > 60 min → ~10 segmentos mín
+        min_segments = 10
+
+    # Quantos breaks precisamos (segmentos - 1 pois o índice 0 é sempre break)
+    target_breaks = max(min_segments - 1, 1)
+
+    topic_break_indices = {0}
+
+    # ── Quebras por Threshold dinâmico (Similaridade < adaptive_threshold)
+    if similarities:
+        for i, sim in similarities:
+            if sim < adaptive_threshold:
+                topic_break_indices.add(i)
+
+        # ── Quebras Forçadas (Garantir densidade mínima se o threshold falhar)
+        sorted_by_sim = sorted(similarities, key=lambda x: x[1])
+        forced_breaks = min(target_breaks, len(sorted_by_sim))
+        for idx, _sim in sorted_by_sim[:forced_breaks]:
+            topic_break_indices.add(idx)
+
+    # ── Fase 3: Montar segmentos de tópico (intervalos de janelas) ─────────
+    segment_bounds: list[tuple[int, int]] = []  # (primeira_janela, última_janela + 1)
+    for i in sorted(topic_break_indices):
+        if segment_bounds:
+            segment_bounds[-1] = (segment_bounds[-1][0], i)
+        segment_bounds.append((i, len(windows)))
+
+    # ── Fase 4: Metadados de cabeçalho ────────────────────────────────────
+    video_url = f"https://youtube.com/watch?v={video_id}"
+    video_index = 1  # identificador sequencial padrão
+
+    def _seg_keywords(first_idx: int, end_idx: int, top_n: int = 3) -> str:
+        """Extrai as top-N palavras-chave do segmento via TF-IDF e as formata como 'palavra · palavra'."""
+        return " · ".join(language_pipeline.top_keywords(tfidf_matrix[first_idx:end_idx], feature_names, keyword_mask, top_n))
+
+    def _seg_duration(first_idx: int, end_idx: int) -> str:
+        """Calcula duração aproximada de um segmento em minutos."""
+        total_s = (windows[end_idx - 1].end_ms - windows[first_idx].start_ms) // 1000
+        return f"~{max(1, round(total_s / 60))} min"
+
+    def _clean_preview(first_idx: int, end_idx: int) -> str:
+        """Preview do segmento: primeiras palavras de conteúdo, sem oral stopwords."""
+        preview_words: list[str] = []
+        content_word_count = 0
+        for window in windows[first_idx:end_idx]:
+            content_word_count += window.content_word_count
+            if len(preview_words) < MD_PREVIEW_WORDS_COUNT:
+                preview_words.extend(window.preview_words[:MD_PREVIEW_WORDS_COUNT - len(preview_words)])
+        preview = " ".join(preview_words)
+        return f"{preview}..." if content_word_count > MD_PREVIEW_WORDS_COUNT else preview
+
+    # ── Fase 5: Sumário de tópicos (TOC) ──────────────────────────────────
+    topic_labels: list[str] = []
+    toc_lines: list[str] = []
+    for label_idx, (first_idx, end_idx) in enumerate(segment_bounds, start=1):
+        keywords = _seg_keywords(first_idx, end_idx)
+        if label_idx == 1:
+            label = "Introdução" + (f" — {keywords}" if keywords else "")
+        else:
+            label = keywords if keywords else f"Tópico {label_idx}"
+        topic_labels.append(label)
+        toc_lines.append(
+            f"* `[{_format_ms_timestamp(windows[first_idx].start_ms)}]` **{label}** "
+            f"*({_seg_duration(first_idx, end_idx)})* — {_clean_preview(first_idx, end_idx)}\n"
+        )
+
+    if segment_list is not None:
+        for (first_idx, end_idx), label in zip(segment_bounds, topic_labels):
+            segment_term_counts = Counter()
+            for window in windows[first_idx:end_idx]:
+                segment_term_counts.update(window.term_counts)
+            segment_list.append(TranscriptSegment(
+                label, windows[first_idx].start_ms, windows[end_idx - 1].end_ms, segment_term_counts
+            ))
+
+    # Janela (índice em all_windows) que abre cada segmento → rótulo do tópico
+    segment_start_labels = {
+        text_window_indices[first_idx]: label for (first_idx, _), label in zip(segment_bounds, topic_labels)
+    }
+    # O primeiro tópico abre na primeira janela com texto, mesmo que seja vinheta (não descarta a abertura)
+    segment_start_labels[content_window_indices[0]] = segment_start_labels.pop(text_window_indices[0])
+
+    # ── Fase 6: Transcrição estruturada (Passada 2, escrita em streaming) ──
+    temp_md_path = md_file_path.with_name(f"{md_file_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_md_path, "w", encoding="utf-8") as file_descriptor:
+            file_descriptor.write(
+                f"## {video_title} <a name=\"video-{video_index:02d}\"></a>\n"
+                f"**URL:** {video_url}  \n"
+                f"**Data:** {video_date}  \n"
+                f"**Duração:** {_format_ms_timestamp(last_end_ms, force_hours=True)}\n"
+                "\n"
+                "### Segmentos de Tópicos (Timestamps)\n"
+            )
+            file_descriptor.writelines(toc_lines)
+            file_descriptor.write("\n---\n")
+            file_descriptor.write("### Transcrição Estruturada\n")
+            file_descriptor.write("> **Nota do Sistema:** Transcrição limpa via Escriba.\n\n")
+
+            paragraph_lines: list[str] = []
+            paragraph_start_ms: int | None = None
+            segment_label = ""
+
+            def _flush_paragraph() -> None:
+                """Emite o parágrafo acumulado, com âncora de tempo."""
+                nonlocal paragraph_lines, paragraph_start_ms
+                if paragraph_lines:
+                    text = " ".join(paragraph_lines)
+                    text = clean_ekklezia_terms(text[0].upper() + text[1:])
+                    file_descriptor.write(f"[{_format_ms_timestamp(paragraph_start_ms)}] {text}\n\n")
+                    if paragraph_list is not None:
+                        paragraph_list.append(TranscriptParagraph(segment_label, paragraph_start_ms, text))
+                paragraph_lines = []
+                paragraph_start_ms = None
+
+            cue_cleaner = make_cue_cleaner(cue_source)
+            window_idx = 0
+            cues_left_in_window = all_windows[0].cue_count
+            segment_started = False
+
+            for cue in cue_source:
+                while cues_left_in_window == 0 and window_idx + 1 < len(all_windows):
+                    window_idx += 1
+                    cues_left_in_window = all_windows[window_idx].cue_count
+                if cues_left_in_window == all_windows[window_idx].cue_count and window_idx in segment_start_labels:
+                    if segment_started:
+                        _flush_paragraph()
+                    segment_started = True
+                    segment_label = segment_start_labels[window_idx]
+                    segment_ts = _format_ms_timestamp(all_windows[window_idx].start_ms, force_hours=True)
+                    file_descriptor.write(f"#### [{segment_ts}] - Tópico: {segment_label}\n")
+                cues_left_in_window -= 1
+
+                sub_text = cue_cleaner.feed(cue.text)
+                if not sub_text or not segment_started:
+                    continue
+                if strip_boilerplate_flag and all_windows[window_idx].is_boilerplate:
+                    continue
+                if paragraph_start_ms is None:
+                    paragraph_start_ms = cue.start_ms
+                paragraph_lines.append(sub_text)
+
+                # Quebra: ≥60s E fim de frase, ou ≥120s forçado
+                elapsed_ms = cue.end_ms - paragraph_start_ms
+                if (elapsed_ms >= 60_000 and language_pipeline.sentence_end_regex.search(sub_text)) or elapsed_ms >= 120_000:
+                    _flush_paragraph()
+
+            _flush_paragraph()
+        temp_md_path.replace(md_file_path)
+    finally:
+        temp_md_path.unlink(missing_ok=True)
+
+    return md_file_path
+
+
 def srt_to_md(
     srt_path: Path,
     video_id: str,
     video_title: str,
     video_date: str = "Desconhecida",
     threshold: float = 0.3,
-    indentation_prefix: str = "  "
+    indentation_prefix: str = "  ",
+    library_index: "LibraryIndex | None" = None,
+    segment_store: "SegmentVectorStore | None" = None,
+    boilerplate_detector: "BoilerplateDetector | None" = None,
+    strip_boilerplate_flag: bool = False,
 ) -> Path | None:
     """
     Converte um arquivo .srt em .md estruturado com segmentação por tópicos (TF-IDF).
-    Depêndencias de ML são carregadas via `_load_ml_deps()` e cacheadas por processo,
-    eliminando overhead de import nas chamadas subsequentes.
+    Depêndencias de ML, stopwords e regexes vivem no `LanguagePipeline` do idioma,
+    montado na primeira conversão e reusado pelas seguintes. O .srt é lido em
+    streaming pelo motor de duas passadas (`write_transcript_md`). Legendas nativas
+    (.json3/.vtt do --native-subs) são lidas direto, sem conversão para .srt.
+    Com `library_index`, os parágrafos do .md substituem os do vídeo no índice de busca;
+    com `segment_store`, os vetores dos segmentos substituem os do vídeo no store do canal;
+    com `boilerplate_detector`, trechos repetidos no canal ficam fora dos tópicos.
     """
     deps = _load_ml_deps()
     if deps is None:
         print_err("Faltam depêndencias de ML (pysrt, sklearn, nltk) para MD. Instale-as ou rode com --no-md", indentation_prefix)
         return None
-    pysrt, np, _nltk, _nltk_sw, TfidfVectorizer, cosine_similarity = deps
 
-    try:
-        subs = pysrt.open(str(srt_path), encoding='utf-8')
-        if not subs:
-            return None
+    lang_code = "pt"  # Default
+    lang_match = SUBTITLE_LANG_SUFFIX_REGEX_PATTERN.search(srt_path.name)
+    if lang_match:
+        lang_code = lang_match.group(1).lower()
 
-        # ── Fase 1: Janelas adaptativas (à duração total do vídeo) ─────────────
-        total_duration_s = (
-            subs[-1].end.hours * 3600 +
-            subs[-1].end.minutes * 60 +
-            subs[-1].end.seconds
+    paragraph_list = [] if library_index is not None else None
+    segment_list = [] if segment_store is not None else None
+    try:
+        md_path = write_transcript_md(
+            open_cue_source(srt_path), srt_path.with_suffix(".md"), video_id, video_title, video_date, lang_code,
+            paragraph_list=paragraph_list, segment_list=segment_list,
+            boilerplate_detector=boilerplate_detector, strip_boilerplate_flag=strip_boilerplate_flag,
         )
-        # Escala: <30 min = 30s | 30-60 min = 60s | >60 min = 90s
-        if total_duration_s < 1800:
-            window_size_s = 30
-        elif total_duration_s < 3600:
-            window_size_s = 60
-        else:
-            window_size_s = 90
-
-        # Threshold TF-IDF adaptativo: vídeos mais longos precisam de
-        # threshold maior para gerar segmentos mais significativos
-        if total_duration_s < 1800:
-            adaptive_threshold = 0.25
-        elif total_duration_s < 3600:
-            adaptive_threshold = 0.35
-        else:
-            adaptive_threshold = 0.50
-
-
-        def _strip_rollup(text: str, prev_text: str, overlap_ratio: float = 0.5) -> str:
-            """
-            Remove do início de 'text' a porção que já foi vista em 'prev_text'.
-            Opera no nível de tokens (palavras) usando longest-common-prefix.
-            Se mais de 'overlap_ratio' do texto novo é igual ao anterior, descarta.
-            """
-            prev_tokens = prev_text.split()
-            cur_tokens  = text.split()
-            if not prev_tokens or not cur_tokens:
-                return text
-            # Encontrar o maior prefixo comum
-            overlap = 0
-            for i, token in enumerate(cur_tokens):
-                if i < len(prev_tokens) and token == prev_tokens[i]:
-                    overlap += 1
-                else:
-                    break
-            # Se mais de 50% do texto novo é overlap, descarta completamente
-            if overlap / len(cur_tokens) > overlap_ratio:
-                return ""
-            return " ".join(cur_tokens[overlap:])
-
-        windows = []
-        current_window_subs = []
-        start_time = subs[0].start
-        prev_sub_text = ""
-
-        for sub in subs:
-            raw_text = re.sub(r"<[^>]+>", "", sub.text.replace('\n', ' ')).strip()
-            clean_text = _strip_rollup(raw_text, prev_sub_text)
-            if clean_text:
-                prev_sub_text = raw_text
-                # Substituir o texto do sub pelo texto sem roll-up para a janela
-                sub._clean_text = clean_text
-            else:
-                sub._clean_text = ""
-            current_window_subs.append(sub)
-            if (sub.end - start_time).seconds > window_size_s:
-                window_text = " ".join(
-                    s._clean_text for s in current_window_subs if s._clean_text
-                )
-                if window_text:
-                    windows.append({
-                        'text': window_text,
-                        'timestamp': str(current_window_subs[0].start).split(',')[0],
-                        'subs': current_window_subs,
-                    })
-                current_window_subs = []
-                start_time = sub.start
-
-        if current_window_subs:
-            window_text = " ".join(
-                s._clean_text for s in current_window_subs if s._clean_text
-            )
-            if window_text:
-                windows.append({
-                    'text': window_text,
-                    'timestamp': str(current_window_subs[0].start).split(',')[0],
-                    'subs': current_window_subs,
-                })
-
-        if not windows:
-            return None
+    except Exception as e:
+        print_warn(f"Falha ao processar segmentação MD: {e}", indentation_prefix)
+        return None
+    if md_path and library_index is not None:
+        library_index.index_transcript(video_id, md_path, paragraph_list)
+    if md_path and segment_store is not None:
+        segment_store.replace_video(video_id, video_title, segment_list)
+    return md_path
+
+
+def parse_md_paragraph_lines(md_lines) -> list[TranscriptParagraph]:
+    """Relê as linhas de um .md já gerado pelo motor (cabeçalhos de tópico + parágrafos `[MM:SS] texto`)."""
+    paragraph_list = []
+    segment_label = ""
+    for line in md_lines:
+        topic_match = MD_TOPIC_LINE_REGEX_PATTERN.match(line)
+        if topic_match:
+            segment_label = topic_match.group(1).strip()
+            continue
+        paragraph_match = MD_PARAGRAPH_LINE_REGEX_PATTERN.match(line)
+        if paragraph_match:
+            hours, minutes, seconds = paragraph_match.group(1), paragraph_match.group(2), paragraph_match.group(3)
+            start_ms = ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000
+            paragraph_list.append(TranscriptParagraph(segment_label, start_ms, paragraph_match.group(4).strip()))
+    return paragraph_list
 
-        # Extrair stopwords fundidas cedo para uso em todo o processo
-        lang_code = "pt" # Default
-        lang_match = re.search(r"-([a-z]{2}(-[A-Z]{2})?)\.srt$", srt_path.name)
-        if lang_match:
-            lang_code = lang_match.group(1).lower()
-        
-        oral_stopwords = get_merged_stopwords(lang_code)
 
-        # ── Fase 2: Detecção de mudanças de tópico via TF-IDF ──────────────
-        vectorizer = TfidfVectorizer(stop_words=list(oral_stopwords), min_df=1)
-        tfidf_matrix = vectorizer.fit_transform([w['text'] for w in windows])
+def parse_md_paragraphs(md_path: Path) -> list[TranscriptParagraph]:
+    """Relê um .md já gerado pelo motor, em streaming."""
+    with open(md_path, "r", encoding="utf-8") as file_descriptor:
+        return parse_md_paragraph_lines(file_descriptor)
 
-        # Calcular similaridade entre janelas adjacentes
-        similarities = []
-        for i in range(1, len(windows)):
-            sim = cosine_similarity(tfidf_matrix[i], tfidf_matrix[i - 1])[0][0]
-            similarities.append((i, sim))
-
-        # Segmentação por percentil: quebrar nos N% com menor similaridade
-        # N é calibrado pela duração: vídeos longos recebem mais segmentos
-        if total_duration_s < 1200:          # < 20 min → ~3 segmentos mín
-            min_segments = 3
-        elif total_duration_s < 2400:        # < 40 min → ~5 segmentos mín
-            min_segments = 5
-        elif total_duration_s < 3600:        # < 60 min → ~7 segmentos mín
-            min_segments = 7
-        else:                                # > 60 min → ~10 segmentos mín
-            min_segments = 10
-
-        # Quantos breaks precisamos (segmentos - 1 pois o índice 0 é sempre break)
-        target_breaks = max(min_segments - 1, 1)
-
-        topic_break_indices = {0}
-        
-        # ── Quebras por Threshold dinâmico (Similaridade < adaptive_threshold)
-        if similarities:
-            for i, sim in similarities:
-                if sim < adaptive_threshold:
-                    topic_break_indices.add(i)
-
-            # ── Quebras Forçadas (Garantir densidade mínima se o threshold falhar)
-            # Ordenar por similaridade crescente e pegar os target_breaks mais baixos para complementar
-            sorted_by_sim = sorted(similarities, key=lambda x: x[1])
-            forced_breaks = min(target_breaks, len(sorted_by_sim))
-            for idx, _sim in sorted_by_sim[:forced_breaks]:
-                topic_break_indices.add(idx)
-
-        # ── Fase 3: Montar segmentos de tópico ────────────────────────────────
-        segments = []  # list of (timestamp, label_idx, all_windows_in_segment)
-        seg_windows = []
-        for i, window in enumerate(windows):
-            if i in topic_break_indices and seg_windows:
-                segments.append((seg_windows[0]['timestamp'], len(segments) + 1, seg_windows))
-                seg_windows = []
-            seg_windows.append(window)
-        if seg_windows:
-            segments.append((seg_windows[0]['timestamp'], len(segments) + 1, seg_windows))
-
-        # ── Fase 4: Metadados de cabeçalho ────────────────────────────────────
-        duration_str = str(subs[-1].end).split(',')[0]
-        video_url = f"https://youtube.com/watch?v={video_id}"
-        video_index = 1  # identificador sequencial padrão
-
-        md_lines = [
-            f"## {video_title} <a name=\"video-{video_index:02d}\"></a>\n",
-            f"**URL:** {video_url}  \n",
-            f"**Data:** {video_date}  \n",
-            f"**Duração:** {duration_str}\n",
-            "\n",
-        ]
 
-        # ── Fase 5: Sumário de tópicos (TOC) ──────────────────────────────────
-        
-        def _smart_ts(pysrt_time) -> str:
-            """Usa HH:MM:SS só quando necessário (≥1h), senão MM:SS."""
-            total_s = pysrt_time.hours * 3600 + pysrt_time.minutes * 60 + pysrt_time.seconds
-            h, rem = divmod(total_s, 3600)
-            m, s = divmod(rem, 60)
-            return f"{h:02d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
-
-        def _seg_duration(seg_wins: list) -> str:
-            """Calcula duração aproximada de um segmento em minutos."""
-            all_subs = [sub for w in seg_wins for sub in w['subs']]
-            if len(all_subs) < 2:
-                return "~1 min"
-            total_s = (all_subs[-1].end - all_subs[0].start).seconds
-            mins = max(1, round(total_s / 60))
-            return f"~{mins} min"
-
-        def _seg_keywords(seg_wins: list, tfidf_vec, tfidf_mat, win_indices: list[int], top_n: int = 3) -> str:
-            """Extrai as top-N palavras-chave do segmento via TF-IDF e as formata como 'palavra · palavra'."""
-            import numpy as np
-            feature_names = tfidf_vec.get_feature_names_out()
-            # Soma os scores TF-IDF de todas as janelas do segmento
-            seg_vector = np.asarray(tfidf_mat[win_indices, :].sum(axis=0)).flatten()
-            top_indices = seg_vector.argsort()[::-1]
-            keywords = []
-            for i in top_indices:
-                word = feature_names[i]
-                if len(word) > 2 and word.lower() not in oral_stopwords and word.isalpha():
-                    keywords.append(word.lower())
-                if len(keywords) >= top_n:
-                    break
-            return " · ".join(keywords) if keywords else ""
-
-        def _clean_preview(seg_wins: list, max_words: int = 12) -> str:
-            """Gera preview limpo do segmento completo, filtrando oral stopwords do início."""
-            full_text = " ".join(w['text'] for w in seg_wins)
-            words = [w for w in full_text.split() if w.lower() not in oral_stopwords and len(w) > 1]
-            if not words:
-                return ""
-            preview = " ".join(words[:max_words])
-            return f"{preview}..." if len(words) > max_words else preview
-
-        # Mapear índices globais de janelas para cada segmento
-        window_idx = 0
-        seg_window_indices: list[list[int]] = []
-        for _, _, seg_wins in segments:
-            indices = list(range(window_idx, window_idx + len(seg_wins)))
-            seg_window_indices.append(indices)
-            window_idx += len(seg_wins)
-
-        md_lines.append("### Segmentos de Tópicos (Timestamps)\n")
-        topic_labels = []
-        for (ts, idx, seg_wins), win_indices in zip(segments, seg_window_indices):
-            # Timestamps dos subs reais do segmento
-            first_sub = seg_wins[0]['subs'][0] if seg_wins[0]['subs'] else None
-            ts_fmt = _smart_ts(first_sub.start) if first_sub else ts.split(',')[0]
-
-            # Palavras-chave TF-IDF como label semântico
-            keywords = _seg_keywords(seg_wins, vectorizer, tfidf_matrix, win_indices)
-            if idx == 1:
-                label = f"Introdução" + (f" — {keywords}" if keywords else "")
-            else:
-                label = keywords if keywords else f"Tópico {idx}"
-            topic_labels.append(label)
-
-            duration = _seg_duration(seg_wins)
-            preview = _clean_preview(seg_wins)
-            md_lines.append(f"* `[{ts_fmt}]` **{label}** *({duration})* — {preview}\n")
-
-        md_lines.append("\n---\n")
-
-        # ── Fase 6: Transcrição estruturada ───────────────────────────────────
-        # Helpers locais
-        _SENTENCE_END = re.compile(r'[.!?]["\']?\s*$')
-
-        def _fmt_ts(pysrt_time) -> str:
-            """Formata pysrt time como MM:SS para âncoras de parágrafo."""
-            total_s = pysrt_time.hours * 3600 + pysrt_time.minutes * 60 + pysrt_time.seconds
-            h, rem = divmod(total_s, 3600)
-            m, s = divmod(rem, 60)
-            return f"{h:02d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
-
-        def _dedup_lines(lines: list[str]) -> list[str]:
-            """Remove roll-up duplicatas: pula linha se começa com o token da linha anterior."""
-            out = []
-            for line in lines:
-                if out:
-                    prev_normalized = re.sub(r'\s+', ' ', out[-1]).lower()
-                    cur_normalized  = re.sub(r'\s+', ' ', line).lower()
-                    # Ignora se a linha atual é substring da anterior (roll-up parcial)
-                    if cur_normalized in prev_normalized or prev_normalized in cur_normalized:
-                        # Mantém a mais longa
-                        if len(cur_normalized) > len(prev_normalized):
-                            out[-1] = line
-                        continue
-                out.append(line)
-            return out
-
-        def _flush_paragraph(lines: list[str], para_ts: str, out: list[str]) -> None:
-            """Normaliza e emite um parágrafo capturado, com âncora de tempo."""
-            if not lines:
-                return
-            text = re.sub(r' {2,}', ' ', " ".join(lines)).strip()
-            if text:
-                first_char = text[0].upper()
-                text = first_char + text[1:]
-                out.append(f"[{para_ts}] {clean_ekklezia_terms(text)}\n\n")
-
-        md_lines.append("### Transcrição Estruturada\n")
-        md_lines.append("> **Nota do Sistema:** Transcrição limpa via Escriba.\n\n")
+def segments_from_md_paragraphs(paragraph_list: list[TranscriptParagraph], lang_code: str) -> list[TranscriptSegment]:
+    """
+    Reconstrói os segmentos de tópico de um .md já gerado (rótulo, início/fim,
+    contagens de termos), para o store do --related de vídeos convertidos antes
+    dele. Tokenização e stopwords são as das janelas do motor MD; o fim de cada
+    segmento é o início do seguinte (no último, o início do último parágrafo).
+    """
+    language_pipeline = get_language_pipeline(lang_code)
+    oral_stopwords = language_pipeline.stopwords
+    grouped_segments: list[list] = []  # [rótulo, início_ms, último_parágrafo_ms, Counter]
+    for paragraph in paragraph_list:
+        if not grouped_segments or grouped_segments[-1][0] != paragraph.segment_label:
+            grouped_segments.append([paragraph.segment_label, paragraph.start_ms, paragraph.start_ms, Counter()])
+        grouped_segments[-1][2] = paragraph.start_ms
+        grouped_segments[-1][3].update(
+            token for token in language_pipeline.tokenize(paragraph.text) if token not in oral_stopwords
+        )
+    return [
+        TranscriptSegment(
+            label, start_ms,
+            grouped_segments[segment_idx + 1][1] if segment_idx + 1 < len(grouped_segments) else last_start_ms,
+            term_counts,
+        )
+        for segment_idx, (label, start_ms, last_start_ms, term_counts) in enumerate(grouped_segments)
+    ]
 
-        for (ts, idx, seg_wins), label in zip(segments, topic_labels):
-            md_lines.append(f"#### [{ts}] - Tópico: {label}\n")
 
-            paragraph_lines: list[str] = []
-            paragraph_start = None
-
-            for window in seg_wins:
-                for sub in window['subs']:
-                    sub_text = getattr(sub, '_clean_text', None)
-                    if sub_text is None:
-                        sub_text = re.sub(r"<[^>]+>", "", sub.text.replace('\n', ' ')).strip()
-                    sub_text = re.sub(r'\s+', ' ', sub_text)
-                    if not sub_text:
-                        continue
-
-                    if paragraph_start is None:
-                        paragraph_start = sub.start
-
-                    paragraph_lines.append(sub_text)
-
-                    # Quebra: ≥60s E fim de frase, ou ≥120s forçado
-                    elapsed = (sub.end - paragraph_start).seconds
-                    ends_sentence = bool(_SENTENCE_END.search(sub_text))
-
-                    if elapsed >= 60 and ends_sentence:
-                        deduped = _dedup_lines(paragraph_lines)
-                        _flush_paragraph(deduped, _fmt_ts(paragraph_start), md_lines)
-                        paragraph_lines = []
-                        paragraph_start = None
-                    elif elapsed >= 120:
-                        deduped = _dedup_lines(paragraph_lines)
-                        _flush_paragraph(deduped, _fmt_ts(paragraph_start), md_lines)
-                        paragraph_lines = []
-                        paragraph_start = None
-
-            if paragraph_lines:
-                deduped = _dedup_lines(paragraph_lines)
-                _flush_paragraph(deduped, _fmt_ts(paragraph_start), md_lines)
-
-        md_file_path = srt_path.with_suffix(".md")
-        with open(md_file_path, "w", encoding="utf-8") as file_descriptor:
-            file_descriptor.write("".join(md_lines))
-
-        return md_file_path
-    except Exception as e:
-        print_warn(f"Falha ao processar segmentação MD: {e}", indentation_prefix)
-        return None
+def find_subtitle_files(cwd_path: Path, channel_dir_name: str, video_id: str) -> list[str]:
+    """Lista as legendas do vídeo no disco (.srt ou nativas .json3/.vtt)."""
+    return [
+        file_path for file_path in glob.glob(str(cwd_path / f"{channel_dir_name}-{video_id}*"))
+        if file_path.endswith(SUBTITLE_FILE_SUFFIXES)
+    ]
 
 
 def cleanup_subtitles(
@@ -1426,18 +3198,21 @@ def cleanup_subtitles(
     video_id: str,
     video_title: str = "Vídeo Sem Título",
     convert_srt_to_md: bool = False,
-    flag_keep_srt: bool = False,
     indentation_prefix: str = "  ",
 ) -> tuple[bool, Path | None]:
     """
-    Remove variações duplicadas de legenda geradas pelo yt-dlp,
-    mantendo apenas o arquivo com o menor nome (ex: prefere 'pt' sobre 'pt-BR').
-    Renomeia de '.pt.srt' para '-pt.srt'.
+    Remove variações duplicadas de legenda geradas pelo yt-dlp, mantendo apenas o
+    arquivo com o menor nome (ex: prefere 'pt' sobre 'pt-BR'). Com a trilha
+    pré-selecionada em `download_video` normalmente só existe um arquivo; a
+    limpeza cobre o modo de fallback por regex e sobras de versões anteriores.
+    Renomeia de '.pt.srt' para '-pt.srt' (idem para .json3/.vtt).
+    Legendas nativas (--native-subs) só viram .srt aqui quando não há conversão
+    MD; com MD seguem nativas para o motor (json3 sem dedup de roll-up) e o .srt
+    do --keep-srt é gravado depois do MD, no loop principal.
     Se convert_srt_to_md=True, retorna o Path para processamento MD posterior.
     Retorna (True, Path) se processou alguma legenda, caso contrário (False, None).
     """
-    subtitle_file_pattern = str(cwd_path / f"{channel_dir_name}-{video_id}*.srt")
-    matching_subtitle_files_list = glob.glob(subtitle_file_pattern)
+    matching_subtitle_files_list = find_subtitle_files(cwd_path, channel_dir_name, video_id)
 
     if not matching_subtitle_files_list:
         return False, None
@@ -1456,12 +3231,24 @@ def cleanup_subtitles(
     base_prefix_string = f"{channel_dir_name}-{video_id}"
     language_suffix_extracted = target_subtitle_file_path.name[len(base_prefix_string):]
 
-    if language_suffix_extracted.startswith(".") and target_subtitle_file_path.suffix == ".srt" and language_suffix_extracted.count(".") >= 2:
+    if language_suffix_extracted.startswith(".") and target_subtitle_file_path.suffix in SUBTITLE_FILE_SUFFIXES and language_suffix_extracted.count(".") >= 2:
         new_language_suffix = "-" + language_suffix_extracted.lstrip(".")
         new_subtitle_filename_path = target_subtitle_file_path.parent / f"{base_prefix_string}{new_language_suffix}"
         target_subtitle_file_path.rename(new_subtitle_filename_path)
         target_subtitle_file_path = new_subtitle_filename_path
 
+    # Legenda nativa: .srt aqui só quando ela é o produto final (sem MD)
+    if target_subtitle_file_path.suffix in NATIVE_SUBTITLE_SUFFIXES and not convert_srt_to_md:
+        native_subtitle_path = target_subtitle_file_path
+        try:
+            target_subtitle_file_path = write_srt_from_cues(
+                open_cue_source(native_subtitle_path), native_subtitle_path.with_suffix(".srt")
+            )
+            native_subtitle_path.unlink(missing_ok=True)
+        except Exception as e:
+            print_warn(f"Falha ao converter legenda nativa para .srt: {e}", indentation_prefix)
+            target_subtitle_file_path = native_subtitle_path
+
     # Conversão SRT → MD é delegada para o final do loop principal
     if convert_srt_to_md:
         print_info(f"SRT mantido temp: {DIM}{target_subtitle_file_path.name}{RESET}", indentation_prefix)
@@ -1471,8 +3258,770 @@ def cleanup_subtitles(
     return True, target_subtitle_file_path
 
 
+# ─── Store de Vetores de Segmentos (--related) ───────────────────────────────
+
+SEGMENT_STORE_FILENAME = "escriba_segments.npz"
+SEGMENT_HASH_DIMENSIONS = 1 << 20  # espaço comum de termos entre vídeos (hashing trick)
+SEGMENT_STORE_FORMAT_VERSION = 1
+
+
+@functools.lru_cache(maxsize=1)
+def _load_sparse_deps():
+    """Importa numpy e scipy.sparse (já trazidos pelo sklearn) uma única vez por processo."""
+    try:
+        import numpy as np
+        from scipy import sparse
+        return np, sparse
+    except ImportError:
+        return None
+
+
+class SegmentVectorStore:
+    """
+    Vetores dos segmentos de tópico de um canal em um único .npz na pasta do canal.
+
+    Cada linha é um segmento (vídeo, rótulo, início/fim em ms) com as contagens
+    de termos projetadas por hashing num espaço fixo, então vídeos processados
+    em momentos diferentes são comparáveis sem reprocessar texto. O IDF é
+    recalculado sobre o canal na consulta e a similaridade é um produto esparso.
+    Substituições ficam em memória até `save()` (uma escrita por sessão); se
+    outro processo gravou o store nesse meio-tempo, `save()` relê o disco sob a
+    trava e reaplica só as substituições desta sessão.
+    """
+
+    def __init__(self, channel_dir_path: Path):
+        self.store_path = channel_dir_path / SEGMENT_STORE_FILENAME
+        self._unsaved_segments_dict: dict[str, tuple[str, list[TranscriptSegment]]] = {}
+        self._reset()
+        self.is_dirty = False
+
+    def _reset(self) -> None:
+        """Esquece o conteúdo carregado (o próximo acesso relê o disco)."""
+        self._matrix = None  # csr_matrix float32 (segmentos × SEGMENT_HASH_DIMENSIONS)
+        self._meta_dict: dict[str, list] = {"video_ids": [], "titles": [], "labels": [], "start_ms": [], "end_ms": []}
+        self._pending_segments_dict: dict[str, tuple[str, list[TranscriptSegment]]] = {}
+        self._stored_video_id_set: set[str] | None = None
+        self._disk_signature: tuple[int, int] | None = None
+        self._is_loaded = False
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+        np, sparse = _load_sparse_deps()
+        self._disk_signature = _file_signature(self.store_path)
+        if not self.store_path.exists():
+            self._matrix = sparse.csr_matrix((0, SEGMENT_HASH_DIMENSIONS), dtype=np.float32)
+            return
+        try:
+            with np.load(self.store_path, allow_pickle=False) as npz_file:
+                self._matrix = sparse.csr_matrix(
+                    (npz_file["data"], npz_file["indices"], npz_file["indptr"]),
+                    shape=(len(npz_file["indptr"]) - 1, SEGMENT_HASH_DIMENSIONS),
+                )
+                self._meta_dict = {key: npz_file[key].tolist() for key in self._meta_dict}
+        except (OSError, KeyError, ValueError) as error_msg:
+            print_warn(f"Store de segmentos ilegível ({self.store_path.name}), recriando: {error_msg}")
+            self._matrix = sparse.csr_matrix((0, SEGMENT_HASH_DIMENSIONS), dtype=np.float32)
+
+    def __len__(self) -> int:
+        self._materialize()
+        return self._matrix.shape[0]
+
+    def __contains__(self, video_id: str) -> bool:
+        """True se o vídeo já tem segmentos no store (gravados ou pendentes)."""
+        self._load()
+        if self._stored_video_id_set is None:
+            self._stored_video_id_set = set(self._meta_dict["video_ids"])
+        return video_id in self._pending_segments_dict or video_id in self._stored_video_id_set
+
+    @staticmethod
+    def _hash_term_counts(term_counts: dict) -> dict[int, float]:
+        hashed_counts: dict[int, float] = {}
+        for term, count in term_counts.items():
+            column_idx = zlib.crc32(term.encode("utf-8")) & (SEGMENT_HASH_DIMENSIONS - 1)
+            hashed_counts[column_idx] = hashed_counts.get(column_idx, 0.0) + count
+        return hashed_counts
+
+    def replace_video(self, video_id: str, video_title: str, segment_list: list[TranscriptSegment]) -> None:
+        """Agenda a troca dos segmentos do vídeo (aplicada em lote na próxima consulta ou save)."""
+        self._pending_segments_dict[video_id] = (video_title, segment_list)
+        self._unsaved_segments_dict[video_id] = (video_title, segment_list)
+        self.is_dirty = True
+
+    def _materialize(self) -> None:
+        """Aplica as trocas pendentes com uma única reconstrução da matriz."""
+        self._load()
+        if not self._pending_segments_dict:
+            return
+        np, sparse = _load_sparse_deps()
+        keep_row_indices = [
+            row_idx for row_idx, video_id in enumerate(self._meta_dict["video_ids"])
+            if video_id not in self._pending_segments_dict
+        ]
+        meta_dict = {key: [values[row_idx] for row_idx in keep_row_indices] for key, values in self._meta_dict.items()}
+        data_list, indices_list, indptr_list = [], [], [0]
+        for video_id, (video_title, segment_list) in self._pending_segments_dict.items():
+            for segment in segment_list:
+                hashed_counts = self._hash_term_counts(segment.term_counts)
+                indices_list.extend(sorted(hashed_counts))
+                data_list.extend(hashed_counts[column_idx] for column_idx in sorted(hashed_counts))
+                indptr_list.append(len(indices_list))
+                meta_dict["video_ids"].append(video_id)
+                meta_dict["titles"].append(video_title)
+                meta_dict["labels"].append(segment.label)
+                meta_dict["start_ms"].append(segment.start_ms)
+                meta_dict["end_ms"].append(segment.end_ms)
+        new_rows_matrix = sparse.csr_matrix(
+            (np.asarray(data_list, dtype=np.float32), np.asarray(indices_list, dtype=np.int32), np.asarray(indptr_list, dtype=np.int64)),
+            shape=(len(indptr_list) - 1, SEGMENT_HASH_DIMENSIONS),
+        )
+        self._matrix = sparse.vstack([self._matrix[keep_row_indices], new_rows_matrix], format="csr", dtype=np.float32)
+        self._meta_dict = meta_dict
+        self._stored_video_id_set = None
+        self._pending_segments_dict.clear()
+
+    def save(self) -> None:
+        """
+        Grava o store atomicamente (.tmp + replace), apenas se houve mudança.
+        Sob a trava do arquivo: se outro processo o alterou desde a nossa leitura
+        (ex: --regen-md junto de um download), relê o disco e reaplica só as
+        substituições desta sessão, sem descartar os vetores do outro processo.
+        """
+        if not self.is_dirty:
+            return
+        with AdvisoryFileLock(self.store_path):
+            self._load()
+            if _file_signature(self.store_path) != self._disk_signature:
+                self._reset()
+                self._pending_segments_dict.update(self._unsaved_segments_dict)
+            self._write_locked()
+
+    def _write_locked(self) -> None:
+        self._materialize()
+        np, _sparse = _load_sparse_deps()
+        temp_path = self.store_path.with_name(f"{self.store_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, "wb") as file_descriptor:
+                np.savez_compressed(
+                    file_descriptor,
+                    format_version=np.int32(SEGMENT_STORE_FORMAT_VERSION),
+                    data=self._matrix.data.astype(np.float32), indices=self._matrix.indices.astype(np.int32),
+                    indptr=self._matrix.indptr.astype(np.int64),
+                    video_ids=np.asarray(self._meta_dict["video_ids"], dtype=str),
+                    titles=np.asarray(self._meta_dict["titles"], dtype=str),
+                    labels=np.asarray(self._meta_dict["labels"], dtype=str),
+                    start_ms=np.asarray(self._meta_dict["start_ms"], dtype=np.int64),
+                    end_ms=np.asarray(self._meta_dict["end_ms"], dtype=np.int64),
+                )
+            temp_path.replace(self.store_path)
+            self._disk_signature = _file_signature(self.store_path)
+            self._unsaved_segments_dict.clear()
+            self.is_dirty = False
+        except OSError as error_msg:
+            print_warn(f"Falha ao salvar store de segmentos: {error_msg}")
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def related(self, video_id: str, segment_number: int | None = None, limit: int = 10) -> list[dict]:
+        """
+        Segmentos de outros vídeos mais próximos de um segmento (1 = Introdução,
+        na ordem do sumário) ou, sem `segment_number`, do vídeo inteiro.
+        Pesos sublinear-TF × IDF do canal, normalizados: score = cosseno.
+        """
+        self._materialize()
+        np, sparse = _load_sparse_deps()
+        video_ids_array = np.asarray(self._meta_dict["video_ids"], dtype=str)
+        query_row_indices = np.flatnonzero(video_ids_array == video_id)
+        if segment_number is not None:
+            query_row_indices = query_row_indices[segment_number - 1:segment_number]
+        if not len(query_row_indices):
+            return []
+
+        weighted_matrix = self._matrix.copy()
+        document_frequency = np.bincount(weighted_matrix.indices, minlength=SEGMENT_HASH_DIMENSIONS)
+        idf_vector = np.log((1 + weighted_matrix.shape[0]) / (1 + document_frequency)) + 1
+        weighted_matrix.data = ((1 + np.log(weighted_matrix.data)) * idf_vector[weighted_matrix.indices]).astype(np.float32)
+        row_norms = np.sqrt(np.asarray(weighted_matrix.multiply(weighted_matrix).sum(axis=1)).ravel())
+        weighted_matrix = sparse.diags(1 / np.maximum(row_norms, 1e-12)).dot(weighted_matrix).tocsr()
+
+        query_vector = weighted_matrix[query_row_indices].sum(axis=0)
+        query_vector = np.asarray(query_vector).ravel() / max(np.linalg.norm(query_vector), 1e-12)
+        scores = weighted_matrix.dot(query_vector)
+        scores[video_ids_array == video_id] = -1.0
+
+        candidate_count = min(limit, int((scores > 0).sum()))
+        if candidate_count <= 0:
+            return []
+        top_row_indices = np.argpartition(-scores, candidate_count - 1)[:candidate_count]
+        top_row_indices = top_row_indices[np.argsort(-scores[top_row_indices])]
+        return [
+            {
+                "video_id": self._meta_dict["video_ids"][row_idx], "title": self._meta_dict["titles"][row_idx],
+                "label": self._meta_dict["labels"][row_idx], "start_ms": int(self._meta_dict["start_ms"][row_idx]),
+                "end_ms": int(self._meta_dict["end_ms"][row_idx]), "score": float(scores[row_idx]),
+            }
+            for row_idx in top_row_indices
+        ]
+
+
+# ─── Boilerplate do Canal (MinHash/LSH) ──────────────────────────────────────
+
+BOILERPLATE_FINGERPRINTS_FILENAME = "escriba_fingerprints.npz"
+BOILERPLATE_SHINGLE_SIZE = 4        # shingles de 4 palavras por janela
+BOILERPLATE_MINHASH_PERMUTATIONS = 64
+BOILERPLATE_LSH_BANDS = 16          # 16 bandas × 4 linhas: limiar efetivo ≈ (1/16)^(1/4) = 0.5
+BOILERPLATE_MIN_SIMILARITY = 0.5    # Jaccard estimado mínimo entre duas janelas
+BOILERPLATE_MIN_VIDEOS = 3          # a janela precisa se repetir em ≥3 outros vídeos do canal
+MERSENNE_PRIME_31 = (1 << 31) - 1
+
+
+class BoilerplateDetector:
+    """
+    Detecta janelas de transcrição que se repetem em muitos vídeos do canal
+    (vinhetas de abertura, encerramentos, leituras de patrocínio).
+
+    Cada janela vira uma assinatura MinHash dos seus shingles de palavras; o
+    LSH em bandas encontra candidatas parecidas sem comparar contra o canal
+    inteiro. As assinaturas ficam num .npz na pasta do canal, então cada vídeo
+    novo custa apenas o próprio hashing. Os primeiros vídeos do canal, convertidos
+    antes de existirem pares suficientes, só são reavaliados com
+    `--regen-md --force`, e apenas se a legenda ainda existir (solta, via
+    --keep-srt, ou no pacote de archive/); os demais mantêm o .md original.
+    """
+
+    def __init__(self, channel_dir_path: Path):
+        self.store_path = channel_dir_path / BOILERPLATE_FINGERPRINTS_FILENAME
+        # Assinaturas trocadas nesta sessão, reaplicadas se outro processo gravar o .npz antes do save
+        self._unsaved_video_rows_dict: dict[str, list[tuple[int, object]]] = {}
+        self._reset()
+        self.is_dirty = False
+        deps = _load_sparse_deps()
+        self.is_enabled = deps is not None
+        if self.is_enabled:
+            np = deps[0]
+            permutation_generator = np.random.default_rng(0x5EED)
+            self._hash_a = permutation_generator.integers(1, MERSENNE_PRIME_31, BOILERPLATE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+            self._hash_b = permutation_generator.integers(0, MERSENNE_PRIME_31, BOILERPLATE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+    def _reset(self) -> None:
+        """Esquece as assinaturas carregadas (o próximo acesso relê o disco)."""
+        self._signature_list: list = []      # arrays uint32 (BOILERPLATE_MINHASH_PERMUTATIONS,)
+        self._video_id_list: list[str] = []
+        self._start_ms_list: list[int] = []
+        self._is_live_list: list[bool] = []
+        self._video_rows_dict: dict[str, list[int]] = {}
+        self._band_buckets: list[dict[bytes, list[int]]] = [{} for _ in range(BOILERPLATE_LSH_BANDS)]
+        self._disk_signature: tuple[int, int] | None = None
+        self._is_loaded = False
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+        self._disk_signature = _file_signature(self.store_path)
+        if not self.store_path.exists():
+            return
+        np = _load_sparse_deps()[0]
+        try:
+            with np.load(self.store_path, allow_pickle=False) as npz_file:
+                signature_matrix = npz_file["signatures"]
+                video_ids = npz_file["video_ids"].tolist()
+                start_ms_values = npz_file["start_ms"].tolist()
+        except (OSError, KeyError, ValueError) as error_msg:
+            print_warn(f"Fingerprints de boilerplate ilegíveis ({self.store_path.name}), recriando: {error_msg}")
+            return
+        if signature_matrix.ndim != 2 or signature_matrix.shape[1] != BOILERPLATE_MINHASH_PERMUTATIONS:
+            return
+        for signature, video_id, start_ms in zip(signature_matrix, video_ids, start_ms_values):
+            self._add_row(video_id, start_ms, signature)
+
+    def _minhash(self, shingle_hashes: set[int]):
+        np = _load_sparse_deps()[0]
+        shingle_array = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+        # (a·x + b) mod p cabe em uint64: a < 2^31 e x < 2^32
+        hashed_matrix = (self._hash_a[:, None] * shingle_array[None, :] + self._hash_b[:, None]) % MERSENNE_PRIME_31
+        return hashed_matrix.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def _band_keys(signature) -> list[bytes]:
+        rows_per_band = BOILERPLATE_MINHASH_PERMUTATIONS // BOILERPLATE_LSH_BANDS
+        return [signature[i * rows_per_band:(i + 1) * rows_per_band].tobytes() for i in range(BOILERPLATE_LSH_BANDS)]
+
+    def _add_row(self, video_id: str, start_ms: int, signature) -> None:
+        row_idx = len(self._signature_list)
+        self._signature_list.append(signature)
+        self._video_id_list.append(video_id)
+        self._start_ms_list.append(start_ms)
+        self._is_live_list.append(True)
+        self._video_rows_dict.setdefault(video_id, []).append(row_idx)
+        for band_bucket, band_key in zip(self._band_buckets, self._band_keys(signature)):
+            band_bucket.setdefault(band_key, []).append(row_idx)
+
+    def _matching_video_ids(self, video_id: str, signature) -> set[str]:
+        """Outros vídeos com alguma janela parecida (candidatas do LSH confirmadas pela assinatura)."""
+        candidate_rows = set()
+        for band_bucket, band_key in zip(self._band_buckets, self._band_keys(signature)):
+            candidate_rows.update(band_bucket.get(band_key, ()))
+        matching_video_ids = set()
+        for row_idx in candidate_rows:
+            other_video_id = self._video_id_list[row_idx]
+            if other_video_id == video_id or other_video_id in matching_video_ids or not self._is_live_list[row_idx]:
+                continue
+            if (self._signature_list[row_idx] == signature).mean() >= BOILERPLATE_MIN_SIMILARITY:
+                matching_video_ids.add(other_video_id)
+        return matching_video_ids
+
+    def _replace_video_rows(self, video_id: str, new_rows: list[tuple[int, object]]) -> None:
+        for row_idx in self._video_rows_dict.pop(video_id, []):
+            self._is_live_list[row_idx] = False
+        for start_ms, signature in new_rows:
+            self._add_row(video_id, start_ms, signature)
+
+    def mark_windows(self, video_id: str, windows: list) -> int:
+        """
+        Marca `is_boilerplate` nas janelas do vídeo repetidas no canal e troca as
+        assinaturas do vídeo no store. Retorna quantas janelas foram marcadas.
+        """
+        if not self.is_enabled:
+            return 0
+        self._load()
+        for row_idx in self._video_rows_dict.pop(video_id, []):
+            self._is_live_list[row_idx] = False
+
+        boilerplate_count = 0
+        new_rows = []
+        for window in windows:
+            if not window.shingle_hashes:
+                continue
+            signature = self._minhash(window.shingle_hashes)
+            if len(self._matching_video_ids(video_id, signature)) >= BOILERPLATE_MIN_VIDEOS:
+                window.is_boilerplate = True
+                boilerplate_count += 1
+            new_rows.append((window.start_ms, signature))
+        # Inseridas depois da consulta: janelas do próprio vídeo não contam como repetição
+        self._replace_video_rows(video_id, new_rows)
+        self._unsaved_video_rows_dict[video_id] = new_rows
+        self.is_dirty = True
+        return boilerplate_count
+
+    def save(self) -> None:
+        """
+        Grava as assinaturas vivas atomicamente (.tmp + replace), apenas se houve mudança.
+        Sob a trava do arquivo: se outro processo o alterou desde a nossa leitura,
+        relê o disco e reaplica só os vídeos trocados nesta sessão.
+        """
+        if not self.is_dirty:
+            return
+        with AdvisoryFileLock(self.store_path):
+            self._load()
+            if _file_signature(self.store_path) != self._disk_signature:
+                self._reset()
+                self._load()
+                for video_id, new_rows in self._unsaved_video_rows_dict.items():
+                    self._replace_video_rows(video_id, new_rows)
+            self._write_locked()
+
+    def _write_locked(self) -> None:
+        np = _load_sparse_deps()[0]
+        live_rows = [row_idx for row_idx, is_live in enumerate(self._is_live_list) if is_live]
+        signature_matrix = (
+            np.stack([self._signature_list[row_idx] for row_idx in live_rows])
+            if live_rows else np.zeros((0, BOILERPLATE_MINHASH_PERMUTATIONS), dtype=np.uint32)
+        )
+        temp_path = self.store_path.with_name(f"{self.store_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, "wb") as file_descriptor:
+                np.savez_compressed(
+                    file_descriptor,
+                    signatures=signature_matrix,
+                    video_ids=np.asarray([self._video_id_list[row_idx] for row_idx in live_rows], dtype=str),
+                    start_ms=np.asarray([self._start_ms_list[row_idx] for row_idx in live_rows], dtype=np.int64),
+                )
+            temp_path.replace(self.store_path)
+            self._disk_signature = _file_signature(self.store_path)
+            self._unsaved_video_rows_dict.clear()
+            self.is_dirty = False
+        except OSError as error_msg:
+            print_warn(f"Falha ao salvar fingerprints de boilerplate: {error_msg}")
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+
+# ─── Pacote de Transcrições (archive/) ───────────────────────────────────────
+
+TRANSCRIPT_PACK_INDEX_FILENAME = "escriba_pack.idx"
+TRANSCRIPT_PACK_SEGMENT_TEMPLATE = "escriba_pack_{:04d}.bin"
+TRANSCRIPT_PACK_SEGMENT_MAX_BYTES = 256 * 1_048_576
+TRANSCRIPT_PACK_SUFFIXES = (".srt", ".md", ".json3", ".vtt")
+
+
+class PackedMember(NamedTuple):
+    """Posição de um arquivo dentro dos segmentos do pacote."""
+    segment_number: int
+    offset: int
+    length: int
+    size_bytes: int
+    mtime_ns: int
+    crc32: int
+
+
+class TranscriptPack:
+    """
+    Pacote append-only de transcrições em `archive/`, no lugar de milhares de
+    .srt/.md soltos.
+
+    Cada arquivo é comprimido individualmente (zlib) e anexado ao segmento
+    `escriba_pack_NNNN.bin` corrente (novo segmento a cada ~256 MB). O índice
+    `escriba_pack.idx` é um JSON por linha (nome → segmento, offset, tamanho),
+    também só anexado: reescrever um arquivo acrescenta uma nova entrada que
+    prevalece sobre a anterior. Ler um arquivo é um seek + uma descompressão.
+    """
+
+    def __init__(self, archive_dir_path: Path):
+        self.archive_dir_path = archive_dir_path
+        self.index_path = archive_dir_path / TRANSCRIPT_PACK_INDEX_FILENAME
+        self.file_prefix = f"{archive_dir_path.parent.name}-"
+        self._member_dict: dict[str, PackedMember] | None = None
+        self._video_names_dict: dict[str, list[str]] = {}
+        self._segment_handles_dict: dict[int, io.BufferedReader] = {}
+
+    def _members(self) -> dict[str, PackedMember]:
+        if self._member_dict is not None:
+            return self._member_dict
+        self._member_dict = {}
+        if self.index_path.is_file():
+            with open(self.index_path, "rb") as file_descriptor:
+                for line_content in file_descriptor:
+                    try:
+                        entry_dict = JSON_CODEC.loads(line_content)
+                        self._register(entry_dict["name"], PackedMember(*(entry_dict[field] for field in PackedMember._fields)))
+                    except Exception:
+                        continue  # linha truncada por interrupção durante o append
+        return self._member_dict
+
+    def _register(self, member_name: str, member: PackedMember) -> None:
+        if member_name not in self._member_dict and member_name.startswith(self.file_prefix):
+            video_id = member_name[len(self.file_prefix):len(self.file_prefix) + 11]
+            self._video_names_dict.setdefault(video_id, []).append(member_name)
+        self._member_dict[member_name] = member
+
+    def __contains__(self, member_name: str) -> bool:
+        return member_name in self._members()
+
+    def __len__(self) -> int:
+        return len(self._members())
+
+    def member(self, member_name: str) -> PackedMember | None:
+        return self._members().get(member_name)
+
+    def names(self, suffix: str | None = None) -> list[str]:
+        return sorted(name for name in self._members() if suffix is None or name.endswith(suffix))
+
+    def video_names(self, video_id: str, suffix: str | None = None) -> list[str]:
+        """Arquivos `<canal>-<VIDEO_ID>*` do pacote (consulta O(1) por vídeo)."""
+        self._members()
+        return [name for name in self._video_names_dict.get(video_id, ()) if suffix is None or name.endswith(suffix)]
+
+    def _segment_path(self, segment_number: int) -> Path:
+        return self.archive_dir_path / TRANSCRIPT_PACK_SEGMENT_TEMPLATE.format(segment_number)
+
+    def read_bytes(self, member_name: str) -> bytes:
+        member = self._members()[member_name]
+        segment_handle = self._segment_handles_dict.get(member.segment_number)
+        if segment_handle is None:
+            segment_handle = open(self._segment_path(member.segment_number), "rb")
+            self._segment_handles_dict[member.segment_number] = segment_handle
+        segment_handle.seek(member.offset)
+        member_bytes = zlib.decompress(segment_handle.read(member.length))
+        if zlib.crc32(member_bytes) != member.crc32:
+            raise ValueError(f"{member_name}: conteúdo corrompido no pacote (CRC divergente)")
+        return member_bytes
+
+    def read_text(self, member_name: str) -> str:
+        return self.read_bytes(member_name).decode("utf-8", errors="replace")
+
+    def extract(self, member_name: str, target_path: Path) -> Path:
+        """Materializa o arquivo no disco (mesmo mtime do original), para leitores que exigem um caminho."""
+        temp_path = target_path.with_name(f"{target_path.name}.{os.getpid()}.tmp")
+        try:
+            temp_path.write_bytes(self.read_bytes(member_name))
+            member = self._members()[member_name]
+            os.utime(temp_path, ns=(member.mtime_ns, member.mtime_ns))
+            temp_path.replace(target_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return target_path
+
+    def append(self, member_name: str, member_bytes: bytes, mtime_ns: int) -> PackedMember:
+        """
+        Anexa um arquivo ao segmento corrente e só então o registra no índice
+        (ambos com fsync). A trava do índice serializa os appends de processos
+        concorrentes, para que o offset lido seja o do próprio registro.
+        """
+        members_dict = self._members()
+        self.archive_dir_path.mkdir(parents=True, exist_ok=True)
+        compressed_bytes = zlib.compress(member_bytes, 6)
+        with AdvisoryFileLock(self.index_path):
+            self._repair_index_tail()
+            segment_number = max((member.segment_number for member in members_dict.values()), default=0)
+            while self._segment_path(segment_number + 1).exists():
+                segment_number += 1  # outro processo já abriu um segmento novo
+            segment_path = self._segment_path(segment_number)
+            if segment_path.exists() and segment_path.stat().st_size + len(compressed_bytes) > TRANSCRIPT_PACK_SEGMENT_MAX_BYTES:
+                segment_number += 1
+                segment_path = self._segment_path(segment_number)
+            with open(segment_path, "ab") as file_descriptor:
+                offset = file_descriptor.seek(0, os.SEEK_END)
+                file_descriptor.write(compressed_bytes)
+                file_descriptor.flush()
+                os.fsync(file_descriptor.fileno())
+            member = PackedMember(segment_number, offset, len(compressed_bytes), len(member_bytes), mtime_ns, zlib.crc32(member_bytes))
+            with open(self.index_path, "ab") as file_descriptor:
+                file_descriptor.write(JSON_CODEC.dumps({"name": member_name, **member._asdict()}, pretty=False) + b"\n")
+                file_descriptor.flush()
+                os.fsync(file_descriptor.fileno())
+        self._register(member_name, member)
+        return member
+
+    def _repair_index_tail(self) -> None:
+        """
+        Um append interrompido pode deixar a última linha do índice truncada (sem
+        `\\n`); o próximo registro seria colado nela e descartado na releitura.
+        Corta o índice de volta ao último `\\n` (o registro truncado não chegou a valer).
+        """
+        if not self.index_path.is_file():
+            return
+        with open(self.index_path, "r+b") as file_descriptor:
+            index_size = file_descriptor.seek(0, os.SEEK_END)
+            if index_size == 0:
+                return
+            file_descriptor.seek(index_size - 1)
+            if file_descriptor.read(1) == b"\n":
+                return
+            scan_end = index_size
+            while scan_end > 0:
+                scan_start = max(0, scan_end - 65536)
+                file_descriptor.seek(scan_start)
+                newline_idx = file_descriptor.read(scan_end - scan_start).rfind(b"\n")
+                if newline_idx != -1:
+                    file_descriptor.truncate(scan_start + newline_idx + 1)
+                    break
+                scan_end = scan_start
+            else:
+                file_descriptor.truncate(0)
+            file_descriptor.flush()
+            os.fsync(file_descriptor.fileno())
+
+    def close(self) -> None:
+        for segment_handle in self._segment_handles_dict.values():
+            segment_handle.close()
+        self._segment_handles_dict.clear()
+
+
+def pack_loose_transcripts(cwd_path: Path) -> None:
+    """
+    Modo offline (--pack): move para o pacote de `archive/` as legendas e .md
+    soltos do canal (pasta atual e archive/). Os arquivos só são apagados depois
+    que uma releitura do índice confirma a entrada (mesmo CRC e tamanho);
+    arquivos idênticos já empacotados são apenas removidos.
+    """
+    channel_dir_name = cwd_path.name
+    transcript_pack = TranscriptPack(cwd_path / "archive")
+    print_header(channel_dir_name, VERSION, "Empacotamento de transcrições")
+
+    loose_paths_list = []
+    for scan_dir, name_pattern in ((transcript_pack.archive_dir_path, "*"), (cwd_path, f"{glob.escape(channel_dir_name)}-*")):
+        if scan_dir.is_dir():
+            loose_paths_list.extend(
+                file_path for file_path in sorted(scan_dir.glob(name_pattern))
+                if file_path.suffix in TRANSCRIPT_PACK_SUFFIXES and file_path.is_file()
+            )
+    if not loose_paths_list:
+        print_info("Nenhuma transcrição solta para empacotar.")
+        return
+
+    print_section(f"{len(loose_paths_list)} arquivos soltos  {DIM}→ {transcript_pack.archive_dir_path.name}/{TRANSCRIPT_PACK_INDEX_FILENAME}{RESET}")
+    packed_count = 0
+    loose_bytes = packed_bytes = 0
+    packed_files_list: list[tuple[Path, int, int]] = []  # (arquivo solto, crc32, tamanho)
+    try:
+        for file_path in loose_paths_list:
+            file_bytes = file_path.read_bytes()
+            file_crc32 = zlib.crc32(file_bytes)
+            existing_member = transcript_pack.member(file_path.name)
+            if existing_member is None or existing_member.crc32 != file_crc32 or existing_member.size_bytes != len(file_bytes):
+                existing_member = transcript_pack.append(file_path.name, file_bytes, file_path.stat().st_mtime_ns)
+                packed_count += 1
+            loose_bytes += len(file_bytes)
+            packed_bytes += existing_member.length
+            packed_files_list.append((file_path, file_crc32, len(file_bytes)))
+    except KeyboardInterrupt:
+        print()
+        print_warn("Empacotamento interrompido; só os arquivos já confirmados no índice serão removidos.")
+    finally:
+        transcript_pack.close()
+
+    # Releitura do índice do disco: só apaga o solto cuja entrada sobreviveu
+    verified_pack = TranscriptPack(transcript_pack.archive_dir_path)
+    unverified_count = 0
+    for file_path, file_crc32, file_size in packed_files_list:
+        verified_member = verified_pack.member(file_path.name)
+        if verified_member is not None and verified_member.crc32 == file_crc32 and verified_member.size_bytes == file_size:
+            file_path.unlink()
+        else:
+            unverified_count += 1
+    if unverified_count:
+        print_warn(f"{unverified_count} arquivo(s) sem entrada válida no índice após a releitura; mantidos soltos.")
+    transcript_pack = verified_pack
+
+    print_ok(
+        f"{packed_count} arquivo(s) anexado(s) ao pacote  "
+        f"{DIM}{loose_bytes / 1_048_576:.1f} MB soltos → {packed_bytes / 1_048_576:.1f} MB comprimidos, {len(transcript_pack)} no total{RESET}"
+    )
+
+
 # ─── Download Individual ──────────────────────────────────────────────────────
 
+class SubtitleTrack(NamedTuple):
+    lang_key: str       # chave exata no info dict (ex: 'pt', 'pt-BR', 'en-orig')
+    is_automatic: bool  # True = legenda automática (ASR), False = manual
+
+
+def _subtitle_locale_rank(lang_key: str, language_pattern_string: str) -> int | None:
+    """
+    Quão bem uma chave de legenda atende a um padrão de idioma (menor = melhor):
+    0 = locale exato ('pt'), 1 = original do ASR ('pt-orig'), 2 = casa com o regex,
+    3 = mesma língua base ('pt-BR'). None = não serve.
+    """
+    base_lang = re.sub(r"[^A-Za-z].*$", "", language_pattern_string.strip("^$")).lower()
+    normalized_key = lang_key.lower()
+    if normalized_key == base_lang:
+        return 0
+    if normalized_key == f"{base_lang}-orig":
+        return 1
+    try:
+        if re.fullmatch(language_pattern_string, lang_key):
+            return 2
+    except re.error:
+        pass
+    if base_lang and re.split(r"[-_]", normalized_key)[0] == base_lang:
+        return 3
+    return None
+
+
+def select_subtitle_track(
+    info_dict: dict, language_opt_string: str, cached_track_dict: dict | None = None
+) -> SubtitleTrack | None:
+    """
+    Escolhe UMA trilha a partir do info dict do yt-dlp: manual antes de automática,
+    locale exato antes de variantes. A escolha em cache do canal (mesmo filtro de
+    idioma) é tentada primeiro, evitando reavaliar as trilhas a cada vídeo.
+    """
+    manual_tracks_dict = info_dict.get("subtitles") or {}
+    automatic_tracks_dict = info_dict.get("automatic_captions") or {}
+
+    if cached_track_dict and cached_track_dict.get("language_filter") == language_opt_string:
+        cached_lang_key = cached_track_dict.get("lang")
+        if cached_lang_key in manual_tracks_dict:
+            return SubtitleTrack(cached_lang_key, False)
+        has_manual_candidate = any(
+            _subtitle_locale_rank(lang_key, language_pattern_string) is not None
+            for language_pattern_string in language_opt_string.split(",") for lang_key in manual_tracks_dict
+        )
+        if cached_lang_key in automatic_tracks_dict and not has_manual_candidate:
+            return SubtitleTrack(cached_lang_key, True)
+
+    for language_pattern_string in language_opt_string.split(","):
+        for tracks_dict, is_automatic in ((manual_tracks_dict, False), (automatic_tracks_dict, True)):
+            ranked_keys_list = [
+                (rank, lang_key) for lang_key in tracks_dict
+                if (rank := _subtitle_locale_rank(lang_key, language_pattern_string)) is not None
+            ]
+            if ranked_keys_list:
+                return SubtitleTrack(min(ranked_keys_list)[1], is_automatic)
+    return None
+
+
+def fetch_native_subtitle(
+    info_dict: dict, subtitle_track: SubtitleTrack, output_template_string: str, http_session: requests.Session | None = None
+) -> Path | None:
+    """
+    Baixa a trilha escolhida no formato nativo do YouTube (json3, senão vtt) direto
+    da URL listada no info dict, com os headers HTTP do próprio yt-dlp e, se houver,
+    a sessão com a jar de cookies compartilhada (`CookieJarManager.session`).
+    Grava `<template>.<lang>.<ext>` e retorna o Path, ou None se não foi possível.
+    """
+    tracks_dict = info_dict.get("automatic_captions" if subtitle_track.is_automatic else "subtitles") or {}
+    formats_by_ext = {entry.get("ext"): entry for entry in tracks_dict.get(subtitle_track.lang_key) or ()}
+    for native_ext in ("json3", "vtt"):
+        track_entry = formats_by_ext.get(native_ext)
+        if not track_entry or not track_entry.get("url"):
+            continue
+        try:
+            response = (http_session or requests).get(track_entry["url"], headers=info_dict.get("http_headers") or {}, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException:
+            continue
+        if not response.content.strip():
+            continue
+        native_subtitle_path = Path(f"{output_template_string}.{subtitle_track.lang_key}.{native_ext}")
+        native_subtitle_path.write_bytes(response.content)
+        return native_subtitle_path
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def _load_yt_dlp_module():
+    """Módulo yt_dlp para rodar a etapa --load-info-json in-process (None se não estiver instalado)."""
+    try:
+        import yt_dlp
+        return yt_dlp
+    except ImportError:
+        return None
+
+
+def _run_yt_dlp_in_process(command_list: list[str]) -> int | None:
+    """
+    Roda um comando `python -m yt_dlp ...` pelo módulo yt_dlp neste processo, com os
+    mesmos argumentos interpretados por `yt_dlp.parse_options` (cookies, -o,
+    --convert-subs...). Usado só para --load-info-json, que não extrai a página.
+    Retorna o exit code, ou None se o módulo não estiver disponível ou recusar os
+    argumentos (o chamador cai no subprocesso).
+    """
+    yt_dlp = _load_yt_dlp_module()
+    if yt_dlp is None or "yt_dlp" not in command_list:
+        return None
+    try:
+        parsed_options = yt_dlp.parse_options(command_list[command_list.index("yt_dlp") + 1:])
+    except (SystemExit, Exception):  # parser.error() encerra via SystemExit
+        return None
+    ydl_opts = dict(parsed_options.ydl_opts)
+    if CONSOLE.is_json:
+        ydl_opts["logtostderr"] = True  # mesma regra do subprocesso: nada do yt-dlp no stdout
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.download_with_info_file(parsed_options.options.load_info_filename)
+    except yt_dlp.utils.DownloadError:
+        return 1
+
+
+def _run_yt_dlp(command_list: list[str]) -> int:
+    """Executa o yt-dlp repassando Ctrl+C (termina o processo filho e repropaga)."""
+    # Em --log-format json a saída do yt-dlp vai para o stderr, fora do stream de eventos
+    subprocess_instance = subprocess.Popen(command_list, stdout=sys.stderr if CONSOLE.is_json else None)
+    try:
+        subprocess_instance.wait()
+    except KeyboardInterrupt:
+        subprocess_instance.terminate()
+        try:
+            subprocess_instance.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            subprocess_instance.kill()
+        raise  # repropaga para o handler principal
+    return subprocess_instance.returncode
+
+
 def download_video(
     yt_dlp_cmd_list: list[str],
     cookie_args_list: list[str],
@@ -1481,9 +4030,27 @@ def download_video(
     channel_dir_name: str,
     audio_only_flag: bool,
     output_dir_path: Path | None = None,
+    extra_args_list: list[str] | None = None,
+    channel_state: ChannelState | None = None,
+    native_subs_flag: bool = False,
+    per_video_language_flag: bool = False,
+    http_session: requests.Session | None = None,
 ) -> int:
     """
     Executa o yt-dlp para baixar legendas ou áudio de um único vídeo.
+    `extra_args_list` é repassado ao yt-dlp (ex: --limit-rate da fila de áudio).
+
+    Legendas em duas etapas: a primeira grava só o .info.json (o mesmo que o harvest
+    consome); a trilha é escolhida a partir dele (`select_subtitle_track`) e a
+    segunda etapa baixa exatamente essa trilha via --load-info-json, sem nova
+    extração da página. Com o módulo yt_dlp importável, a segunda etapa roda
+    in-process (um único spawn do yt-dlp por vídeo); sem ele, num subprocesso.
+    A escolha fica em cache no `channel_state`.
+    Com `native_subs_flag`, a trilha é baixada no formato nativo (json3/vtt) direto
+    da URL do info dict, sem o pós-processamento do ffmpeg (--convert-subs).
+    Com `per_video_language_flag` (idioma não forçado por --lang), o idioma falado
+    do vídeo (info dict) é gravado no state e, se divergir do canal, define o
+    filtro de trilha só deste vídeo (canais multilíngues).
     Retorna o exit code.
     """
     output_template_string = f"{channel_dir_name}-{video_id}"
@@ -1493,36 +4060,84 @@ def download_video(
     if output_dir_path:
         output_template_string = str(output_dir_path / output_template_string)
 
-    download_cmd_list = (
+    base_cmd_list = (
         yt_dlp_cmd_list
         + ["--js-runtimes", f"node:{NODE_PATH}"]
         + ["--ignore-no-formats-error"]
-        + ["--write-info-json"]
-        + (["-f", "ba[ext=webm]"] if audio_only_flag else ["--skip-download", "--write-auto-sub", "--convert-subs", "srt"])
         + cookie_args_list
-        + (["--sub-langs", language_opt_string] if not audio_only_flag else [])
+        + (extra_args_list or [])
         + ["-o", output_template_string]
-        + [f"https://www.youtube.com/watch?v={video_id}"]
     )
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+
+    if audio_only_flag:
+        return _run_yt_dlp(base_cmd_list + ["--write-info-json", "-f", "ba[ext=webm]", video_url])
 
-    subprocess_instance = subprocess.Popen(download_cmd_list)
+    # Etapa 1: apenas metadados (lista de trilhas disponíveis)
+    info_exit_code = _run_yt_dlp(base_cmd_list + ["--write-info-json", "--skip-download", video_url])
+    info_json_path = Path(f"{output_template_string}.info.json")
+    if info_exit_code != 0 or not info_json_path.exists():
+        return info_exit_code
     try:
-        subprocess_instance.wait()
-    except KeyboardInterrupt:
-        subprocess_instance.terminate()
-        try:
-            subprocess_instance.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            subprocess_instance.kill()
-        raise  # repropaga para o handler principal
-    return subprocess_instance.returncode
+        info_dict = JSON_CODEC.load_path(info_json_path)
+    except Exception:
+        info_dict = {}
+
+    channel_language_filter = language_opt_string
+    video_record = channel_state.get(video_id) if channel_state is not None else None
+    video_language = infer_info_language(info_dict) or (video_record.get("language") if video_record is not None else None)
+    if video_record is not None and video_language and video_record.get("language") != video_language:
+        video_record["language"] = video_language
+    if (
+        per_video_language_flag and video_language
+        and all(_subtitle_locale_rank(video_language, pattern) is None for pattern in language_opt_string.split(","))
+    ):
+        language_opt_string = f"^{video_language}$"
+
+    if "subtitles" not in info_dict and "automatic_captions" not in info_dict:
+        # Info dict sem listagem de trilhas: volta ao filtro por regex do idioma
+        return _run_yt_dlp(
+            base_cmd_list
+            + ["--skip-download", "--write-auto-sub", "--convert-subs", "srt", "--sub-langs", language_opt_string, video_url]
+        )
+
+    cached_track_dict = channel_state.subtitle_track_dict if channel_state is not None else None
+    subtitle_track = select_subtitle_track(info_dict, language_opt_string, cached_track_dict)
+    if subtitle_track is None:
+        return 0  # sem trilha no idioma: tratado como "sem legenda" pelo chamador
+
+    if channel_state is not None and language_opt_string == channel_language_filter:
+        channel_state.set_subtitle_track({
+            "language_filter": language_opt_string,
+            "lang": subtitle_track.lang_key,
+            "automatic": subtitle_track.is_automatic,
+        })
+
+    track_args_list = (
+        (["--write-auto-subs"] if subtitle_track.is_automatic else ["--write-subs"])
+        + ["--sub-langs", f"^{re.escape(subtitle_track.lang_key)}$"]
+    )
+    if native_subs_flag:
+        if fetch_native_subtitle(info_dict, subtitle_track, output_template_string, http_session):
+            return 0
+        # Download direto falhou: o yt-dlp baixa a trilha nativa, ainda sem ffmpeg
+        load_info_cmd_list = base_cmd_list + ["--load-info-json", str(info_json_path), "--skip-download", "--sub-format", "json3/vtt"]
+    else:
+        # Etapa 2: baixa somente a trilha escolhida, reaproveitando o info dict
+        load_info_cmd_list = base_cmd_list + ["--load-info-json", str(info_json_path), "--skip-download", "--convert-subs", "srt"]
+    load_info_cmd_list += track_args_list
+
+    in_process_exit_code = _run_yt_dlp_in_process(load_info_cmd_list)
+    if in_process_exit_code is not None:
+        return in_process_exit_code
+    return _run_yt_dlp(load_info_cmd_list)
 
 
 def harvest_and_delete_info_json(
     cwd_path: Path,
     channel_dir_name: str,
     video_id: str,
-    video_dict: dict,
+    video_dict: VideoRecord,
 ) -> bool:
     """
     Extrai metadados do arquivo .info.json (título, data, duração, views),
@@ -1534,8 +4149,7 @@ def harvest_and_delete_info_json(
     
     harvested_flag = False
     try:
-        with open(info_json_path, encoding="utf-8") as f:
-            meta = json.load(f)
+        meta = JSON_CODEC.load_path(info_json_path)
 
         if not video_dict.get("title") or video_dict["title"] in ("N/A", "", "Avulso"):
             video_dict["title"] = meta.get("title") or video_dict.get("title", "N/A")
@@ -1549,6 +4163,12 @@ def harvest_and_delete_info_json(
             video_dict["channel"] = meta.get("channel") or meta.get("uploader")
         if not video_dict.get("view_count"):
             video_dict["view_count"] = meta.get("view_count")
+        if not video_dict.get("channel_id") and meta.get("channel_id"):
+            video_dict["channel_id"] = meta["channel_id"]
+        if not video_dict.get("language"):
+            video_language = infer_info_language(meta)
+            if video_language:
+                video_dict["language"] = video_language
         
         harvested_flag = True
     except Exception:
@@ -1562,6 +4182,278 @@ def harvest_and_delete_info_json(
     return harvested_flag
 
 
+# ─── Fila de Áudio Fallback ───────────────────────────────────────────────────
+
+RATE_LIMIT_REGEX_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([KMG]?)$", re.IGNORECASE)
+RATE_LIMIT_UNIT_MULTIPLIERS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate_limit(rate_limit_string: str) -> int:
+    """Converte uma taxa no formato do yt-dlp (ex: 500K, 2M, 1.5M) em bytes/s."""
+    regex_match_result = RATE_LIMIT_REGEX_PATTERN.match(rate_limit_string.strip())
+    if not regex_match_result:
+        raise argparse.ArgumentTypeError(f"taxa inválida: '{rate_limit_string}' (use ex: 500K, 2M)")
+    number_string, unit_string = regex_match_result.groups()
+    return int(float(number_string) * RATE_LIMIT_UNIT_MULTIPLIERS[unit_string.upper()])
+
+
+class AudioFallbackResult(NamedTuple):
+    video_id: str
+    exit_code: int
+    audio_path: Path | None
+    audio_size_bytes: int
+
+
+class AudioFallbackLane:
+    """
+    Fila independente de áudio fallback (--audio-fallback).
+
+    Os downloads de áudio rodam em um pool próprio de workers, em paralelo à fila
+    de legendas, com o teto de banda total dividido entre os workers via
+    `--limit-rate` do yt-dlp. Os workers só executam o yt-dlp e localizam o
+    arquivo; o resultado é aplicado no ChannelState pela thread principal
+    (`apply_completed`/`drain`), então o state nunca é mutado em paralelo.
+    """
+
+    def __init__(
+        self,
+        yt_dlp_cmd_list: list[str],
+        cookie_manager: CookieJarManager,
+        channel_dir_name: str,
+        cwd_path: Path,
+        worker_count: int = 2,
+        rate_limit_bytes: int | None = None,
+    ):
+        self.yt_dlp_cmd_list = yt_dlp_cmd_list
+        self.cookie_manager = cookie_manager
+        self.channel_dir_name = channel_dir_name
+        self.cwd_path = cwd_path
+        self.audios_dir_path = cwd_path / "audios"
+        self.worker_count = max(1, worker_count)
+        self.extra_args_list = ["--quiet", "--no-warnings", "--no-progress"]
+        if rate_limit_bytes:
+            self.extra_args_list += ["--limit-rate", str(max(1, rate_limit_bytes // self.worker_count))]
+        self._executor = ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="escriba-audio")
+        self._pending_futures: dict = {}  # Future → video_id
+        self._queued_id_set: set[str] = set()
+        self.downloaded_count = 0
+        self.error_count = 0
+
+    def __len__(self) -> int:
+        return len(self._pending_futures)
+
+    def needs_audio(self, video_record: VideoRecord) -> bool:
+        return not video_record.get("audio_downloaded") and video_record["video_id"] not in self._queued_id_set
+
+    def submit(self, video_record: VideoRecord) -> bool:
+        """Enfileira o áudio do vídeo. Retorna False se já baixado ou já na fila."""
+        if not self.needs_audio(video_record):
+            return False
+        self.audios_dir_path.mkdir(exist_ok=True)
+        video_id = video_record["video_id"]
+        self._queued_id_set.add(video_id)
+        self._pending_futures[self._executor.submit(self._download, video_id)] = video_id
+        return True
+
+    def _download(self, video_id: str) -> AudioFallbackResult:
+        """Executado nos workers: baixa o áudio e localiza o arquivo final."""
+        exit_code = download_video(
+            yt_dlp_cmd_list=self.yt_dlp_cmd_list,
+            cookie_args_list=self.cookie_manager.cookie_args_list,
+            video_id=video_id,
+            language_opt_string="",
+            channel_dir_name=self.channel_dir_name,
+            audio_only_flag=True,
+            output_dir_path=self.audios_dir_path,
+            extra_args_list=self.extra_args_list,
+        )
+        audio_path = None
+        for candidate_path in self.audios_dir_path.glob(f"{self.channel_dir_name}-{video_id}.*"):
+            if candidate_path.name.endswith(".info.json"):
+                # Os metadados já foram colhidos pela fila de legendas
+                candidate_path.unlink(missing_ok=True)
+            elif candidate_path.suffix not in (".part", ".ytdl", ".tmp"):
+                audio_path = candidate_path
+        if exit_code != 0 or audio_path is None:
+            return AudioFallbackResult(video_id, exit_code or 1, None, 0)
+        return AudioFallbackResult(video_id, 0, audio_path, audio_path.stat().st_size)
+
+    def _apply(self, result: AudioFallbackResult, channel_state: ChannelState, indentation_prefix: str) -> None:
+        self._queued_id_set.discard(result.video_id)
+        video_record = channel_state.get(result.video_id)
+        if result.audio_path is None:
+            self.error_count += 1
+            print_err(f"{result.video_id}  {DIM}falha ao baixar áudio fallback (código {result.exit_code}){RESET}", indentation_prefix)
+            return
+        self.downloaded_count += 1
+        if video_record is not None:
+            video_record["audio_path"] = result.audio_path.relative_to(self.cwd_path).as_posix()
+            video_record["audio_size_bytes"] = result.audio_size_bytes
+            video_record["audio_downloaded"] = True
+        print_ok(
+            f"{result.video_id}  {DIM}áudio fallback salvo em audios/ ({result.audio_size_bytes / 1_048_576:.1f} MB){RESET}",
+            indentation_prefix,
+        )
+
+    def apply_completed(self, channel_state: ChannelState, indentation_prefix: str = "    ") -> int:
+        """Aplica no state os downloads já concluídos, sem bloquear. Retorna quantos foram aplicados."""
+        completed_futures = [future for future in self._pending_futures if future.done()]
+        for future in completed_futures:
+            video_id = self._pending_futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = AudioFallbackResult(video_id, 1, None, 0)
+                print_warn(f"{video_id}  {DIM}erro na fila de áudio: {e}{RESET}", indentation_prefix)
+            self._apply(result, channel_state, indentation_prefix)
+        return len(completed_futures)
+
+    def drain(self, channel_state: ChannelState, indentation_prefix: str = "    ") -> None:
+        """Aguarda a fila esvaziar, aplicando cada resultado assim que concluído."""
+        if self._pending_futures:
+            print_info(f"Aguardando {BOLD}{len(self._pending_futures)}{RESET} áudios na fila de fallback...")
+        for future in as_completed(list(self._pending_futures)):
+            if future in self._pending_futures:
+                self.apply_completed(channel_state, indentation_prefix)
+        self._executor.shutdown(wait=True)
+
+    def shutdown(self, channel_state: ChannelState, indentation_prefix: str = "    ") -> None:
+        """Interrupção: cancela o que não começou e registra o que já terminou."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for future in [future for future in self._pending_futures if future.cancelled()]:
+            self._queued_id_set.discard(self._pending_futures.pop(future))
+        self.apply_completed(channel_state, indentation_prefix)
+
+
+# ─── Profiling (--profile) ────────────────────────────────────────────────────
+
+class HotPathProfiler:
+    """
+    Perfilador opt-in dos caminhos quentes (conversão MD e I/O do state JSON).
+
+    Cada chamada instrumentada roda sob um `cProfile.Profile` próprio e entre dois
+    snapshots do `tracemalloc`. Apenas os `top_n` dumps mais lentos permanecem em
+    disco; os demais são descartados assim que saem do ranking. Sem `--profile`
+    nada é instalado: as funções originais continuam no namespace do módulo.
+    """
+
+    PROFILED_FUNCTION_NAMES = ("srt_to_md", "load_or_create_channel_state", "save_channel_state_json")
+
+    def __init__(self, output_dir_path: Path, top_n: int = 5):
+        self.output_dir_path = output_dir_path
+        self.top_n = max(1, top_n)
+        self.call_count = 0
+        self._active_depth = 0
+        self._slowest_heap: list[tuple[float, int, str, int, Path]] = []
+        self._aggregate_stats: pstats.Stats | None = None
+        self._allocation_totals: Counter = Counter()
+
+    def install(self) -> None:
+        """Substitui as funções quentes do módulo por versões instrumentadas."""
+        self.output_dir_path.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        module_namespace = globals()
+        for function_name in self.PROFILED_FUNCTION_NAMES:
+            module_namespace[function_name] = self.wrap(module_namespace[function_name])
+
+    def wrap(self, target_function):
+        """Retorna um wrapper que perfila `target_function` a cada chamada."""
+        @functools.wraps(target_function)
+        def _profiled_call(*args, **kwargs):
+            # Chamadas aninhadas entram no perfil da chamada externa
+            if self._active_depth:
+                return target_function(*args, **kwargs)
+
+            self._active_depth += 1
+            call_profile = cProfile.Profile()
+            snapshot_before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            start_time = time.perf_counter()
+            try:
+                return call_profile.runcall(target_function, *args, **kwargs)
+            finally:
+                elapsed_seconds = time.perf_counter() - start_time
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                snapshot_after = tracemalloc.take_snapshot()
+                self._active_depth -= 1
+                call_label = f"{target_function.__name__}({self._describe_call(args)})"
+                self._record_call(call_label, elapsed_seconds, peak_bytes, call_profile, snapshot_before, snapshot_after)
+        return _profiled_call
+
+    @staticmethod
+    def _describe_call(args: tuple) -> str:
+        """Usa o primeiro argumento (Path do .srt ou do JSON) como rótulo legível."""
+        if not args:
+            return ""
+        first_arg = args[0]
+        return first_arg.name if isinstance(first_arg, Path) else str(first_arg)[:60]
+
+    def _record_call(
+        self,
+        call_label: str,
+        elapsed_seconds: float,
+        peak_bytes: int,
+        call_profile: cProfile.Profile,
+        snapshot_before,
+        snapshot_after,
+    ) -> None:
+        self.call_count += 1
+        call_stats = pstats.Stats(call_profile)
+        if self._aggregate_stats is None:
+            self._aggregate_stats = call_stats
+        else:
+            self._aggregate_stats.add(call_profile)
+
+        allocation_diff_list = snapshot_after.compare_to(snapshot_before, "lineno")
+        for allocation_stat in allocation_diff_list:
+            if allocation_stat.size_diff > 0:
+                self._allocation_totals[str(allocation_stat.traceback)] += allocation_stat.size_diff
+
+        # Só grava dump se a chamada entra no ranking das N mais lentas
+        if len(self._slowest_heap) >= self.top_n and elapsed_seconds <= self._slowest_heap[0][0]:
+            return
+
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", call_label).strip("_")[:80]
+        dump_path = self.output_dir_path / f"{self.call_count:04d}-{safe_label}.prof"
+        call_profile.dump_stats(str(dump_path))
+        with open(dump_path.with_suffix(".alloc.txt"), "w", encoding="utf-8") as file_descriptor:
+            file_descriptor.write(f"{call_label}  {elapsed_seconds:.3f}s  pico {peak_bytes / 1_048_576:.1f} MB\n\n")
+            for allocation_stat in allocation_diff_list[:25]:
+                file_descriptor.write(f"{allocation_stat}\n")
+
+        heap_entry = (elapsed_seconds, self.call_count, call_label, peak_bytes, dump_path)
+        if len(self._slowest_heap) < self.top_n:
+            heapq.heappush(self._slowest_heap, heap_entry)
+        else:
+            evicted_entry = heapq.heappushpop(self._slowest_heap, heap_entry)
+            evicted_entry[4].unlink(missing_ok=True)
+            evicted_entry[4].with_suffix(".alloc.txt").unlink(missing_ok=True)
+
+    def print_summary(self, top_functions_count: int = 15, top_allocations_count: int = 10) -> None:
+        """Imprime as chamadas mais lentas, as funções de maior custo e as maiores alocações."""
+        print_section(f"Profiling  {DIM}({self.call_count} chamadas instrumentadas){RESET}")
+        if not self.call_count or self._aggregate_stats is None:
+            print_info("Nenhuma chamada instrumentada foi executada.")
+            return
+
+        print_info(f"{BOLD}Chamadas mais lentas{RESET} {DIM}(dumps em {self.output_dir_path}){RESET}")
+        for elapsed_seconds, _, call_label, peak_bytes, dump_path in sorted(self._slowest_heap, reverse=True):
+            print(f"      {elapsed_seconds:>8.3f}s  {peak_bytes / 1_048_576:>7.1f} MB  {call_label}  {DIM}{dump_path.name}{RESET}")
+
+        print_info(f"{BOLD}Top funções (tempo cumulativo){RESET}")
+        stats_stream = io.StringIO()
+        self._aggregate_stats.stream = stats_stream
+        self._aggregate_stats.sort_stats("cumulative").print_stats(top_functions_count)
+        for stats_line in stats_stream.getvalue().splitlines():
+            if stats_line.strip() and not stats_line.lstrip().startswith(("Ordered by", "List reduced")):
+                print(f"      {DIM}{stats_line.strip()}{RESET}")
+
+        print_info(f"{BOLD}Top alocações (bytes líquidos retidos){RESET}")
+        for traceback_label, size_bytes in self._allocation_totals.most_common(top_allocations_count):
+            print(f"      {size_bytes / 1024:>10.1f} KiB  {traceback_label}")
+
+
 # ─── Argparse ─────────────────────────────────────────────────────────────────
 
 def parse_args() -> argparse.Namespace:
@@ -1592,18 +4484,74 @@ def parse_args() -> argparse.Namespace:
                         help="Envia um arquivo .md específico para o Notion e encerra o script")
     cli_parser.add_argument("--keep-srt", action="store_true",
                         help="Mantém o arquivo .srt no disco após a conversão para .md")
+    cli_parser.add_argument("--strip-boilerplate", action="store_true",
+                        help="Remove do .md os trechos repetidos em vários vídeos do canal (vinhetas, encerramentos, publis); por padrão só ficam fora dos tópicos")
+    cli_parser.add_argument("--native-subs", action="store_true",
+                        help="Baixa a legenda no formato nativo (json3/vtt) e lê direto no motor MD, sem ffmpeg (.srt só com --keep-srt ou --no-md)")
     cli_parser.add_argument("--audio-fallback", action="store_true",
                         help="Baixa o áudio quando a legenda não está disponível (padrão: apenas registra)")
+    cli_parser.add_argument("--audio-workers", type=int, default=2, metavar="N",
+                        help="Downloads de áudio fallback simultâneos, em paralelo às legendas (padrão: 2)")
+    cli_parser.add_argument("--audio-rate-limit", type=parse_rate_limit, default=None, metavar="TAXA",
+                        help="Teto de banda total da fila de áudio fallback (ex: 500K, 2M). Padrão: sem limite")
     cli_parser.add_argument("-d", "--date", default="", metavar="DATA",
                         help="Data limite (posterior a). Formato: YYYYMMDD (ex: 20260101)")
     cli_parser.add_argument("-rc", "--refresh-cookies", action="store_true",
                         help="Força a extração de novos cookies do Chrome (apaga cookies.txt existente)")
+    cli_parser.add_argument("--full-sync", action="store_true",
+                        help="Sempre lista o canal inteiro, sem a pré-checagem pelo feed de uploads (no --watch, a cada --resync-days dias; entre elas, só os mais recentes)")
+    cli_parser.add_argument("--resync-days", type=float, default=FULL_RESYNC_INTERVAL_DAYS, metavar="DIAS",
+                        help=f"Força a listagem completa quando a última tiver mais de N dias, mesmo sem novidades no feed (padrão: {FULL_RESYNC_INTERVAL_DAYS:g})")
+    cli_parser.add_argument("--library-root", default=None, metavar="PATH",
+                        help=f"Raiz da biblioteca com o índice global {LIBRARY_INDEX_FILENAME}, criado ali se não existir (padrão: o índice já existente mais próximo acima da pasta atual; sem ele, nenhum índice)")
     cli_parser.add_argument("--ignore-metadata", action="store_true",
                         help="Pula a auto-recuperação de datas e títulos ausentes no histórico JSON")
     cli_parser.add_argument("-f", "--fast", action="store_true",
                         help="Modo rápido: pula o tempo de espera entre downloads")
     cli_parser.add_argument("--regen-md", action="store_true",
                         help="Modo offline: regenera .md a partir de todos os .srt na pasta atual (não faz downloads)")
+    cli_parser.add_argument("--force", action="store_true",
+                        help="Com --regen-md, regenera também os .md já existentes (ex: para reavaliar vinhetas/boilerplate com os fingerprints atuais do canal)")
+    cli_parser.add_argument("--shard", type=parse_shard_spec, default=None, metavar="i/N",
+                        help="Processa só a fatia i de N do canal (partição estável por video_id, para dividir entre máquinas); as mudanças vão também para escriba_<canal>.shard-i-of-N.jsonl")
+    cli_parser.add_argument("--merge-shards", nargs="*", default=None, metavar="DELTA",
+                        help="Modo offline: funde no escriba_*.json os deltas .jsonl dos shards (padrão: todos os da pasta)")
+    cli_parser.add_argument("--plan", nargs="?", const="-", default=None, metavar="ARQUIVO",
+                        help="Modo offline: calcula o plano da execução (a baixar, só converter MD, sem metadados, etc.) a partir do state e da pasta, sem yt-dlp, e grava em JSON (stdout sem ARQUIVO)")
+    cli_parser.add_argument("--execute-plan", default=None, metavar="ARQUIVO",
+                        help="Executa exatamente os vídeos de um plano do --plan, sem refazer a listagem do canal")
+    cli_parser.add_argument("--pack", action="store_true",
+                        help="Modo offline: move as legendas e .md soltos do canal para o pacote comprimido de archive/ (lido direto pelo --regen-md e --bundle)")
+    cli_parser.add_argument("--bundle", action="store_true",
+                        help="Modo offline: junta os .md do canal em volumes para o NotebookLM (notebooklm/), em ordem de publicação, regravando só os volumes alterados")
+    cli_parser.add_argument("--bundle-max-words", type=int, default=BUNDLE_MAX_WORDS, metavar="N",
+                        help=f"Máximo de palavras por volume do --bundle (padrão: {BUNDLE_MAX_WORDS})")
+    cli_parser.add_argument("--bundle-max-mb", type=float, default=BUNDLE_MAX_MB, metavar="MB",
+                        help=f"Tamanho máximo por volume do --bundle (padrão: {BUNDLE_MAX_MB:g} MB)")
+    cli_parser.add_argument("-s", "--search", default=None, metavar="CONSULTA",
+                        help="Busca nas transcrições .md de toda a biblioteca (sintaxe FTS5) e lista os trechos com link para o instante")
+    cli_parser.add_argument("--related", default=None, metavar="VIDEO_ID[@N]",
+                        help="Lista segmentos de outros vídeos do canal parecidos com o vídeo (ou com seu N-ésimo tópico), sem reprocessar texto")
+    cli_parser.add_argument("--search-limit", type=int, default=20, metavar="N",
+                        help="Máximo de resultados do --search e do --related (padrão: 20)")
+    cli_parser.add_argument("--watch", action="store_true",
+                        help="Modo daemon: acompanha todos os canais (pastas com escriba_*.json) sob a pasta atual, com estado quente")
+    cli_parser.add_argument("--watch-min-interval", type=float, default=15, metavar="MIN",
+                        help="Intervalo mínimo entre verificações de um canal ativo no --watch (padrão: 15 min)")
+    cli_parser.add_argument("--watch-max-interval", type=float, default=1440, metavar="MIN",
+                        help="Intervalo máximo entre verificações de um canal dormente no --watch (padrão: 1440 min)")
+    cli_parser.add_argument("--watch-discovery-limit", type=int, default=50, metavar="N",
+                        help="Vídeos mais recentes listados por ciclo no --watch após a carga inicial (padrão: 50)")
+    cli_parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="text: saída colorida (barras só em terminal); json: um evento JSON por linha no stdout, texto humano no stderr")
+    cli_parser.add_argument("--compact-state", action="store_true",
+                        help="Grava o escriba_*.json sem indentação (menor e mais rápido em canais grandes)")
+    cli_parser.add_argument("--profile", action="store_true",
+                        help="Perfila srt_to_md e o I/O do state JSON (cProfile + tracemalloc) e imprime um resumo ao final")
+    cli_parser.add_argument("--profile-top", type=int, default=5, metavar="N",
+                        help="Quantidade de chamadas mais lentas com dump salvo em disco (padrão: 5)")
+    cli_parser.add_argument("--profile-dir", default="escriba_profile", metavar="PATH",
+                        help="Pasta dos dumps .prof/.alloc.txt do --profile (padrão: ./escriba_profile)")
     cli_parser.add_argument("-v", "--version", action="version", version=f"Versão: {VERSION}")
     return cli_parser.parse_args()
 
@@ -1658,8 +4606,7 @@ def setup_session(cli_args: argparse.Namespace) -> SessionConfig:
             sys.exit(1)
             
         try:
-            with open(latest_json_path, "r", encoding="utf-8") as file_descriptor:
-                json_data = json.load(file_descriptor)
+            json_data = JSON_CODEC.load_path(latest_json_path)
                 
             if isinstance(json_data, dict) and "channel" in json_data:
                 cli_args.canal = json_data["channel"]
@@ -1695,105 +4642,151 @@ def setup_session(cli_args: argparse.Namespace) -> SessionConfig:
         yt_dlp_cmd_list=yt_dlp_cmd_list,
         channel_input_url_or_handle=channel_input_string,
         channel_url=channel_url_string,
+        uploads_feed_client=None if cli_args.full_sync else YouTubeRssFeedClient(),
+        library_index=LibraryIndex.locate(cwd_path, cli_args.library_root),
+        transcript_pack=TranscriptPack(cwd_path / "archive"),
     )
 
 
 def init_auth_and_language(
     session_config: SessionConfig, language_argument_string: str, force_refresh_cookies_flag: bool
-) -> tuple[list[str], str]:
+) -> str:
     """
-    Etapa 2: configura cookies e detecta/define o idioma.
-    Retorna (cookie_args_list, language_opt_string).
+    Etapa 2: configura cookies (`session_config.cookie_manager`) e detecta/define o idioma.
+    Os argumentos de cookie do yt-dlp são lidos do gerenciador a cada chamada
+    (`cookie_manager.cookie_args_list`), para que uma renovação chegue aos subprocessos.
+    Retorna language_opt_string.
     """
     print_section("Autenticação")
-    cookie_args_list = configure_cookies(session_config.cwd_path, session_config.script_dir_path, force_refresh_cookies_flag)
+    session_config.cookie_manager = CookieJarManager(session_config.cwd_path, session_config.script_dir_path)
+    session_config.cookie_manager.load(session_config.yt_dlp_cmd_list, force_refresh_cookies_flag)
 
     print_section("Idioma")
     # Tenta obter cache antes de detectar
-    _, _, cached_lang = load_or_create_channel_state(
-        session_config.cwd_path, session_config.yt_dlp_cmd_list, cookie_args_list, session_config.channel_url,
-        only_peek_lang=True
-    )
+    cached_lang = load_or_create_channel_state(
+        session_config.cwd_path, session_config.yt_dlp_cmd_list, session_config.cookie_manager.cookie_args_list,
+        session_config.channel_url, only_peek_lang=True
+    ).detected_language
 
-    language_opt_string = language_argument_string if language_argument_string else detect_language(
-        session_config.yt_dlp_cmd_list, cookie_args_list, session_config.channel_url, cached_lang
-    )
+    # Sem cache nem --lang, o idioma é inferido da listagem em process_videos (sem sondar o yt-dlp)
+    language_opt_string = language_argument_string or (cached_lang if cached_lang and cached_lang != "N/A" else "")
     if language_argument_string:
         print_ok(f"Idioma definido pelo usuário: {BOLD}{language_opt_string}{RESET}")
+    elif language_opt_string:
+        print_ok(f"Usando idioma em cache: {BOLD}{language_opt_string.strip('^$')}{RESET}")
+    else:
+        print_info("Idioma será inferido a partir da listagem de vídeos.")
 
-    # Se estamos no modo de extração de browser original e 'detect_language' foi pulado,
-    # precisamos forçar uma extração leve do yt-dlp agora para gerar o cookies.txt e filtrá-lo.
-    if "--cookies-from-browser" in cookie_args_list:
-        cookies_txt_path = session_config.cwd_path / "cookies.txt"
-        if not cookies_txt_path.is_file():
-            print_warn("Executando warm-up para extrair cookies do Chrome silenciosamente...")
-            subprocess.run(
-                session_config.yt_dlp_cmd_list + cookie_args_list + ["--dump-json", "--playlist-items", "0", session_config.channel_url],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-            )
-        
-        # Filtrar o lixo exportado
-        filter_youtube_cookies(cookies_txt_path)
-        
-        # Reconfigurar para usar apenas o TXT lido do cache a partir de agora
-        cookie_args_list = configure_cookies(session_config.cwd_path, session_config.script_dir_path, False)
-        print_info("Cookies filtrados limitados ao YouTube (trackers removidos).")
+    return language_opt_string
 
-    return cookie_args_list, language_opt_string
+
+def is_video_pending(video_record: VideoRecord, audio_fallback_flag: bool = False) -> bool:
+    """True se o vídeo ainda tem trabalho: legenda não baixada nem descartada, ou áudio fallback pendente."""
+    if video_record.get("has_no_subtitle"):
+        return audio_fallback_flag and not video_record.get("audio_downloaded")
+    return not video_record.get("subtitle_downloaded")
 
 
 def process_videos(
     session_config: SessionConfig,
-    cookie_args_list: list[str],
     language_opt_string: str,
     cli_args: argparse.Namespace,
+    warm_channel_state: ChannelState | None = None,
+    planned_video_ids: list[str] | None = None,
 ) -> tuple[int, int, int, int]:
     """
     Etapa 3: itera o banco de dados JSON de estado (escriba_*.json), executando
     filtros incrementais em memória e processando as requisições yt-dlp.
+    Com `warm_channel_state` (modo --watch) usa o state quente já sincronizado
+    pelo daemon e percorre apenas os vídeos ainda pendentes.
+    Com `planned_video_ids` (--execute-plan) o state é lido só do disco, sem
+    listagem, e apenas os vídeos do plano são processados, na ordem do plano.
+    Os cookies de cada chamada ao yt-dlp vêm de `session_config.cookie_manager`
+    no momento da chamada (renovações no meio da execução valem na hora).
     Retorna os contadores numéricos formatados para o summary da Etapa 4.
     """
+    cookie_manager = session_config.cookie_manager
     # Detectar se é vídeo avulso
     _, input_type_string, single_video_id = parse_input_type(session_config.channel_input_url_or_handle)
     
-    print_section("Listagem de Vídeos e Tracking State")
-    json_state_path, full_state_list, detected_lang_cached = load_or_create_channel_state(
-        session_config.cwd_path, session_config.yt_dlp_cmd_list, cookie_args_list, session_config.channel_url
-    )
+    if warm_channel_state is not None:
+        channel_state = warm_channel_state
+    elif planned_video_ids is not None:
+        print_section("Plano de Execução")
+        channel_state = load_channel_state_offline(session_config.cwd_path, session_config.library_index)
+        if channel_state is None:
+            print_err("Nenhum escriba_*.json nesta pasta para executar o plano.")
+            sys.exit(1)
+    else:
+        print_section("Listagem de Vídeos e Tracking State")
+        channel_state = load_or_create_channel_state(
+            session_config.cwd_path, session_config.yt_dlp_cmd_list, cookie_manager.cookie_args_list, session_config.channel_url,
+            uploads_feed_client=session_config.uploads_feed_client, resync_interval_days=cli_args.resync_days,
+            library_index=session_config.library_index,
+        )
     
+    is_language_confident = True
+    if not language_opt_string:
+        language_opt_string, is_language_confident = detect_language(channel_state)
+    # Palpite sem confiança vale só nesta sessão: a próxima revota com os idiomas das trilhas baixadas
+    persisted_language_string = language_opt_string if is_language_confident else None
+
     # Garantir que o idioma detectado esteja no arquivo caso tenha sido descoberto agora
-    if language_opt_string and language_opt_string != detected_lang_cached:
-        save_channel_state_json(json_state_path, full_state_list, detected_language=language_opt_string)
+    if persisted_language_string and persisted_language_string != channel_state.detected_language:
+        save_channel_state_json(channel_state, detected_language=persisted_language_string)
     
-    # Se o modo for vídeo único, filtramos a lista carregada para focar apenas nele
-    if input_type_string == "video" and single_video_id:
+    # Se o modo for vídeo único, buscamos direto no índice do state para focar apenas nele
+    if planned_video_ids is not None:
+        is_single_video_mode = False
+        working_state_list = [channel_state.get(video_id) for video_id in planned_video_ids if video_id in channel_state]
+        print_info(f"Executando plano: {BOLD}{len(working_state_list)}{RESET} vídeos sem nova listagem.")
+    elif input_type_string == "video" and single_video_id:
         is_single_video_mode = True
-        working_state_list = [v for v in full_state_list if v["video_id"] == single_video_id]
+        single_video_record = channel_state.get(single_video_id)
         
+        # Fora deste canal mas já baixado em outra pasta da biblioteca: nada a fazer
+        if single_video_record is None and session_config.library_index is not None:
+            library_match = session_config.library_index.lookup_video(single_video_id)
+            if library_match and (library_match["subtitle_downloaded"] or library_match["audio_downloaded"]):
+                print_skip(f"{single_video_id} já baixado na biblioteca em {BOLD}{library_match['channel_dir']}/{RESET}")
+                return 0, 1, 0, 1, False
+
         # Se não estiver no canal (vídeo novo), adiciona na mão para processar
-        if not working_state_list:
-            new_entry = {
-                "video_id": single_video_id, 
-                "publish_date": "N/A", 
-                "title": "Avulso", 
-                "subtitle_downloaded": False,
-                "info_downloaded": False,
-                "has_no_subtitle": False,
-            }
-            full_state_list.append(new_entry)
-            working_state_list = [new_entry]
+        if single_video_record is None:
+            single_video_record = channel_state.add(VideoRecord.create(single_video_id, title="Avulso"))
+        working_state_list = [single_video_record]
         
         print_info(f"Foco em vídeo único: {BOLD}{single_video_id}{RESET}")
     else:
         is_single_video_mode = False
-        working_state_list = filter_state_list(full_state_list, cli_args.date)
+        working_state_list = filter_state_list(channel_state.records, cli_args.date)
+        if warm_channel_state is not None:
+            working_state_list = [v for v in working_state_list if is_video_pending(v, cli_args.audio_fallback)]
+
+    if cli_args.shard and not is_single_video_mode:
+        shard_index, shard_count = cli_args.shard
+        working_state_list = [v for v in working_state_list if is_video_in_shard(v.video_id, shard_index, shard_count)]
+        if channel_state.json_path is not None:
+            channel_state.shard_delta_path = shard_delta_path_for(channel_state.json_path, shard_index, shard_count)
+        print_info(
+            f"Shard {BOLD}{shard_index}/{shard_count}{RESET}: {len(working_state_list)} vídeos  "
+            f"{DIM}delta em {channel_state.shard_delta_path.name if channel_state.shard_delta_path else '—'}{RESET}"
+        )
 
     if not working_state_list:
+        if warm_channel_state is not None or planned_video_ids is not None:
+            print_info("Nenhum vídeo pendente neste ciclo.")
+            return 0, 0, 0, 0, False
         print_err("Nenhum vídeo retornado pela listagem ou filtro.")
         sys.exit(1)
 
-    info_downloaded_count = sum(1 for v in working_state_list if v.get("info_downloaded"))
-    no_subtitle_count = sum(1 for v in working_state_list if v.get("has_no_subtitle"))
+    if working_state_list is channel_state.records or len(working_state_list) == len(channel_state):
+        # Sem filtro: os contadores incrementais do state já têm a resposta
+        info_downloaded_count = channel_state.flag_counts["info_downloaded"]
+        no_subtitle_count = channel_state.flag_counts["has_no_subtitle"]
+    else:
+        info_downloaded_count = sum(1 for v in working_state_list if v.get("info_downloaded"))
+        no_subtitle_count = sum(1 for v in working_state_list if v.get("has_no_subtitle"))
     print_info(f"Histórico: {info_downloaded_count} metadados no JSON · {no_subtitle_count} sem legenda")
 
     # Contadores de sessão
@@ -1807,48 +4800,70 @@ def process_videos(
 
     # ─── Loop principal ────────────────────────────────────────────────────────
     # O processamento é incremental. Para cada vídeo, verificamos se já está no JSON.
-    # Novas entradas disparam persistência periódica (_dirty counter) para poupar I/O.
+    # Mutações nos registros marcam o vídeo como sujo no ChannelState; a persistência
+    # é periódica (por número de vídeos sujos) para poupar I/O.
     was_interrupted = False
 
     # ─── Flush periódico do JSON ─────────────────────────────────────────────
-    FLUSH_EVERY = 5  # salva a cada N mutações de estado
-    _dirty = 0       # contador de mudanças pendentes
+    FLUSH_EVERY = 5  # salva a cada N vídeos com mudanças pendentes
 
     def _flush(force: bool = False) -> None:
-        """Salva o JSON se o contador atingiu o limite ou se force=True."""
-        nonlocal _dirty
-        if force or _dirty >= FLUSH_EVERY:
-            save_channel_state_json(json_state_path, full_state_list, detected_language=language_opt_string)
-            _dirty = 0
+        """Salva o JSON se há vídeos sujos suficientes ou se force=True (e algo mudou)."""
+        if channel_state.is_dirty and (force or len(channel_state.dirty_ids) >= FLUSH_EVERY):
+            save_channel_state_json(channel_state, detected_language=persisted_language_string)
 
     pending_md_conversions = []
 
+    # Fila de áudio fallback: pool próprio, progride em paralelo à fila de legendas
+    audio_lane = AudioFallbackLane(
+        session_config.yt_dlp_cmd_list, cookie_manager, session_config.channel_dir_name, session_config.cwd_path,
+        worker_count=cli_args.audio_workers, rate_limit_bytes=cli_args.audio_rate_limit,
+    ) if cli_args.audio_fallback and not cli_args.audio_only else None
+
     try:
         for loop_iteration_idx, video_dict in enumerate(working_state_list, start=1):
             video_id = video_dict["video_id"]
             indentation_prefix = f"  {BLUE}[{loop_iteration_idx:>{len(str(total_videos_count))}}/{total_videos_count}]{RESET}"
 
+            if audio_lane and audio_lane.apply_completed(channel_state, sub_indent_space):
+                _flush()
+            cookie_manager.ensure_fresh(session_config.yt_dlp_cmd_list)
+
             # 1. Verificação instantânea no JSON de estado do canal
             if video_dict.get("subtitle_downloaded") and not cli_args.audio_only:
                 skipped_videos_count += 1
                 print_skip(f"{video_id}  {DIM}legenda já registrada no state JSON{RESET}", indentation_prefix)
+                CONSOLE.event("video_skipped", video_id=video_id, reason="state")
                 continue
 
             if video_dict.get("has_no_subtitle") and not cli_args.audio_only:
                 skipped_videos_count += 1
                 print_skip(f"{video_id}  {DIM}marcado como sem legenda no JSON{RESET}", indentation_prefix)
+                CONSOLE.event("video_skipped", video_id=video_id, reason="no_subtitle")
+                # Sessão anterior interrompida antes do áudio fallback: reenfileira
+                if audio_lane and audio_lane.submit(video_dict):
+                    print_info(f"áudio fallback pendente → fila de áudio", sub_indent_space)
                 continue
 
             # Verificação por arquivos em disco (caso o histórico esteja dessincronizado)
-            is_srt_file_present = bool(glob.glob(str(session_config.cwd_path / f"{session_config.channel_dir_name}-{video_id}*.srt")))
+            subtitle_files_found = find_subtitle_files(session_config.cwd_path, session_config.channel_dir_name, video_id)
+            is_srt_file_present = bool(subtitle_files_found)
             is_md_file_present  = bool(glob.glob(str(session_config.cwd_path / f"{session_config.channel_dir_name}-{video_id}*.md")))
 
+            if not (is_srt_file_present or is_md_file_present) and session_config.transcript_pack.video_names(video_id):
+                skipped_videos_count += 1
+                print_skip(f"{video_id}  {DIM}já guardado no pacote de archive/{RESET}", indentation_prefix)
+                CONSOLE.event("video_skipped", video_id=video_id, reason="packed")
+                video_dict["info_downloaded"] = True
+                video_dict["subtitle_downloaded"] = True
+                _flush()
+                continue
+
             if is_srt_file_present or is_md_file_present:
                 # Se existe .srt mas NÃO existe .md, e MD está ativo → agenda conversão
                 if is_srt_file_present and not is_md_file_present and cli_args.md:
-                    srt_glob = glob.glob(str(session_config.cwd_path / f"{session_config.channel_dir_name}-{video_id}*.srt"))
-                    if srt_glob:
-                        srt_path_found = Path(srt_glob[0])
+                    if subtitle_files_found:
+                        srt_path_found = Path(subtitle_files_found[0])
                         pending_md_conversions.append((
                             srt_path_found,
                             video_id,
@@ -1858,23 +4873,28 @@ def process_videos(
                         print_skip(f"{video_id}  {DIM}.srt encontrado → agendado para conversão MD{RESET}", indentation_prefix)
                 else:
                     print_skip(f"{video_id}  {DIM}arquivos já presentes no disco{RESET}", indentation_prefix)
+                CONSOLE.event("video_skipped", video_id=video_id, reason="on_disk")
                 skipped_videos_count += 1
                 video_dict["info_downloaded"] = True
                 video_dict["subtitle_downloaded"] = True
-                _dirty += 1
                 _flush()
                 continue
 
             execution_mode_string = "ÁUDIO" if cli_args.audio_only else f"legenda/{language_opt_string}"
             print_dl(f"{video_id}{RESET}  {DIM}{execution_mode_string}{RESET}", indentation_prefix)
+            CONSOLE.event("video_started", video_id=video_id, mode="audio" if cli_args.audio_only else "subtitle")
 
             download_exit_code = download_video(
                 yt_dlp_cmd_list=session_config.yt_dlp_cmd_list,
-                cookie_args_list=cookie_args_list,
+                cookie_args_list=cookie_manager.cookie_args_list,
                 video_id=video_id,
                 language_opt_string=language_opt_string,
                 channel_dir_name=session_config.channel_dir_name,
                 audio_only_flag=cli_args.audio_only,
+                channel_state=channel_state,
+                native_subs_flag=cli_args.native_subs,
+                per_video_language_flag=not cli_args.lang,
+                http_session=cookie_manager.session,
             )
 
             # --- Harvest: Absorver metadados independente do exit code (ex: sem legenda gera erro mas tem info) ---
@@ -1888,7 +4908,7 @@ def process_videos(
                 if video_dict.get("title", "N/A") == "N/A" or video_dict.get("publish_date", "N/A") == "N/A":
                     # Só tenta auto-healing se o harvest falhou ou se os dados ainda são N/A
                     print_info(f"{video_id}  {DIM}recuperando metadados ausentes (título/data)...{RESET}", indentation_prefix)
-                    recovered_meta_dict = get_video_exact_date(video_id, session_config.yt_dlp_cmd_list, cookie_args_list)
+                    recovered_meta_dict = get_video_exact_date(video_id, session_config.yt_dlp_cmd_list, cookie_manager.cookie_args_list)
                     meta_updated_flag = False
                     
                     if recovered_meta_dict["title"] != "N/A" and video_dict.get("title", "N/A") == "N/A":
@@ -1904,7 +4924,6 @@ def process_videos(
 
             if info_harvested:
                 video_dict["info_downloaded"] = True
-                _dirty += 1
                 _flush() # Garante persistência imediata de metadados básicos
 
             if download_exit_code == 0:
@@ -1915,7 +4934,6 @@ def process_videos(
                         session_config.cwd_path, session_config.channel_dir_name, video_id,
                         video_title=video_dict.get("title", "Sem Título"),
                         convert_srt_to_md=cli_args.md,
-                        flag_keep_srt=cli_args.keep_srt,
                         indentation_prefix=sub_indent_space
                     )
                     
@@ -1928,28 +4946,14 @@ def process_videos(
                         ))
 
                 if not has_downloaded_subtitle_flag:
-                    if cli_args.audio_fallback:
-                        print_warn(f"sem legenda — baixando áudio fallback", sub_indent_space)
-                        
-                        fallback_audios_dir_path = session_config.cwd_path / "audios"
-                        fallback_audios_dir_path.mkdir(exist_ok=True)
-                        
-                        audio_fallback_exit_code = download_video(
-                            yt_dlp_cmd_list=session_config.yt_dlp_cmd_list,
-                            cookie_args_list=cookie_args_list,
-                            video_id=video_id,
-                            language_opt_string=language_opt_string,
-                            channel_dir_name=session_config.channel_dir_name,
-                            audio_only_flag=True,
-                            output_dir_path=fallback_audios_dir_path,
-                        )
-                        
-                        if audio_fallback_exit_code == 0:
-                            print_ok(f"áudio fallback salvo em audios/", sub_indent_space)
+                    if audio_lane:
+                        if audio_lane.submit(video_dict):
+                            print_warn(f"sem legenda — áudio fallback na fila ({len(audio_lane)} pendentes)", sub_indent_space)
                         else:
-                            print_err(f"falha ao baixar áudio fallback", sub_indent_space)
+                            print_skip(f"sem legenda — áudio fallback já registrado no state JSON", sub_indent_space)
                     else:
                         print_warn(f"sem legenda — pulando", sub_indent_space)
+                    CONSOLE.event("video_no_subtitle", video_id=video_id, audio_fallback=audio_lane is not None)
 
                     skipped_videos_count += 1
 
@@ -1960,13 +4964,12 @@ def process_videos(
                         try:
                             publish_datetime_object = datetime.strptime(publish_date_string, "%Y-%m-%d")
                             days_ago_count = (datetime.now() - publish_datetime_object).days
-                            is_old_enough_flag = days_ago_count > 7
+                            is_old_enough_flag = days_ago_count > NO_SUBTITLE_MIN_AGE_DAYS
                         except ValueError:
                             pass
 
                     if is_old_enough_flag:
                         video_dict["has_no_subtitle"] = True
-                        _dirty += 1
                         _flush()  # marca como sem legenda — flush imediato
                     else:
                         print_info(f"vídeo recente ({days_ago_count}d) — não marcado como sem legenda", sub_indent_space)
@@ -1975,11 +4978,11 @@ def process_videos(
                         print_countdown(1, "Aguardando", sub_indent_space)
                 else:
                     downloaded_videos_count += 1
+                    CONSOLE.event("video_downloaded", video_id=video_id, subtitle_path=srt_path_ret.name if srt_path_ret else None)
                     
                     # Marcar o estado JSON se baixamos a legenda
                     if not cli_args.audio_only and has_downloaded_subtitle_flag:
                         video_dict["subtitle_downloaded"] = True
-                        _dirty += 1
                         _flush()
                         
                     if not cli_args.fast:
@@ -1990,60 +4993,87 @@ def process_videos(
             else:
                 error_videos_count += 1
                 print_err(f"falha (código {download_exit_code}) — possível bloqueio 429", sub_indent_space)
+                CONSOLE.event("video_failed", video_id=video_id, exit_code=download_exit_code)
+                cookie_manager.handle_auth_failure(session_config.yt_dlp_cmd_list)
                 if not cli_args.fast:
                     print_countdown(300, "Resfriamento", sub_indent_space)
                 print_info("Retomando...", sub_indent_space)
 
+        if audio_lane:
+            audio_lane.drain(channel_state, sub_indent_space)
+
         # Flush final após o loop para garantir persistência de todos os status da sessão
         _flush(force=True)
 
     except KeyboardInterrupt:
         print()
         print_warn(f"Processamento interrompido. {DIM}Gerando resumo parcial...{RESET}")
+        CONSOLE.event("interrupted")
         was_interrupted = True
+        if audio_lane:
+            audio_lane.shutdown(channel_state, sub_indent_space)
         _flush(force=True)  # garante que nenhuma mutação pendente seja perdida
 
     # ---------- Processamento Deferido de MD --------------
     if pending_md_conversions:
         print()
         print_info(f"Fase 4: Clusterização de IA (TF-IDF) para {BOLD}{len(pending_md_conversions)}{RESET} vídeos...")
-        for srt_path, vid_id, vid_title, vid_date in pending_md_conversions:
-            if not srt_path.exists():
-                continue
+        # Vetores e fingerprints dos segmentos: um único save por store ao fim da fase (mesmo se interrompida)
+        segment_store = SegmentVectorStore(session_config.cwd_path)
+        boilerplate_detector = BoilerplateDetector(session_config.cwd_path)
+        try:
+            for srt_path, vid_id, vid_title, vid_date in pending_md_conversions:
+                if not srt_path.exists():
+                    continue
             
-            print_dl(f"{vid_id}{RESET}  {DIM}gerando Cluster MD{RESET}", "  ")
-            md_path = srt_to_md(srt_path, vid_id, vid_title, video_date=vid_date, threshold=0.3, indentation_prefix="    ")
+                print_dl(f"{vid_id}{RESET}  {DIM}gerando Cluster MD{RESET}", "  ")
+                md_path = srt_to_md(
+                    srt_path, vid_id, vid_title, video_date=vid_date, threshold=0.3, indentation_prefix="    ",
+                    library_index=session_config.library_index, segment_store=segment_store,
+                    boilerplate_detector=boilerplate_detector, strip_boilerplate_flag=cli_args.strip_boilerplate,
+                )
             
-            # Notion upload: APENAS em modo de vídeo único (user request)
-            if md_path and cli_args.notion:
-                if is_single_video_mode:
-                    notion_token = os.getenv("NOTION_TOKEN")
-                    if notion_token:
-                        print_dl(f"{vid_id}{RESET}  {DIM}enviando p/ Notion{RESET}", "    ")
-                        exporter = NotionExporter(notion_token, cli_args.notion_db)
-                        with open(md_path, "r", encoding="utf-8") as f:
-                            md_content = f.read()
-                        blocks = exporter.md_to_blocks(md_content)
-                        video_url = f"https://www.youtube.com/watch?v={vid_id}"
-                        page_id = exporter.create_page(vid_title, blocks, video_url=video_url)
-                        if page_id:
-                            print_ok(f"Página Notion criada: {DIM}{page_id}{RESET}", "      ")
+                # Notion upload: APENAS em modo de vídeo único (user request)
+                if md_path and cli_args.notion:
+                    if is_single_video_mode:
+                        notion_token = os.getenv("NOTION_TOKEN")
+                        if notion_token:
+                            print_dl(f"{vid_id}{RESET}  {DIM}enviando p/ Notion{RESET}", "    ")
+                            exporter = NotionExporter(notion_token, cli_args.notion_db)
+                            with open(md_path, "r", encoding="utf-8") as f:
+                                md_content = f.read()
+                            blocks = exporter.md_to_blocks(md_content)
+                            video_url = f"https://www.youtube.com/watch?v={vid_id}"
+                            page_id = exporter.create_page(vid_title, blocks, video_url=video_url)
+                            if page_id:
+                                print_ok(f"Página Notion criada: {DIM}{page_id}{RESET}", "      ")
+                        else:
+                            print_warn("NOTION_TOKEN não encontrado para upload automático.", "      ")
                     else:
-                        print_warn("NOTION_TOKEN não encontrado para upload automático.", "      ")
-                else:
-                    print_info(f"Upload para Notion {DIM}ignorado{RESET} (modo canal/playlist ativo).", "    ")
+                        print_info(f"Upload para Notion {DIM}ignorado{RESET} (modo canal/playlist ativo).", "    ")
             
-            elif md_path:
-                print_ok(f"MD clusterizado salvo: {DIM}{md_path.name}{RESET}", "    ")
+                elif md_path:
+                    print_ok(f"MD clusterizado salvo: {DIM}{md_path.name}{RESET}", "    ")
+                CONSOLE.event("md_written" if md_path else "md_failed", video_id=vid_id, md_path=md_path.name if md_path else None)
             
-            if not cli_args.keep_srt and srt_path.exists():
-                srt_path.unlink()
+                if srt_path.suffix in NATIVE_SUBTITLE_SUFFIXES and cli_args.keep_srt:
+                    write_srt_from_cues(open_cue_source(srt_path), srt_path.with_suffix(".srt"))
+                    srt_path.unlink(missing_ok=True)
+                elif not cli_args.keep_srt and srt_path.exists():
+                    srt_path.unlink()
+        finally:
+            segment_store.save()
+            boilerplate_detector.save()
 
     return downloaded_videos_count, skipped_videos_count, error_videos_count, total_videos_count, was_interrupted
 
 
 def print_summary(downloaded_videos_count: int, skipped_videos_count: int, error_videos_count: int, total_videos_count: int) -> None:
     """Etapa 4: imprime o resumo final da sessão."""
+    CONSOLE.event(
+        "session_summary", downloaded=downloaded_videos_count, skipped=skipped_videos_count,
+        errors=error_videos_count, total=total_videos_count,
+    )
     print(f"\n{DIV_THICK}")
     print(f"  {BOLD}{BWHITE}Sessão concluída{RESET}")
     print(f"{DIV_THICK}")
@@ -2055,10 +5085,473 @@ def print_summary(downloaded_videos_count: int, skipped_videos_count: int, error
     print()
 
 
-def regen_md_from_srt_files() -> None:
-    """Modo offline: varre archive/ e depois a pasta atual buscando .srt e regenera .md via TF-IDF."""
+# ─── Plano Offline (--plan / --execute-plan) ─────────────────────────────────
+
+WORK_PLAN_FORMAT_VERSION = 1
+NO_SUBTITLE_MIN_AGE_DAYS = 7  # só vídeos mais velhos que isso são marcados como "sem legenda"
+WORK_PLAN_ACTIONS = ("download", "convert_md", "mark_on_disk", "mark_packed", "audio_fallback")
+
+
+def load_channel_state_offline(cwd_path: Path, library_index: "LibraryIndex | None" = None) -> ChannelState | None:
+    """Carrega o state do canal só do disco (sem listagem, feed ou varredura do histórico local)."""
+    json_path = get_latest_json_path(cwd_path)
+    if json_path is None:
+        return None
+    channel_state = ChannelState.from_json_data(json_path, JSON_CODEC.load_path(json_path))
+    if library_index is not None:
+        channel_state.library_index = library_index
+    return channel_state
+
+
+def build_work_plan(cwd_path: Path, cli_args: argparse.Namespace) -> dict | None:
+    """
+    Decide, sem nenhuma chamada ao yt-dlp, o que o loop de download faria com
+    cada vídeo do state (mesma ordem de checagens de `process_videos`), usando
+    um único scandir da pasta do canal como índice de arquivos.
+    Só os vídeos com trabalho entram em "videos"; "counts" resume todos.
+    """
+    channel_state = load_channel_state_offline(cwd_path)
+    if channel_state is None:
+        return None
+
+    file_prefix = f"{cwd_path.name}-"
+    subtitle_video_ids: set[str] = set()
+    md_video_ids: set[str] = set()
+    with os.scandir(cwd_path) as directory_entries:
+        for directory_entry in directory_entries:
+            if not directory_entry.name.startswith(file_prefix):
+                continue
+            video_id = directory_entry.name[len(file_prefix):len(file_prefix) + 11]
+            if directory_entry.name.endswith(SUBTITLE_FILE_SUFFIXES):
+                subtitle_video_ids.add(video_id)
+            elif directory_entry.name.endswith(".md"):
+                md_video_ids.add(video_id)
+    transcript_pack = TranscriptPack(cwd_path / "archive")
+
+    working_state_list = filter_state_list(channel_state.records, cli_args.date)
+    if cli_args.shard:
+        working_state_list = [v for v in working_state_list if is_video_in_shard(v.video_id, *cli_args.shard)]
+    # Datas ISO comparam como string: publicado antes do corte = mais velho que NO_SUBTITLE_MIN_AGE_DAYS
+    stale_cutoff_date = (datetime.now() - timedelta(days=NO_SUBTITLE_MIN_AGE_DAYS)).strftime("%Y-%m-%d")
+    action_counts = Counter()
+    planned_videos_list = []
+    metadata_missing_count = 0
+    stale_no_subtitle_count = 0
+    for video_record in working_state_list:
+        video_id = video_record.video_id
+        publish_date = video_record.get("publish_date", "N/A")
+        has_no_subtitle = video_record.get("has_no_subtitle")
+        if publish_date == "N/A" or video_record.get("title", "N/A") == "N/A":
+            metadata_missing_count += 1
+        if has_no_subtitle and publish_date[:1].isdigit() and publish_date < stale_cutoff_date:
+            stale_no_subtitle_count += 1
+
+        if video_record.get("subtitle_downloaded") and not cli_args.audio_only:
+            action_name = "done"
+        elif has_no_subtitle and not cli_args.audio_only:
+            action_name = "audio_fallback" if cli_args.audio_fallback and not video_record.get("audio_downloaded") else "no_subtitle"
+        elif video_id in subtitle_video_ids or video_id in md_video_ids:
+            action_name = "convert_md" if video_id not in md_video_ids and cli_args.md else "mark_on_disk"
+        elif transcript_pack.video_names(video_id):
+            action_name = "mark_packed"
+        else:
+            action_name = "download"
+        action_counts[action_name] += 1
+        if action_name in WORK_PLAN_ACTIONS:
+            planned_videos_list.append({"video_id": video_id, "action": action_name})
+
+    return {
+        "format_version": WORK_PLAN_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "channel_dir": cwd_path.name,
+        "state_file": channel_state.json_path.name,
+        "state_mtime_ns": channel_state.json_path.stat().st_mtime_ns,
+        "options": {
+            "date": cli_args.date, "audio_only": cli_args.audio_only, "md": cli_args.md, "audio_fallback": cli_args.audio_fallback,
+            "shard": "/".join(map(str, cli_args.shard)) if cli_args.shard else None,
+        },
+        "counts": {
+            "videos": len(working_state_list),
+            **{action_name: action_counts[action_name] for action_name in ("done", "no_subtitle") + WORK_PLAN_ACTIONS},
+            "metadata_missing": metadata_missing_count,
+            "no_subtitle_older_than_7d": stale_no_subtitle_count,
+        },
+        "videos": planned_videos_list,
+    }
+
+
+def write_work_plan(cwd_path: Path, cli_args: argparse.Namespace) -> None:
+    """--plan: grava o plano em JSON (stdout com `-`, senão no arquivo indicado)."""
+    start_time = time.perf_counter()
+    work_plan = build_work_plan(cwd_path, cli_args)
+    if work_plan is None:
+        print_err("Nenhum escriba_*.json nesta pasta: rode uma listagem antes de planejar.")
+        sys.exit(1)
+    plan_bytes = JSON_CODEC.dumps(work_plan, pretty=True)
+    if cli_args.plan == "-":
+        CONSOLE.stream.write(plan_bytes.decode("utf-8") + "\n")
+        CONSOLE.stream.flush()
+        return
+
+    plan_path = Path(cli_args.plan)
+    temp_path = plan_path.with_name(f"{plan_path.name}.{os.getpid()}.tmp")
+    try:
+        temp_path.write_bytes(plan_bytes)
+        temp_path.replace(plan_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    counts_dict = work_plan["counts"]
+    print_ok(f"Plano salvo em {BOLD}{plan_path}{RESET}  {DIM}({(time.perf_counter() - start_time) * 1000:.0f} ms){RESET}")
+    print_info(
+        f"{counts_dict['download']} para baixar · {counts_dict['convert_md']} só conversão MD · "
+        f"{counts_dict['mark_on_disk'] + counts_dict['mark_packed']} já no disco · {counts_dict['audio_fallback']} áudio fallback"
+    )
+    print_info(
+        f"{counts_dict['done']} concluídos · {counts_dict['no_subtitle']} sem legenda "
+        f"({counts_dict['no_subtitle_older_than_7d']} com mais de {NO_SUBTITLE_MIN_AGE_DAYS} dias) · "
+        f"{counts_dict['metadata_missing']} com metadados N/A"
+    )
+    print_info(f"Execute com {BOLD}--execute-plan {plan_path}{RESET}")
+
+
+WORK_PLAN_OPTION_FLAGS = {"date": "-d", "audio_only": "--audio-only", "md": "--no-md", "audio_fallback": "--audio-fallback", "shard": "--shard"}
+
+
+def load_work_plan(plan_path: Path, cwd_path: Path, cli_args: argparse.Namespace) -> list[str]:
+    """
+    Lê um plano do --plan e devolve os IDs a processar, avisando se o state mudou desde então.
+    As opções gravadas no plano (data, --audio-only, --no-md, --audio-fallback, --shard)
+    são aplicadas a `cli_args`, para que a execução siga exatamente o plano mesmo
+    sem repetir as flags na linha de comando.
+    """
+    try:
+        work_plan = JSON_CODEC.load_path(plan_path)
+    except Exception as error_msg:
+        print_err(f"Plano ilegível ({plan_path}): {error_msg}")
+        sys.exit(1)
+    if work_plan.get("format_version") != WORK_PLAN_FORMAT_VERSION or work_plan.get("channel_dir") != cwd_path.name:
+        print_err(f"Plano {plan_path.name} não é deste canal ({cwd_path.name}) ou de outra versão do escriba.")
+        sys.exit(1)
+    state_path = cwd_path / work_plan.get("state_file", "")
+    if not state_path.is_file() or state_path.stat().st_mtime_ns != work_plan.get("state_mtime_ns"):
+        print_warn("O state mudou desde o plano; cada vídeo ainda é rechecado antes de baixar.")
+
+    plan_options_dict = dict(work_plan.get("options") or {})
+    if plan_options_dict.get("shard"):
+        plan_options_dict["shard"] = parse_shard_spec(plan_options_dict["shard"])
+    for option_name, option_flag in WORK_PLAN_OPTION_FLAGS.items():
+        if option_name not in plan_options_dict:
+            continue
+        plan_value = plan_options_dict[option_name]
+        if getattr(cli_args, option_name) != plan_value:
+            print_info(f"Opção do plano aplicada: {option_flag} {DIM}({getattr(cli_args, option_name)!r} → {plan_value!r}){RESET}")
+            setattr(cli_args, option_name, plan_value)
+    return [video_dict["video_id"] for video_dict in work_plan.get("videos", [])]
+
+
+# ─── Sharding entre Máquinas (--shard / --merge-shards) ──────────────────────
+
+SHARD_DELTA_GLOB_PATTERN = "escriba_*.shard-*.jsonl"
+
+
+def parse_shard_spec(shard_string: str) -> tuple[int, int]:
+    """Converte `i/N` (1 ≤ i ≤ N) em (i, N)."""
+    shard_match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", shard_string)
+    if not shard_match or not 1 <= int(shard_match.group(1)) <= int(shard_match.group(2)):
+        raise argparse.ArgumentTypeError(f"shard inválido: '{shard_string}' (use i/N, com 1 ≤ i ≤ N, ex: 2/4)")
+    return int(shard_match.group(1)), int(shard_match.group(2))
+
+
+def is_video_in_shard(video_id: str, shard_index: int, shard_count: int) -> bool:
+    """Partição estável por hash do video_id: o mesmo vídeo cai no mesmo shard em qualquer máquina."""
+    return zlib.crc32(video_id.encode("utf-8")) % shard_count == shard_index - 1
+
+
+def shard_delta_path_for(json_path: Path, shard_index: int, shard_count: int) -> Path:
+    # .jsonl: fora dos globs *.json do state e do histórico local
+    return json_path.with_name(f"{json_path.stem}.shard-{shard_index}-of-{shard_count}.jsonl")
+
+
+def append_shard_delta(channel_state: ChannelState) -> None:
+    """Anexa ao delta do shard (um JSON por linha) os registros alterados desde o último save."""
+    dirty_records = [channel_state.get(video_id) for video_id in channel_state.dirty_ids if video_id in channel_state]
+    if not dirty_records:
+        return
+    try:
+        with open(channel_state.shard_delta_path, "ab") as file_descriptor:
+            file_descriptor.write(b"".join(
+                JSON_CODEC.dumps(video_record.to_dict(), pretty=False) + b"\n" for video_record in dirty_records
+            ))
+    except OSError as error_msg:
+        print_warn(f"Falha ao gravar delta do shard ({channel_state.shard_delta_path.name}): {error_msg}")
+
+
+def merge_shard_deltas(cwd_path: Path, delta_path_strings: list[str]) -> None:
+    """
+    --merge-shards: funde no escriba_*.json os deltas trazidos dos outros hosts
+    (todos os `escriba_*.shard-*.jsonl` da pasta, se nenhum for indicado), com as
+    mesmas prioridades de `_merge_video_data`: vídeos novos entram inteiros e os
+    existentes passam por `VideoRecord.merge_from`; os demais campos gravados
+    pelo shard (duração, views, audio_*...) preenchem as lacunas via
+    `VideoRecord.fill_missing_from`. Deltas aplicados são renomeados para `.merged`.
+    """
+    channel_state = load_channel_state_offline(cwd_path, LibraryIndex.locate(cwd_path, None))
+    if channel_state is None:
+        print_err("Nenhum escriba_*.json nesta pasta para receber os deltas.")
+        sys.exit(1)
+    delta_paths_list = [Path(path_string) for path_string in delta_path_strings] or sorted(cwd_path.glob(SHARD_DELTA_GLOB_PATTERN))
+    if not delta_paths_list:
+        print_info("Nenhum delta de shard encontrado.")
+        return
+
+    print_section(f"Merge de {len(delta_paths_list)} delta(s) de shard  {DIM}→ {channel_state.json_path.name}{RESET}")
+    known_videos_count = len(channel_state)
+    for delta_path in delta_paths_list:
+        line_count = 0
+        with open(delta_path, "rb") as file_descriptor:
+            for line_content in file_descriptor:
+                try:
+                    video_dict = JSON_CODEC.loads(line_content)
+                except Exception:
+                    continue  # linha truncada (host interrompido no meio do append)
+                video_id = video_dict.get("video_id")
+                if video_id:
+                    channel_state.add(VideoRecord.from_dict(video_dict, video_id)).fill_missing_from(video_dict)
+                    line_count += 1
+        print_ok(f"{delta_path.name}  {DIM}{line_count} registros{RESET}", "  ")
+
+    changed_count = len(channel_state.dirty_ids)
+    save_channel_state_json(channel_state)
+    for delta_path in delta_paths_list:
+        delta_path.replace(delta_path.with_name(f"{delta_path.name}.merged"))
+    print_info(
+        f"{changed_count} vídeos atualizados, {len(channel_state) - known_videos_count} novos  "
+        f"{DIM}{channel_state.flag_counts['subtitle_downloaded']} com legenda no total{RESET}"
+    )
+
+
+# ─── Busca na Biblioteca (--search) ───────────────────────────────────────────
+
+def search_library(query_string: str, library_index: LibraryIndex | None, limit: int = 20) -> None:
+    """Imprime os parágrafos mais relevantes da biblioteca com link direto para o instante no vídeo."""
+    print_section(f"Busca: {query_string}  {DIM}{library_index.db_path if library_index else LIBRARY_INDEX_FILENAME}{RESET}")
+    if library_index is None or not library_index.db_path.exists():
+        print_err("Índice não encontrado. Gere os .md (ou rode --regen-md) dentro da biblioteca, ou aponte --library-root.")
+        sys.exit(1)
+    if library_index.connection is None or not library_index.has_fts:
+        print_err("Busca indisponível: o SQLite deste Python não tem FTS5.")
+        sys.exit(1)
+
+    hits_list = library_index.search(query_string, limit)
+    if not hits_list:
+        print_warn("Nenhum trecho encontrado.")
+        return
+    for rank_idx, hit in enumerate(hits_list, start=1):
+        start_ms = int(hit["start_ms"] or 0)
+        title = hit["title"] or hit["video_id"]
+        print(
+            f"\n  {BOLD}{rank_idx:>2}.{RESET} {BCYAN}[{_format_ms_timestamp(start_ms)}]{RESET} {BOLD}{title}{RESET}"
+            f"  {DIM}{hit['channel_dir']} · {hit['publish_date'] or 'N/A'}{RESET}"
+        )
+        if hit["segment_label"]:
+            print(f"      {DIM}Tópico: {hit['segment_label']}{RESET}")
+        print(f"      {hit['snippet']}")
+        print(
+            f"      {BLUE}https://www.youtube.com/watch?v={hit['video_id']}&t={start_ms // 1000}s{RESET}"
+            f"  {DIM}{hit['channel_dir']}/{hit['md_name']}{RESET}"
+        )
+    print()
+
+
+def show_related_segments(related_query_string: str, segment_store: SegmentVectorStore, limit: int = 10) -> None:
+    """--related VIDEO_ID[@N]: segmentos de outros vídeos do canal mais próximos do vídeo (ou do seu N-ésimo tópico)."""
+    video_id, _, segment_string = related_query_string.partition("@")
+    if segment_string and not segment_string.isdigit():
+        print_err(f"Segmento inválido em '{related_query_string}'. Use VIDEO_ID ou VIDEO_ID@N (N = posição no sumário).")
+        sys.exit(1)
+    if _load_sparse_deps() is None:
+        print_err("Faltam numpy/scipy para o --related. Instale as dependências de ML.")
+        sys.exit(1)
+    if not segment_store.store_path.exists():
+        print_err(f"{SEGMENT_STORE_FILENAME} não encontrado nesta pasta. Gere os .md do canal (ou rode --regen-md) primeiro.")
+        sys.exit(1)
+
+    print_section(f"Relacionados a {video_id}{'@' + segment_string if segment_string else ''}  {DIM}{len(segment_store)} segmentos no canal{RESET}")
+    related_list = segment_store.related(video_id, int(segment_string) if segment_string else None, limit)
+    if not related_list:
+        print_warn("Vídeo/segmento fora do store ou sem segmentos semelhantes.")
+        return
+    for rank_idx, related_segment in enumerate(related_list, start=1):
+        start_ms = related_segment["start_ms"]
+        print(
+            f"\n  {BOLD}{rank_idx:>2}.{RESET} {DIM}{related_segment['score']:.2f}{RESET} "
+            f"{BCYAN}[{_format_ms_timestamp(start_ms)}]{RESET} {BOLD}{related_segment['title']}{RESET}"
+        )
+        print(f"      {DIM}Tópico: {related_segment['label']}  ({_format_ms_timestamp(related_segment['end_ms'] - start_ms)}){RESET}")
+        print(f"      {BLUE}https://www.youtube.com/watch?v={related_segment['video_id']}&t={start_ms // 1000}s{RESET}")
+    print()
+
+
+# ─── Modo Daemon (--watch) ────────────────────────────────────────────────────
+
+WATCH_RECENT_UPLOADS_COUNT = 10   # uploads recentes usados para estimar a frequência do canal
+WATCH_CHECKS_PER_UPLOAD = 4       # verificações por intervalo típico entre uploads
+VALID_DATE_REGEX_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+@dataclass
+class ChannelWatch:
+    """Canal acompanhado pelo daemon: pasta, sessão e state mantidos quentes entre ciclos."""
+    channel_dir_path: Path
+    session_config: SessionConfig | None = None
+    language_opt_string: str = ""
+    channel_state: ChannelState | None = None
+    interval_s: float = 0.0
+    check_count: int = 0
+
+
+def discover_watch_channel_dirs(library_root_path: Path) -> list[Path]:
+    """Pastas de canal sob a raiz (a própria raiz e subpastas diretas) que já têm um escriba_*.json."""
+    candidate_dirs = [library_root_path] + sorted(d for d in library_root_path.iterdir() if d.is_dir() and not d.name.startswith("."))
+    return [d for d in candidate_dirs if get_latest_json_path(d)]
+
+
+def estimate_check_interval_s(
+    channel_state: ChannelState, new_videos_count: int, min_interval_s: float, max_interval_s: float
+) -> float:
+    """
+    Próximo intervalo de verificação a partir da atividade observada do canal:
+    mediana dos intervalos entre os últimos uploads dividida por WATCH_CHECKS_PER_UPLOAD,
+    alongada pelo tempo de silêncio desde o último upload (canais dormentes) e
+    encurtada ao mínimo quando o ciclo acabou de encontrar vídeos novos.
+    """
+    if new_videos_count:
+        return min_interval_s
+    recent_dates = heapq.nlargest(
+        WATCH_RECENT_UPLOADS_COUNT + 1,
+        (v.get("publish_date") for v in channel_state if VALID_DATE_REGEX_PATTERN.match(str(v.get("publish_date")))),
+    )
+    if len(recent_dates) < 2:
+        return max_interval_s
+    recent_timestamps = [datetime.strptime(d, "%Y-%m-%d").timestamp() for d in recent_dates]
+    upload_gaps_s = sorted(newer - older for newer, older in zip(recent_timestamps, recent_timestamps[1:]))
+    median_gap_s = upload_gaps_s[len(upload_gaps_s) // 2]
+    silence_s = max(0.0, time.time() - recent_timestamps[0])
+    interval_s = max(median_gap_s, silence_s) / WATCH_CHECKS_PER_UPLOAD
+    return min(max_interval_s, max(min_interval_s, interval_s))
+
+
+def run_watch_check(channel_watch: ChannelWatch, cli_args: argparse.Namespace) -> int:
+    """
+    Um ciclo de um canal: na primeira vez monta sessão, cookies, idioma e state
+    completo; nas seguintes apenas lista os vídeos mais recentes no state quente
+    e processa os pendentes. Retorna quantos vídeos novos foram descobertos.
+    """
+    os.chdir(channel_watch.channel_dir_path)
+    if channel_watch.session_config is None:
+        channel_cli_args = argparse.Namespace(**vars(cli_args))
+        channel_cli_args.canal = None  # detectado pelo escriba_*.json da pasta
+        channel_watch.session_config = setup_session(channel_cli_args)
+        channel_watch.language_opt_string = init_auth_and_language(
+            channel_watch.session_config, cli_args.lang, False
+        )
+
+    session_config = channel_watch.session_config
+    print_section(f"Ciclo #{channel_watch.check_count + 1}  {DIM}{session_config.channel_input_url_or_handle}{RESET}")
+    known_videos_count = len(channel_watch.channel_state) if channel_watch.channel_state is not None else 0
+    channel_watch.channel_state = load_or_create_channel_state(
+        session_config.cwd_path, session_config.yt_dlp_cmd_list, session_config.cookie_manager.cookie_args_list, session_config.channel_url,
+        warm_channel_state=channel_watch.channel_state,
+        discovery_limit=cli_args.watch_discovery_limit if channel_watch.channel_state is not None else None,
+        uploads_feed_client=session_config.uploads_feed_client, resync_interval_days=cli_args.resync_days,
+        library_index=session_config.library_index,
+    )
+    new_videos_count = len(channel_watch.channel_state) - known_videos_count if channel_watch.check_count else 0
+
+    counters = process_videos(
+        session_config, channel_watch.language_opt_string, cli_args,
+        warm_channel_state=channel_watch.channel_state,
+    )
+    if any(counters[:3]):
+        print_summary(*counters[:4])
+    if counters[4]:
+        raise KeyboardInterrupt
+    channel_watch.language_opt_string = channel_watch.channel_state.detected_language or channel_watch.language_opt_string
+    channel_watch.check_count += 1
+    return new_videos_count
+
+
+def run_watch_daemon(cli_args: argparse.Namespace) -> None:
+    """
+    Modo --watch: processo residente que acompanha todos os canais sob a pasta atual.
+
+    Dependências de ML, cookies, idioma e o state de cada canal ficam em memória
+    entre os ciclos. Os canais vivem numa fila de prioridade (heapq) ordenada pelo
+    horário da próxima verificação, calculado pela frequência de uploads de cada um:
+    canais ativos voltam logo à frente da fila, dormentes raramente.
+    """
+    library_root_path = Path.cwd()
+    channel_dirs_list = discover_watch_channel_dirs(library_root_path)
+    if not channel_dirs_list:
+        print_err("Nenhuma pasta de canal com escriba_*.json encontrada para o --watch.")
+        sys.exit(1)
+
+    min_interval_s = cli_args.watch_min_interval * 60
+    max_interval_s = cli_args.watch_max_interval * 60
+    print_section(f"Daemon --watch  {DIM}({len(channel_dirs_list)} canais){RESET}")
+
+    # (próxima verificação, desempate, canal) — todos começam vencidos
+    watch_queue = [(0.0, idx, ChannelWatch(d)) for idx, d in enumerate(channel_dirs_list)]
+    heapq.heapify(watch_queue)
+    try:
+        while watch_queue:
+            due_time, tie_breaker, channel_watch = heapq.heappop(watch_queue)
+            wait_s = due_time - time.monotonic()
+            if wait_s > 0:
+                print_info(
+                    f"Próxima verificação: {BOLD}{channel_watch.channel_dir_path.name}{RESET} "
+                    f"{DIM}em {wait_s / 60:.0f} min{RESET}"
+                )
+                time.sleep(wait_s)
+            try:
+                new_videos_count = run_watch_check(channel_watch, cli_args)
+                channel_watch.interval_s = estimate_check_interval_s(
+                    channel_watch.channel_state, new_videos_count, min_interval_s, max_interval_s
+                )
+            except SystemExit:
+                # Erros fatais de um canal (ex: listagem vazia) não derrubam o daemon
+                channel_watch.interval_s = max_interval_s
+            except Exception as e:
+                print_warn(f"Falha no ciclo de {channel_watch.channel_dir_path.name}: {e}")
+                channel_watch.interval_s = min(max_interval_s, max(min_interval_s, channel_watch.interval_s * 2))
+            print_info(
+                f"{channel_watch.channel_dir_path.name}: próxima verificação em "
+                f"{BOLD}{channel_watch.interval_s / 60:.0f} min{RESET}"
+            )
+            heapq.heappush(watch_queue, (time.monotonic() + channel_watch.interval_s, tie_breaker, channel_watch))
+    finally:
+        os.chdir(library_root_path)
+
+
+def regen_md_from_srt_files(
+    library_index: LibraryIndex | None = None, strip_boilerplate_flag: bool = False, force_flag: bool = False
+) -> None:
+    """
+    Modo offline: varre archive/ e depois a pasta atual buscando .srt e regenera .md via TF-IDF.
+    Com `library_index`, os .md gerados e os já existentes entram no índice de busca.
+    Os vetores dos segmentos dos .md gerados vão para o store do canal (--related).
+    Legendas guardadas no pacote de archive/ (--pack) são extraídas só durante a conversão.
+    Com `force_flag` (--force), .md já existentes também são regenerados, reavaliando
+    o boilerplate com os fingerprints atuais do canal; um .md que estava só no
+    pacote volta para o pacote.
+    .md já existentes que não são regenerados (inclusive os sem legenda, que o
+    download apaga por padrão) entram no índice de busca e, se ainda não estão no
+    store do --related, têm os segmentos reconstruídos a partir dos parágrafos.
+    """
     cwd_path = Path.cwd()
     archive_path = cwd_path / "archive"
+    transcript_pack = TranscriptPack(archive_path)
+    file_prefix = f"{cwd_path.name}-"
 
     # Montar lista de (srt_path, origem_label) varrendo archive/ primeiro, depois cwd
     scan_dirs = []
@@ -2070,9 +5563,26 @@ def regen_md_from_srt_files() -> None:
     for scan_dir, label in scan_dirs:
         for srt in sorted(scan_dir.glob("*.srt")):
             srt_files_list.append((srt, label))
+    packed_srt_paths = {
+        archive_path / member_name for member_name in transcript_pack.names(".srt")
+        if not (archive_path / member_name).exists() and not (cwd_path / member_name).exists()
+    }
+    srt_files_list.extend((srt, "archive/ (pacote)") for srt in sorted(packed_srt_paths))
+
+    # .md cuja legenda já não existe (apagada após a conversão): só reindexados
+    srt_stems = {srt.stem for srt, _ in srt_files_list}
+    orphan_md_paths_list = [
+        md_path for scan_dir, _ in scan_dirs for md_path in sorted(scan_dir.glob(f"{glob.escape(file_prefix)}*.md"))
+        if md_path.stem not in srt_stems
+    ]
+    orphan_md_paths_list.extend(
+        archive_path / member_name for member_name in transcript_pack.names(".md")
+        if Path(member_name).stem not in srt_stems
+        and not (archive_path / member_name).exists() and not (cwd_path / member_name).exists()
+    )
 
-    if not srt_files_list:
-        print_err("Nenhum arquivo .srt encontrado em archive/ ou na pasta atual.")
+    if not srt_files_list and not orphan_md_paths_list:
+        print_err("Nenhum arquivo .srt ou .md encontrado em archive/ ou na pasta atual.")
         sys.exit(1)
 
     # Carregar JSON de estado uma única vez
@@ -2080,8 +5590,8 @@ def regen_md_from_srt_files() -> None:
     videos_lookup_dict: dict[str, str] = {}
     if json_state_path and json_state_path.is_file():
         try:
-            with open(json_state_path, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
+            with open(json_state_path, "rb") as f:
+                json_data = JSON_CODEC.loads(f.read())
                 videos_list = json_data.get("videos", json_data) if isinstance(json_data, dict) else json_data
                 for v in videos_list:
                     vid = v.get("video_id", "")
@@ -2097,38 +5607,89 @@ def regen_md_from_srt_files() -> None:
     skipped_count = 0
     current_label = ""
 
-    for idx, (srt_path, origin_label) in enumerate(srt_files_list, start=1):
-        # Imprimir seção ao trocar de diretório
-        if origin_label != current_label:
-            current_label = origin_label
-            section_files = sum(1 for _, l in srt_files_list if l == origin_label)
-            print_section(f"{origin_label}  {DIM}({section_files} arquivos .srt){RESET}")
-
-        indentation_prefix = f"  {BLUE}[{idx:>{len(str(total_count))}}/{total_count}]{RESET}"
-
-        # Extrair video_id do nome: <prefixo>-<VIDEO_ID>.<lang>.srt
-        stem_parts = srt_path.stem
-        video_id_match = re.search(r"([A-Za-z0-9_-]{11})", stem_parts)
-        video_id = video_id_match.group(1) if video_id_match else srt_path.stem
-
-        # Título via lookup
-        video_title = videos_lookup_dict.get(video_id, srt_path.stem)
-
-        # Verificar se .md já existe
-        md_path = srt_path.with_suffix(".md")
-        if md_path.exists():
-            print_skip(f"{srt_path.name}  {DIM}.md já existe — pulando{RESET}", indentation_prefix)
-            skipped_count += 1
-            continue
+    segment_store = SegmentVectorStore(cwd_path)
+    boilerplate_detector = BoilerplateDetector(cwd_path)
+
+    def _backfill_existing_md(md_path: Path, video_id: str, video_title: str) -> None:
+        """Índice de busca e store do --related para um .md já existente, sem reconvertê-lo."""
+        needs_vectors = video_id not in segment_store
+        if library_index is None and not needs_vectors:
+            return
+        md_paragraphs = (
+            parse_md_paragraphs(md_path) if md_path.exists()
+            else parse_md_paragraph_lines(transcript_pack.read_text(md_path.name).splitlines())
+        )
+        if library_index is not None:
+            library_index.index_transcript(video_id, md_path, md_paragraphs)
+        if needs_vectors and md_paragraphs:
+            lang_match = SUBTITLE_LANG_SUFFIX_REGEX_PATTERN.search(md_path.name)
+            segment_store.replace_video(
+                video_id, video_title, segments_from_md_paragraphs(md_paragraphs, lang_match.group(1).lower() if lang_match else "pt")
+            )
 
-        print_dl(f"{srt_path.name}{RESET}  {DIM}gerando .md{RESET}", indentation_prefix)
-        result_path = srt_to_md(srt_path, video_id, video_title, threshold=0.3, indentation_prefix="      ")
+    try:
+        for idx, (srt_path, origin_label) in enumerate(srt_files_list, start=1):
+            # Imprimir seção ao trocar de diretório
+            if origin_label != current_label:
+                current_label = origin_label
+                section_files = sum(1 for _, l in srt_files_list if l == origin_label)
+                print_section(f"{origin_label}  {DIM}({section_files} arquivos .srt){RESET}")
+
+            indentation_prefix = f"  {BLUE}[{idx:>{len(str(total_count))}}/{total_count}]{RESET}"
+
+            # Extrair video_id do nome: <pasta do canal>-<VIDEO_ID>-<lang>.srt
+            # (o "-" faz parte do alfabeto dos IDs: a busca solta casaria dentro do prefixo)
+            stem_parts = srt_path.stem
+            if stem_parts.startswith(file_prefix):
+                video_id = stem_parts[len(file_prefix):len(file_prefix) + 11]
+            else:
+                video_id_match = re.search(r"([A-Za-z0-9_-]{11})", stem_parts)
+                video_id = video_id_match.group(1) if video_id_match else srt_path.stem
+
+            # Título via lookup
+            video_title = videos_lookup_dict.get(video_id, srt_path.stem)
+
+            # Verificar se .md já existe (solto ou no pacote)
+            md_path = srt_path.with_suffix(".md")
+            is_md_packed_only = not md_path.exists() and md_path.name in transcript_pack
+            if (md_path.exists() or is_md_packed_only) and not force_flag:
+                print_skip(f"{srt_path.name}  {DIM}.md já existe — pulando{RESET}", indentation_prefix)
+                _backfill_existing_md(md_path, video_id, video_title)
+                skipped_count += 1
+                continue
 
-        if result_path:
-            print_ok(f"salvo: {DIM}{result_path.name}{RESET}", "      ")
-            converted_count += 1
-        else:
-            print_warn(f"falha ou vazio", "      ")
+            print_dl(f"{srt_path.name}{RESET}  {DIM}gerando .md{RESET}", indentation_prefix)
+            if srt_path in packed_srt_paths:
+                transcript_pack.extract(srt_path.name, srt_path)
+            try:
+                result_path = srt_to_md(
+                    srt_path, video_id, video_title, threshold=0.3, indentation_prefix="      ",
+                    library_index=library_index, segment_store=segment_store,
+                    boilerplate_detector=boilerplate_detector, strip_boilerplate_flag=strip_boilerplate_flag,
+                )
+            finally:
+                if srt_path in packed_srt_paths:
+                    srt_path.unlink(missing_ok=True)
+
+            if result_path and is_md_packed_only:
+                transcript_pack.append(result_path.name, result_path.read_bytes(), result_path.stat().st_mtime_ns)
+                result_path.unlink()
+            if result_path:
+                print_ok(f"salvo: {DIM}{result_path.name}{RESET}", "      ")
+                converted_count += 1
+            else:
+                print_warn(f"falha ou vazio", "      ")
+
+        if orphan_md_paths_list:
+            print_section(f".md sem legenda  {DIM}({len(orphan_md_paths_list)} arquivos: índice de busca e --related){RESET}")
+            for md_path in orphan_md_paths_list:
+                video_id = md_path.stem[len(file_prefix):len(file_prefix) + 11]
+                _backfill_existing_md(md_path, video_id, videos_lookup_dict.get(video_id, md_path.stem))
+            print_ok(f"{len(orphan_md_paths_list)} .md existentes reindexados", "  ")
+    finally:
+        segment_store.save()
+        boilerplate_detector.save()
+        transcript_pack.close()
 
     # Resumo
     print(f"\n{DIV_THICK}")
@@ -2141,6 +5702,228 @@ def regen_md_from_srt_files() -> None:
 
 
 
+# ─── Volumes para NotebookLM (--bundle) ──────────────────────────────────────
+
+BUNDLE_DIR_NAME = "notebooklm"
+BUNDLE_MANIFEST_FILENAME = "escriba_bundles.json"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MAX_WORDS = 500_000          # limite de palavras por fonte do NotebookLM
+BUNDLE_MAX_MB = 200.0               # limite de tamanho por fonte do NotebookLM
+MD_VIDEO_ANCHOR_REGEX_PATTERN = re.compile(r'<a name="video-\d+"></a>')
+
+
+class BundleEntry(NamedTuple):
+    """Um .md de vídeo na ordem do volume (só metadados; o texto é lido em streaming)."""
+    video_id: str
+    publish_date: str
+    title: str
+    md_path: Path
+    size_bytes: int
+    mtime_ns: int
+    word_count: int
+
+    def manifest_key(self) -> list:
+        """Tudo o que, se mudar, exige reconstruir o volume que contém o vídeo."""
+        return [self.video_id, self.publish_date, self.title, self.md_path.name, self.size_bytes, self.mtime_ns]
+
+
+def _bundle_index_line(position: int, entry: BundleEntry) -> str:
+    return f"{position}. `[{entry.publish_date}]` [{entry.title}](#video-{position:02d})\n"
+
+
+def _count_md_words(md_path: Path) -> int:
+    with open(md_path, "r", encoding="utf-8") as file_descriptor:
+        return sum(len(line.split()) for line in file_descriptor)
+
+
+def collect_bundle_entries(
+    cwd_path: Path, channel_dir_name: str, word_count_cache: dict, transcript_pack: TranscriptPack | None = None
+) -> list[BundleEntry]:
+    """
+    Lista os .md do canal (pasta atual, archive/ e o pacote de archive/) na
+    ordem de publicação do state. A contagem de palavras só relê arquivos cujo
+    tamanho/mtime mudou desde o último --bundle (`word_count_cache`: nome →
+    [tamanho, mtime_ns, palavras]).
+    """
+    json_state_path = get_latest_json_path(cwd_path)
+    if not json_state_path or not json_state_path.is_file():
+        return []
+    try:
+        json_data = JSON_CODEC.load_path(json_state_path)
+    except Exception as error_msg:
+        print_err(f"Falha ao ler {json_state_path.name}: {error_msg}")
+        return []
+    videos_list = json_data.get("videos", []) if isinstance(json_data, dict) else json_data
+
+    md_paths_dict: dict[str, Path] = {}
+    file_prefix = f"{channel_dir_name}-"
+    if transcript_pack is not None:
+        for member_name in transcript_pack.names(".md"):
+            md_paths_dict[member_name[len(file_prefix):len(file_prefix) + 11]] = transcript_pack.archive_dir_path / member_name
+    for scan_dir in (cwd_path / "archive", cwd_path):  # a pasta atual prevalece sobre archive/
+        if not scan_dir.is_dir():
+            continue
+        for md_path in scan_dir.glob(f"{glob.escape(file_prefix)}*.md"):
+            md_paths_dict[md_path.name[len(file_prefix):len(file_prefix) + 11]] = md_path
+
+    entry_list = []
+    for video_dict in videos_list:
+        video_id = video_dict.get("video_id") or video_dict.get("id")
+        md_path = md_paths_dict.get(video_id)
+        if md_path is None:
+            continue
+        if md_path.exists():
+            file_stat = md_path.stat()
+            size_bytes, mtime_ns = file_stat.st_size, file_stat.st_mtime_ns
+        else:
+            packed_member = transcript_pack.member(md_path.name)
+            size_bytes, mtime_ns = packed_member.size_bytes, packed_member.mtime_ns
+        cached_counts = word_count_cache.get(md_path.name)
+        if cached_counts and cached_counts[:2] == [size_bytes, mtime_ns]:
+            word_count = cached_counts[2]
+        elif md_path.exists():
+            word_count = _count_md_words(md_path)
+        else:
+            word_count = len(transcript_pack.read_text(md_path.name).split())
+        entry_list.append(BundleEntry(
+            video_id, video_dict.get("publish_date") or "N/A", video_dict.get("title") or video_id,
+            md_path, size_bytes, mtime_ns, word_count,
+        ))
+    # Datas desconhecidas ("N/A") vão para o fim; empate mantém a ordem do state
+    entry_list.sort(key=lambda entry: entry.publish_date if entry.publish_date[:1].isdigit() else "9999")
+    return entry_list
+
+
+def plan_bundle_volumes(entry_list: list[BundleEntry], max_words: int, max_bytes: int) -> list[list[BundleEntry]]:
+    """
+    Agrupa os vídeos em volumes consecutivos sem passar dos limites de palavras
+    e bytes (contando as linhas do índice). Um vídeo maior que o limite fica
+    sozinho no seu volume.
+    """
+    volume_list: list[list[BundleEntry]] = []
+    current_volume: list[BundleEntry] = []
+    volume_words = volume_bytes = 0
+    for entry in entry_list:
+        entry_bytes = entry.size_bytes + len(_bundle_index_line(len(current_volume) + 1, entry).encode("utf-8")) + 8
+        if current_volume and (volume_words + entry.word_count > max_words or volume_bytes + entry_bytes > max_bytes):
+            volume_list.append(current_volume)
+            current_volume = []
+            volume_words = volume_bytes = 0
+        current_volume.append(entry)
+        volume_words += entry.word_count
+        volume_bytes += entry_bytes
+    if current_volume:
+        volume_list.append(current_volume)
+    return volume_list
+
+
+def write_bundle_volume(
+    volume_path: Path, channel_dir_name: str, volume_number: int, entry_list: list[BundleEntry],
+    transcript_pack: TranscriptPack | None = None,
+) -> None:
+    """Grava um volume: índice com âncoras por vídeo + os .md copiados em streaming (ou lidos do pacote)."""
+    temp_path = volume_path.with_name(f"{volume_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as output_descriptor:
+            output_descriptor.write(
+                f"# {channel_dir_name} — Volume {volume_number}\n"
+                f"**Período:** {entry_list[0].publish_date} a {entry_list[-1].publish_date}  \n"
+                f"**Vídeos:** {len(entry_list)}  \n"
+                f"**Palavras:** {sum(entry.word_count for entry in entry_list)}\n"
+                "\n"
+                "### Índice\n"
+            )
+            output_descriptor.writelines(_bundle_index_line(position, entry) for position, entry in enumerate(entry_list, start=1))
+            for position, entry in enumerate(entry_list, start=1):
+                output_descriptor.write("\n---\n\n")
+                with (
+                    open(entry.md_path, "r", encoding="utf-8") if entry.md_path.exists()
+                    else io.StringIO(transcript_pack.read_text(entry.md_path.name))
+                ) as input_descriptor:
+                    header_line = input_descriptor.readline()
+                    output_descriptor.write(
+                        MD_VIDEO_ANCHOR_REGEX_PATTERN.sub(f'<a name="video-{position:02d}"></a>', header_line, count=1)
+                    )
+                    shutil.copyfileobj(input_descriptor, output_descriptor)
+        temp_path.replace(volume_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def build_notebooklm_bundles(cwd_path: Path, max_words: int = BUNDLE_MAX_WORDS, max_mb: float = BUNDLE_MAX_MB) -> None:
+    """
+    Modo offline: junta os .md do canal, em ordem de publicação, em volumes para
+    o NotebookLM (`notebooklm/<canal>-volNNN.md`). O manifesto guarda o que
+    entrou em cada volume; só volumes cujos vídeos, títulos ou .md mudaram são
+    regravados, e volumes que deixaram de existir são removidos.
+    """
+    channel_dir_name = cwd_path.name
+    bundle_dir_path = cwd_path / BUNDLE_DIR_NAME
+    manifest_path = bundle_dir_path / BUNDLE_MANIFEST_FILENAME
+    max_bytes = int(max_mb * 1_048_576)
+
+    print_header(channel_dir_name, VERSION, "Volumes para NotebookLM")
+
+    manifest_dict: dict = {}
+    if manifest_path.is_file():
+        try:
+            manifest_dict = JSON_CODEC.load_path(manifest_path)
+        except Exception as error_msg:
+            print_warn(f"Manifesto de volumes ilegível, reconstruindo tudo: {error_msg}")
+    same_layout = (
+        manifest_dict.get("format_version") == BUNDLE_FORMAT_VERSION
+        and manifest_dict.get("max_words") == max_words and manifest_dict.get("max_bytes") == max_bytes
+    )
+    previous_volumes_dict = {volume["name"]: volume["entries"] for volume in manifest_dict.get("volumes", [])} if same_layout else {}
+
+    transcript_pack = TranscriptPack(cwd_path / "archive")
+    entry_list = collect_bundle_entries(cwd_path, channel_dir_name, manifest_dict.get("word_counts", {}), transcript_pack)
+    if not entry_list:
+        print_err("Nenhum .md com vídeo correspondente no state do canal (rode o download ou --regen-md antes).")
+        return
+
+    bundle_dir_path.mkdir(exist_ok=True)
+    volume_list = plan_bundle_volumes(entry_list, max_words, max_bytes)
+    print_section(f"{len(entry_list)} transcrições  {DIM}→ {len(volume_list)} volumes (≤{max_words} palavras, ≤{max_mb:g} MB){RESET}")
+
+    rebuilt_count = 0
+    new_volumes_list = []
+    for volume_number, volume_entries in enumerate(volume_list, start=1):
+        volume_path = bundle_dir_path / f"{channel_dir_name}-vol{volume_number:03d}.md"
+        manifest_entries = [entry.manifest_key() for entry in volume_entries]
+        new_volumes_list.append({"name": volume_path.name, "entries": manifest_entries})
+        volume_label = f"{volume_path.name}  {DIM}{len(volume_entries)} vídeos, {volume_entries[0].publish_date} a {volume_entries[-1].publish_date}{RESET}"
+        if previous_volumes_dict.get(volume_path.name) == manifest_entries and volume_path.exists():
+            print_skip(f"{volume_label}  {DIM}inalterado{RESET}", "  ")
+            continue
+        if sum(entry.word_count for entry in volume_entries) > max_words or sum(entry.size_bytes for entry in volume_entries) > max_bytes:
+            print_warn(f"{volume_entries[0].video_id} sozinho já excede o limite do volume", "  ")
+        write_bundle_volume(volume_path, channel_dir_name, volume_number, volume_entries, transcript_pack)
+        print_ok(volume_label, "  ")
+        rebuilt_count += 1
+
+    transcript_pack.close()
+
+    current_names = {volume["name"] for volume in new_volumes_list}
+    for volume in manifest_dict.get("volumes", []):
+        if volume["name"] not in current_names:
+            (bundle_dir_path / volume["name"]).unlink(missing_ok=True)
+            print_info(f"{volume['name']}  {DIM}removido (sem vídeos){RESET}", "  ")
+
+    temp_manifest_path = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+    try:
+        JSON_CODEC.dump_path({
+            "format_version": BUNDLE_FORMAT_VERSION, "max_words": max_words, "max_bytes": max_bytes,
+            "word_counts": {entry.md_path.name: [entry.size_bytes, entry.mtime_ns, entry.word_count] for entry in entry_list},
+            "volumes": new_volumes_list,
+        }, temp_manifest_path)
+        temp_manifest_path.replace(manifest_path)
+    finally:
+        temp_manifest_path.unlink(missing_ok=True)
+
+    print_info(f"{rebuilt_count} volume(s) regravado(s), {len(volume_list) - rebuilt_count} inalterado(s)  {DIM}{bundle_dir_path}{RESET}")
+
+
 # ─── Notion Exporter ─────────────────────────────────────────────────────────
 
 class NotionExporter:
@@ -2295,10 +6078,57 @@ class NotionExporter:
 
 def main() -> None:
     cli_args = parse_args()
+    JSON_CODEC.compact_output = cli_args.compact_state
+    CONSOLE.configure(cli_args.log_format)
+
+    if not cli_args.profile:
+        run_escriba(cli_args)
+        return
+
+    # --- Profiling opt-in: instrumenta os caminhos quentes apenas nesta execução ---
+    hot_path_profiler = HotPathProfiler(Path(cli_args.profile_dir).resolve(), cli_args.profile_top)
+    hot_path_profiler.install()
+    try:
+        run_escriba(cli_args)
+    finally:
+        hot_path_profiler.print_summary()
+
 
+def run_escriba(cli_args: argparse.Namespace) -> None:
+    """Despacha o modo de operação selecionado pelos argumentos da CLI."""
     # Short-circuit: modo offline de regeneração MD
     if cli_args.regen_md:
-        regen_md_from_srt_files()
+        regen_md_from_srt_files(LibraryIndex.locate(Path.cwd(), cli_args.library_root), cli_args.strip_boilerplate, cli_args.force)
+        return
+
+    # Short-circuit: funde os deltas dos shards no state do canal
+    if cli_args.merge_shards is not None:
+        merge_shard_deltas(Path.cwd(), cli_args.merge_shards)
+        return
+
+    # Short-circuit: plano offline da próxima execução (sem yt-dlp)
+    if cli_args.plan:
+        write_work_plan(Path.cwd(), cli_args)
+        return
+
+    # Short-circuit: empacota as transcrições soltas em archive/
+    if cli_args.pack:
+        pack_loose_transcripts(Path.cwd())
+        return
+
+    # Short-circuit: volumes para NotebookLM a partir dos .md do canal
+    if cli_args.bundle:
+        build_notebooklm_bundles(Path.cwd(), cli_args.bundle_max_words, cli_args.bundle_max_mb)
+        return
+
+    # Short-circuit: segmentos relacionados no store de vetores do canal
+    if cli_args.related:
+        show_related_segments(cli_args.related, SegmentVectorStore(Path.cwd()), cli_args.search_limit)
+        return
+
+    # Short-circuit: busca no índice de transcrições da biblioteca
+    if cli_args.search:
+        search_library(cli_args.search, LibraryIndex.locate(Path.cwd(), cli_args.library_root), cli_args.search_limit)
         return
 
     # --- Modo de Operação Especial: Notion File ---
@@ -2324,13 +6154,19 @@ def main() -> None:
             print_ok(f"Arquivo exportado com sucesso! ID: {page_id}")
         sys.exit(0)
 
+    # --- Modo Daemon: acompanha todos os canais da pasta atual ---
+    if cli_args.watch:
+        run_watch_daemon(cli_args)
+        return
+
     # --- Fluxo Normal do Script ---
+    planned_video_ids = load_work_plan(Path(cli_args.execute_plan), Path.cwd(), cli_args) if cli_args.execute_plan else None
     session_config = setup_session(cli_args)
-    cookie_args_list, language_opt_string = init_auth_and_language(
+    language_opt_string = init_auth_and_language(
         session_config, cli_args.lang, cli_args.refresh_cookies
     )
     downloaded_videos_count, skipped_videos_count, error_videos_count, total_videos_count, was_interrupted = process_videos(
-        session_config, cookie_args_list, language_opt_string, cli_args
+        session_config, language_opt_string, cli_args, planned_video_ids=planned_video_ids,
     )
     print_summary(downloaded_videos_count, skipped_videos_count, error_videos_count, total_videos_count)
     if was_interrupted: